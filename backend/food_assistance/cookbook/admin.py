@@ -53,7 +53,8 @@ class RecipeAdmin(admin.ModelAdmin):
         'text',
         'cooking_time',
         'created',
-        'favorites_counter'
+        'favorites_count',
+        'cart_count'
     )
     fields = (
         ('name', 'author'),
@@ -61,16 +62,13 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time'
     )
     inlines = (RecipeIngredientsInline,)
-    readonly_fields = ('favorites_counter',)
+    readonly_fields = ('favorites_count', 'cart_count')
     filter_horizontal = ('tags', 'ingredients')
     search_fields = ('name', 'text', 'author__email', 'author__username')
     list_filter = ('tags',)
     list_display_links = ('name',)
     empty_value_display = '-пусто-'
 
-    def favorites_counter(self, obj):
-        return len(obj.favorite_recipes.all())
-
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
@@ -0,0 +1,158 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from food_assistance.settings import (RESPONSE_CACHE_ALIAS,
+                                      RESPONSE_CACHE_TIMEOUT)
+
+KEY_PREFIX = 'response_cache'
+
+
+class ResponseCache:
+    """
+    Кэш ответов API для анонимных пользователей поверх
+    Django cache framework.
+
+    Инвалидация через версии: у каждой группы (recipes, tags,
+    ingredients) есть общая версия и версия списков, у каждого
+    объекта - своя версия. Смена версии делает старые ключи
+    недостижимыми, они вытесняются из кэша по таймауту.
+    """
+    def __init__(self, alias=RESPONSE_CACHE_ALIAS,
+                 timeout=RESPONSE_CACHE_TIMEOUT):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def version_key(self, *parts):
+        return ':'.join((KEY_PREFIX, 'version') + tuple(map(str, parts)))
+
+    def bump(self, key):
+        if not self.cache.add(key, 2, None):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, 2, None)
+
+    def count(self, name):
+        key = f'{KEY_PREFIX}:stats:{name}'
+        if not self.cache.add(key, 1, None):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, 1, None)
+
+    def stats(self):
+        """Счётчики попаданий и промахов."""
+        stats = self.cache.get_many(
+            (f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses')
+        )
+        return {
+            'hits': stats.get(f'{KEY_PREFIX}:stats:hits', 0),
+            'misses': stats.get(f'{KEY_PREFIX}:stats:misses', 0)
+        }
+
+    def make_key(self, group, request, query_params, pk=None):
+        """
+        Ключ ответа из нормализованной строки запроса:
+        учитываются только параметры query_params, отсортированные
+        по имени и значению.
+        """
+        group_key = self.version_key(group)
+        if pk is None:
+            scope_key = self.version_key(group, 'list')
+        else:
+            scope_key = self.version_key(group, 'detail', pk)
+        versions = self.cache.get_many((group_key, scope_key))
+        params = sorted(
+            (name, value)
+            for name in query_params
+            for value in request.query_params.getlist(name)
+        )
+        raw_key = ':'.join((
+            request.get_host(),
+            str(pk),
+            str(versions.get(group_key, 1)),
+            str(versions.get(scope_key, 1)),
+            urlencode(params)
+        ))
+        digest = md5(raw_key.encode()).hexdigest()
+        return f'{KEY_PREFIX}:{group}:{digest}'
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self.count('misses' if data is None else 'hits')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.timeout)
+
+    def invalidate_group(self, group):
+        """Сбрасывает все ответы группы."""
+        self.invalidate_key(self.version_key(group))
+
+    def invalidate_object(self, group, pk):
+        """Сбрасывает детальный ответ объекта и списки группы."""
+        self.invalidate_key(self.version_key(group, 'detail', pk))
+        self.invalidate_key(self.version_key(group, 'list'))
+
+    def invalidate_lists(self, group):
+        """Сбрасывает списки группы, не трогая детальные ответы."""
+        self.invalidate_key(self.version_key(group, 'list'))
+
+    def invalidate_key(self, key):
+        """
+        Версия меняется сразу и ещё раз после коммита транзакции,
+        чтобы ответ, закэшированный конкурентным запросом
+        до коммита, не остался в кэше.
+        """
+        self.bump(key)
+        transaction.on_commit(lambda: self.bump(key))
+
+
+response_cache = ResponseCache()
+
+
+class AnonymousCacheMixin:
+    """
+    Кэширует ответы list/retrieve для неавторизованных пользователей.
+    """
+    cache_group = None
+    cache_query_params = ()
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        key = response_cache.make_key(
+            self.cache_group,
+            request,
+            self.cache_query_params,
+            kwargs.get(lookup_url_kwarg)
+        )
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
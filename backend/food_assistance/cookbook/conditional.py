@@ -0,0 +1,158 @@
+import time
+from hashlib import md5
+
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from food_assistance.settings import RESPONSE_CACHE_ALIAS
+
+KEY_PREFIX = 'conditional'
+RECIPES_DELETED_KEY = f'{KEY_PREFIX}:recipes_deleted'
+RECIPES_RANKED_KEY = f'{KEY_PREFIX}:recipes_ranked'
+
+
+def get_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def user_state_key(user_id):
+    return f'{KEY_PREFIX}:user:{user_id}'
+
+
+def touch_user_state(user_id):
+    """
+    Отмечает изменение избранного, корзины или подписок пользователя:
+    они входят в ответ, но не меняют Recipe.updated.
+    """
+    get_cache().set(user_state_key(user_id), time.time(), None)
+
+
+def touch_recipes_deleted():
+    """Отмечает удаление рецепта: MAX(updated) его не отражает."""
+    get_cache().set(RECIPES_DELETED_KEY, time.time(), None)
+
+
+def touch_recipes_ranked():
+    """
+    Отмечает изменение рейтингов: порядок списков popular и trending
+    меняется без изменения Recipe.updated.
+    """
+    get_cache().set(RECIPES_RANKED_KEY, time.time(), None)
+
+
+def get_timestamp(key):
+    """
+    Метка времени из кэша. Если её нет (кэш очищен или вытеснен),
+    она создаётся текущим временем: клиент один раз получит
+    полный ответ вместо ошибочного 304.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+    cache.add(key, time.time(), None)
+    return cache.get(key, time.time())
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list/retrieve рецептов.
+    Ответ 304 формируется после одного запроса MAX(updated)/COUNT
+    (в режимах без COUNT - только MAX(updated) по индексу)
+    без сериализации.
+    """
+    def get_list_state_keys(self, request):
+        """Метки изменений, которые входят в ETag списка."""
+        return (RECIPES_DELETED_KEY,)
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_base_queryset())
+        if self.action != 'retrieve':
+            return queryset
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return queryset.filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+
+    def uses_table_version(self, request):
+        """
+        Курсорная навигация и ?count=approximate обходятся без COUNT(*)
+        по выборке: версией списка служит MAX(updated) всей таблицы
+        (чтение по индексу). Она меняется при любом изменении рецептов,
+        в том числе когда рецепт выходит из выборки.
+        """
+        paginator = self.paginator
+        if self.action != 'list' or paginator is None:
+            return False
+        is_cursor_mode = getattr(paginator, 'is_cursor_mode', None)
+        return bool(
+            is_cursor_mode and is_cursor_mode(request)
+            or request.query_params.get(
+                getattr(paginator, 'count_query_param', None)
+            ) == 'approximate'
+        )
+
+    def get_validators(self, request):
+        """
+        Возвращает (etag, last_modified) или (None, None),
+        если объекта нет.
+        """
+        if self.uses_table_version(request):
+            state = self.get_base_queryset().order_by().aggregate(
+                last_updated=Max('updated')
+            )
+            state['count'] = None
+        else:
+            state = self.get_conditional_queryset().order_by().aggregate(
+                last_updated=Max('updated'),
+                count=Count('id')
+            )
+        if not state['count'] and self.action == 'retrieve':
+            return None, None
+        last_updated = state['last_updated']
+        timestamps = [last_updated.timestamp() if last_updated else 0]
+        if self.action == 'list':
+            timestamps.extend(
+                get_timestamp(key)
+                for key in self.get_list_state_keys(request)
+            )
+        if request.user.is_authenticated:
+            timestamps.append(get_timestamp(user_state_key(request.user.pk)))
+        fingerprint = ':'.join(map(str, (
+            request.get_full_path(),
+            request.user.pk,
+            state['count'],
+            *timestamps
+        )))
+        etag = quote_etag(md5(fingerprint.encode()).hexdigest())
+        return etag, int(max(timestamps))
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,236 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from cookbook.models import RecipeIngredients
+from food_assistance.settings import COOKABLE_INDEX_TTL
+
+CookableMatch = namedtuple('CookableMatch', ('recipe_id', 'matched', 'total'))
+# Битовая карта ингредиента хранится, если она не больше массива id
+# рецептов в DENSE_POSTING_RATIO раз: id занимает 64 бита, рецепт
+# в битовой карте - 1 бит.
+DENSE_POSTING_RATIO = 64
+
+
+def to_bitmap(recipe_ids) -> int:
+    """Битовая карта (int), в которой установлены биты recipe_ids."""
+    if not recipe_ids:
+        return 0
+    bits = bytearray(max(recipe_ids) // 8 + 1)
+    for recipe_id in recipe_ids:
+        bits[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def set_bit(bitmap: int, bit: int, value: bool) -> int:
+    if value:
+        return bitmap | (1 << bit)
+    return bitmap & ~(1 << bit)
+
+
+def iter_bits(bitmap: int):
+    """Номера установленных битов по возрастанию."""
+    bits = bin(bitmap)[:1:-1]
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+def add_bitmap(planes: list, bitmap: int) -> None:
+    """
+    Прибавляет 1 к счётчикам рецептов из bitmap. Счётчики хранятся
+    по битам (planes[j] - j-й бит счётчика каждого рецепта), поэтому
+    сложение - несколько побитовых операций над целыми сразу
+    для всех рецептов.
+    """
+    carry = bitmap
+    for number, plane in enumerate(planes):
+        if not carry:
+            return
+        planes[number], carry = plane ^ carry, plane & carry
+    if carry:
+        planes.append(carry)
+
+
+def subtract_planes(minuend: list, subtrahend: list) -> list:
+    """Поразрядная разность счётчиков; minuend >= subtrahend."""
+    difference = []
+    borrow = 0
+    for number in range(max(len(minuend), len(subtrahend))):
+        left = minuend[number] if number < len(minuend) else 0
+        right = subtrahend[number] if number < len(subtrahend) else 0
+        difference.append(left ^ right ^ borrow)
+        borrow = (~left & right) | (~(left ^ right) & borrow)
+    return difference
+
+
+def greater_than(planes: list, limit: int) -> int:
+    """Битовая карта рецептов, чей счётчик больше limit."""
+    greater = 0
+    equal = -1
+    for number in reversed(range(max(len(planes), limit.bit_length()))):
+        plane = planes[number] if number < len(planes) else 0
+        if limit >> number & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane
+    return greater
+
+
+class CookableIndex:
+    """
+    Процессный инвертированный индекс «ингредиент -> рецепты»
+    для поиска рецептов по имеющимся ингредиентам.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для частых ингредиентов - ещё и битовая карта по id.
+    Число имеющихся и недостающих ингредиентов считается побитовыми
+    операциями сразу для всех рецептов, без JOIN по RecipeIngredients
+    и без цикла по рецептам-кандидатам.
+
+    Изменения рецептов этого процесса применяются к индексу после
+    коммита (см. signals), изменения из других процессов
+    подхватываются перестроением не реже чем раз в COOKABLE_INDEX_TTL
+    секунд.
+    """
+    def __init__(self, ttl: int = COOKABLE_INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._recipes = None
+        self._postings = None
+        self._bitmaps = None
+        self._totals = None
+        self._built = 0
+
+    def invalidate(self) -> None:
+        """Помечает индекс устаревшим."""
+        self._recipes = None
+
+    def is_stale(self) -> bool:
+        return (
+            self._recipes is None
+            or time.monotonic() - self._built > self.ttl
+        )
+
+    def build(self) -> None:
+        """Загружает связи рецептов с ингредиентами и строит индекс."""
+        postings = defaultdict(lambda: array('l'))
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in RecipeIngredients.objects.order_by(
+            'recipe_id', 'ingredient_id'
+        ).values_list('recipe_id', 'ingredient_id'):
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        max_id = max(recipes, default=0)
+        self._bitmaps = {
+            ingredient_id: to_bitmap(posting)
+            for ingredient_id, posting in postings.items()
+            if len(posting) * DENSE_POSTING_RATIO >= max_id
+        }
+        totals = defaultdict(list)
+        for recipe_id, ingredients in recipes.items():
+            for number in range(len(ingredients).bit_length()):
+                if len(ingredients) >> number & 1:
+                    totals[number].append(recipe_id)
+        self._totals = [to_bitmap(totals[number]) for number in range(
+            max(totals, default=-1) + 1
+        )]
+        self._postings = dict(postings)
+        self._recipes = {
+            recipe_id: tuple(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+        self._built = time.monotonic()
+
+    def update_recipes(self, recipe_ids) -> None:
+        """
+        Перечитывает ингредиенты рецептов recipe_ids из БД.
+        Удалённые рецепты убираются из индекса.
+        """
+        if self._recipes is None:
+            return
+        current = defaultdict(list)
+        for recipe_id, ingredient_id in RecipeIngredients.objects.filter(
+            recipe__in=recipe_ids
+        ).order_by('ingredient_id').values_list('recipe_id', 'ingredient_id'):
+            current[recipe_id].append(ingredient_id)
+        with self._lock:
+            if self._recipes is None:
+                return
+            for recipe_id in set(recipe_ids):
+                self.replace_recipe(recipe_id, tuple(current[recipe_id]))
+
+    def replace_recipe(self, recipe_id, ingredients) -> None:
+        old = set(self._recipes.pop(recipe_id, ()))
+        new = set(ingredients)
+        for ingredient_id in old - new:
+            posting = self._postings[ingredient_id]
+            del posting[bisect_left(posting, recipe_id)]
+            if ingredient_id in self._bitmaps:
+                self._bitmaps[ingredient_id] = set_bit(
+                    self._bitmaps[ingredient_id], recipe_id, False
+                )
+        for ingredient_id in new - old:
+            insort(
+                self._postings.setdefault(ingredient_id, array('l')),
+                recipe_id
+            )
+            if ingredient_id in self._bitmaps:
+                self._bitmaps[ingredient_id] = set_bit(
+                    self._bitmaps[ingredient_id], recipe_id, True
+                )
+        total = len(ingredients)
+        for number in range(max(len(self._totals), total.bit_length())):
+            if number == len(self._totals):
+                self._totals.append(0)
+            self._totals[number] = set_bit(
+                self._totals[number], recipe_id, total >> number & 1
+            )
+        if ingredients:
+            self._recipes[recipe_id] = ingredients
+
+    def get_bitmap(self, ingredient_id) -> int:
+        if ingredient_id in self._bitmaps:
+            return self._bitmaps[ingredient_id]
+        return to_bitmap(self._postings.get(ingredient_id, ()))
+
+    def search(self, ingredient_ids, max_missing=0) -> list:
+        """
+        Рецепты, в которых есть хотя бы один из ingredient_ids
+        и не хватает не более max_missing ингредиентов.
+        Сортировка: по доле имеющихся ингредиентов, затем по числу
+        недостающих, затем по id.
+        """
+        owned = set(ingredient_ids)
+        with self._lock:
+            if self.is_stale():
+                self.build()
+            matched = []
+            any_owned = 0
+            for ingredient_id in owned:
+                bitmap = self.get_bitmap(ingredient_id)
+                any_owned |= bitmap
+                add_bitmap(matched, bitmap)
+            missing = subtract_planes(self._totals, matched)
+            found = any_owned & ~greater_than(missing, max_missing)
+            matches = []
+            for recipe_id in iter_bits(found):
+                ingredients = self._recipes[recipe_id]
+                matches.append(CookableMatch(
+                    recipe_id,
+                    sum(ingredient in owned for ingredient in ingredients),
+                    len(ingredients)
+                ))
+        matches.sort(key=lambda match: (
+            -match.matched / match.total,
+            match.total - match.matched,
+            match.recipe_id
+        ))
+        return matches
+
+
+cookable_index = CookableIndex()
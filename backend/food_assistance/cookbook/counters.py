@@ -0,0 +1,97 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class DerivedFieldsMixin:
+    """
+    Поля derived_fields (счётчики, рейтинг и т.п.) меняются только
+    атомарными UPDATE. Полное сохранение существующей строки
+    (save() без update_fields) их не записывает: экземпляр в памяти
+    мог быть прочитан до этих изменений, например взят из кэша
+    токенов или загружен в начале запроса.
+    """
+    derived_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')
+                and not self._state.adding):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def counter_fields(apps=global_apps):
+    """
+    Денормализованные счётчики: (модель, поле, модель связей,
+    поле связи с моделью).
+    """
+    recipe = apps.get_model('cookbook', 'Recipe')
+    user = apps.get_model('users', 'User')
+    return (
+        (recipe, 'favorites_count',
+         apps.get_model('cookbook', 'FavoritRecipes'), 'recipe'),
+        (recipe, 'cart_count',
+         apps.get_model('cookbook', 'ShoppingCartRecipes'), 'recipe'),
+        (user, 'recipes_count', recipe, 'author'),
+        (user, 'followers_count', apps.get_model('users', 'Follow'), 'author'),
+    )
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос с фактическим числом связанных строк."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def change_counter(model, pk, field, delta, **values):
+    """
+    Атомарно меняет счётчик на delta, не опуская его ниже нуля.
+    values обновляются тем же запросом.
+    """
+    if pk is not None:
+        change_counters(model, (pk,), field, delta, **values)
+
+
+def change_counters(model, pks, field, delta, **values):
+    """change_counter для нескольких строк одним UPDATE."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **values)
+
+
+def reconcile_counters(apps=global_apps, dry_run=False) -> dict:
+    """
+    Исправляет расхождения счётчиков с фактическими данными.
+    Возвращает число исправленных строк по каждому счётчику.
+    """
+    fixed = {}
+    for model, field, related_model, related_field in counter_fields(apps):
+        actual = actual_count(related_model, related_field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).values('pk')
+        label = f'{model.__name__}.{field}'
+        if dry_run:
+            fixed[label] = drifted.count()
+            continue
+        fixed[label] = model.objects.filter(pk__in=drifted).update(
+            **{field: actual}
+        )
+    return fixed
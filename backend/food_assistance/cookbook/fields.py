@@ -0,0 +1,123 @@
+import binascii
+from base64 import b64decode
+
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+from food_assistance.settings import (RECIPE_IMAGE_MAX_BYTES,
+                                      RECIPE_IMAGE_MAX_PIXELS)
+
+# Размер порции base64 в символах, кратный 4.
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'GIF': ('gif', 'image/gif'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+class ImageUploadField(serializers.ImageField):
+    """
+    Картинка рецепта: файл из multipart-запроса или строка base64
+    (data URI) из JSON.
+
+    base64 декодируется порциями во временный файл на диске,
+    а не в память целиком. Размер проверяется до декодирования
+    по длине строки, а затем по числу записанных байт. Размеры
+    изображения проверяются по заголовку, без загрузки всего растра.
+
+    Декодирование выполняется в потоке запроса, а не в RenditionPool:
+    имя файла - хэш содержимого (ContentAddressedStorage), и ответ
+    на создание рецепта уже содержит URL картинки, а ошибка формата
+    возвращается как 400. Вне запроса строятся только копии.
+    """
+    default_error_messages = {
+        'invalid': 'Upload a valid image.',
+        'invalid_type': 'Unsupported image type. Allowed: {formats}.',
+        'max_bytes': 'Image is larger than {max_bytes} bytes.',
+        'max_pixels': 'Image is larger than {max_pixels} pixels.',
+    }
+
+    max_bytes = RECIPE_IMAGE_MAX_BYTES
+    max_pixels = RECIPE_IMAGE_MAX_PIXELS
+
+    def __init__(self, **kwargs):
+        self.max_bytes = kwargs.pop('max_bytes', self.max_bytes)
+        self.max_pixels = kwargs.pop('max_pixels', self.max_pixels)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            upload = self.decode_base64(data)
+        elif isinstance(data, UploadedFile):
+            upload = data
+            if upload.size > self.max_bytes:
+                self.fail('max_bytes', max_bytes=self.max_bytes)
+        else:
+            self.fail('invalid')
+        self.check_image(upload)
+        return upload
+
+    def decode_base64(self, data):
+        """Декодирует data URI порциями во временный файл."""
+        _, separator, payload = data.partition(';base64,')
+        if not separator:
+            payload = data
+        if len(payload) * 3 // 4 > self.max_bytes + 2:
+            self.fail('max_bytes', max_bytes=self.max_bytes)
+        upload = TemporaryUploadedFile('upload', None, 0, None)
+        carry = ''
+        written = 0
+        try:
+            for start in range(0, len(payload), BASE64_CHUNK_SIZE):
+                chunk = carry + ''.join(
+                    payload[start:start + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(chunk) // 4 * 4
+                carry = chunk[end:]
+                decoded = b64decode(chunk[:end], validate=True)
+                written += len(decoded)
+                if written > self.max_bytes:
+                    self.fail('max_bytes', max_bytes=self.max_bytes)
+                upload.write(decoded)
+        except (binascii.Error, ValueError):
+            upload.close()
+            self.fail('invalid')
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        if carry or not written:
+            upload.close()
+            self.fail('invalid')
+        upload.size = written
+        return upload
+
+    def check_image(self, upload):
+        """
+        Проверяет формат и размеры по заголовку изображения и задаёт
+        имя файла с расширением, соответствующим формату.
+        """
+        try:
+            upload.seek(0)
+            image = Image.open(upload)
+            image_format = image.format
+            width, height = image.size
+            if width * height <= self.max_pixels:
+                image.verify()
+        except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+            self.fail('max_pixels', max_pixels=self.max_pixels)
+        except Exception:
+            self.fail('invalid')
+        if image_format not in IMAGE_FORMATS:
+            self.fail(
+                'invalid_type',
+                formats=', '.join(sorted(IMAGE_FORMATS))
+            )
+        if width * height > self.max_pixels:
+            self.fail('max_pixels', max_pixels=self.max_pixels)
+        extension, content_type = IMAGE_FORMATS[image_format]
+        upload.name = f'upload.{extension}'
+        upload.content_type = content_type
+        upload.seek(0)
@@ -1,19 +1,173 @@
+from django import forms
+from django.db.models import Count, Exists, OuterRef
 from django_filters import FilterSet, rest_framework
-from rest_framework import filters
-from cookbook.models import Recipe, Tag
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from cookbook.models import (FavoritRecipes, Recipe, ShoppingCartRecipes,
+                             Tag)
+from cookbook.search import search_recipes
+
+# Каждой сортировке соответствует индекс Recipe.Meta.indexes,
+# id в конце делает порядок однозначным для навигации по ?cursor=.
+RECIPE_ORDERINGS = {
+    'newest': ('-created', 'id'),
+    'trending': ('-trending_score', 'id'),
+    'popular': ('-favorites_count', 'id'),
+    'cooking_time': ('cooking_time', 'id'),
+}
+RANKED_ORDERINGS = ('trending', 'popular')
+# Сортировка по релевантности, доступна только вместе с ?search=.
+RELEVANCE_ORDERING = ('-search_rank', 'id')
+SEARCH_PARAM = 'search'
+
+
+TAGS_MODES = (('any', 'any'), ('all', 'all'))
+FLAG_CHOICES = (('1', '1'), ('0', '0'))
+USER_FLAG_MODELS = {
+    'is_favorited': FavoritRecipes,
+    'is_in_shopping_cart': ShoppingCartRecipes,
+}
+
+
+class TagSlugListField(forms.Field):
+    """
+    Slug тегов из повторяющегося параметра запроса. Все slug
+    проверяются одним запросом к Tag, неизвестный slug - ошибка
+    формы (400), как у ModelMultipleChoiceFilter. Возвращает id тегов.
+    """
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        'invalid_choice': 'Select a valid choice. %(value)s is not one '
+                          'of the available choices.',
+    }
+
+    def to_python(self, value):
+        return list(dict.fromkeys(slug for slug in value or () if slug))
+
+    def clean(self, value):
+        slugs = super().clean(value)
+        if not slugs:
+            return []
+        tag_ids = dict(
+            Tag.objects.filter(slug__in=slugs).values_list('slug', 'id')
+        )
+        for slug in slugs:
+            if slug not in tag_ids:
+                raise forms.ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': slug}
+                )
+        return [tag_ids[slug] for slug in slugs]
+
+
+class TagSlugListFilter(rest_framework.Filter):
+    field_class = TagSlugListField
 
 
 class RecipeFilter(FilterSet):
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug'
+    """
+    ?tags= (несколько раз) - рецепты с любым (?tags_mode=any,
+    по умолчанию) или со всеми (?tags_mode=all) указанными тегами.
+    Теги проверяются подзапросом IN по таблице связи рецептов
+    с тегами, без JOIN в основном запросе, поэтому рецепты
+    не повторяются.
+    """
+    tags = TagSlugListFilter(method='filter_tags')
+    tags_mode = rest_framework.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='filter_tags_mode'
+    )
+    is_favorited = rest_framework.ChoiceFilter(
+        choices=FLAG_CHOICES,
+        method='filter_user_flag'
+    )
+    is_in_shopping_cart = rest_framework.ChoiceFilter(
+        choices=FLAG_CHOICES,
+        method='filter_user_flag'
     )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags')
+        fields = (
+            'author', 'tags', 'tags_mode', 'is_favorited',
+            'is_in_shopping_cart'
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(tag_id__in=value)
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            recipe_tags = recipe_tags.values('recipe').annotate(
+                matched=Count('tag')
+            ).filter(matched=len(value))
+        return queryset.filter(id__in=recipe_tags.values('recipe'))
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
+
+    def filter_user_flag(self, queryset, name, value):
+        """
+        ?is_favorited= и ?is_in_shopping_cart= (1 или 0) - условие
+        EXISTS/NOT EXISTS по связи текущего пользователя с рецептом
+        в основном запросе. Для анонимного пользователя не применяется.
+        """
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset
+        condition = Exists(USER_FLAG_MODELS[name].objects.filter(
+            user=user,
+            recipe=OuterRef('pk')
+        ))
+        if value == '0':
+            condition = ~condition
+        return queryset.annotate(
+            **{f'{name}_filter': condition}
+        ).filter(**{f'{name}_filter': True})
+
+
+def get_search_text(request):
+    return request.query_params.get(SEARCH_PARAM, '').strip()
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск ?search= по названию, ингредиентам и описанию."""
+
+    def filter_queryset(self, request, queryset, view):
+        text = get_search_text(request)
+        if not text:
+            return queryset
+        return search_recipes(queryset, text)
+
+
+class RecipeOrderingFilter(BaseFilterBackend):
+    """
+    Сортировка ?ordering=newest|trending|popular|cooking_time|relevance.
+    С ?search= по умолчанию рецепты сортируются по релевантности.
+    """
+    ordering_param = 'ordering'
+    default_ordering = 'newest'
 
+    def get_ordering_name(self, request):
+        searching = bool(get_search_text(request))
+        name = request.query_params.get(self.ordering_param) or (
+            'relevance' if searching else self.default_ordering
+        )
+        allowed = (*RECIPE_ORDERINGS, 'relevance') if searching else (
+            RECIPE_ORDERINGS
+        )
+        if name not in allowed:
+            raise ValidationError({
+                self.ordering_param: 'Allowed values: {}.'.format(
+                    ', '.join(allowed)
+                )
+            })
+        return name
 
-class CustomSearchFilter(filters.SearchFilter):
-    search_param = 'name'
+    def filter_queryset(self, request, queryset, view):
+        name = self.get_ordering_name(request)
+        if name == 'relevance':
+            return queryset.order_by(*RELEVANCE_ORDERING)
+        return queryset.order_by(*RECIPE_ORDERINGS[name])
@@ -0,0 +1,202 @@
+import os
+import struct
+import threading
+
+# Таблицы TrueType, нужные шрифту, встроенному в PDF (PDF 1.7, 9.9).
+EMBEDDED_TABLES = (b'cvt ', b'fpgm', b'glyf', b'head', b'hhea', b'hmtx',
+                   b'loca', b'maxp', b'prep')
+
+# Флаги компонента составного глифа.
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+def checksum(data):
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}L', data)) & 0xFFFFFFFF
+
+
+class TrueTypeFont:
+    """
+    Шрифт TrueType для встраивания в PDF без сторонних библиотек.
+
+    Читает из файла таблицу символов (cmap формата 4), ширины
+    и метрики и строит подмножество шрифта: глифы вне подмножества
+    становятся пустыми, номера глифов не меняются, поэтому в PDF
+    код символа - это номер глифа (Identity-H, CIDToGIDMap Identity).
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.tables = {}
+        count, = struct.unpack_from('>H', self.data, 4)
+        for index in range(count):
+            tag, _, offset, length = struct.unpack_from(
+                '>4sLLL', self.data, 12 + 16 * index
+            )
+            self.tables[tag] = self.data[offset:offset + length]
+        head = self.tables[b'head']
+        self.units_per_em, = struct.unpack_from('>H', head, 18)
+        self.bbox = struct.unpack_from('>4h', head, 36)
+        long_loca, = struct.unpack_from('>h', head, 50)
+        hhea = self.tables[b'hhea']
+        self.ascent, self.descent = struct.unpack_from('>hh', hhea, 4)
+        metrics_count, = struct.unpack_from('>H', hhea, 34)
+        self.glyph_count, = struct.unpack_from('>H', self.tables[b'maxp'], 4)
+        advances = struct.unpack_from(
+            '>' + 'Hxx' * metrics_count, self.tables[b'hmtx']
+        )
+        self.advances = advances + advances[-1:] * (
+            self.glyph_count - metrics_count
+        )
+        if long_loca:
+            self.loca = struct.unpack_from(
+                f'>{self.glyph_count + 1}L', self.tables[b'loca']
+            )
+        else:
+            self.loca = [offset * 2 for offset in struct.unpack_from(
+                f'>{self.glyph_count + 1}H', self.tables[b'loca']
+            )]
+        self.glyphs = self.read_cmap()
+
+    def read_cmap(self):
+        """Возвращает словарь символ -> номер глифа (Unicode BMP)."""
+        cmap = self.tables[b'cmap']
+        count, = struct.unpack_from('>H', cmap, 2)
+        for index in range(count):
+            platform, encoding, offset = struct.unpack_from(
+                '>HHL', cmap, 4 + 8 * index
+            )
+            if (platform, encoding) == (3, 1):
+                break
+        else:
+            raise ValueError(f'В шрифте {self.name} нет таблицы Unicode.')
+        format_, = struct.unpack_from('>H', cmap, offset)
+        if format_ != 4:
+            raise ValueError(f'Формат cmap {format_} не поддерживается.')
+        segments = struct.unpack_from('>H', cmap, offset + 6)[0] // 2
+        ends = offset + 14
+        starts = ends + 2 * segments + 2
+        deltas = starts + 2 * segments
+        ranges = deltas + 2 * segments
+        glyphs = {}
+        for segment in range(segments):
+            end, = struct.unpack_from('>H', cmap, ends + 2 * segment)
+            start, = struct.unpack_from('>H', cmap, starts + 2 * segment)
+            delta, = struct.unpack_from('>h', cmap, deltas + 2 * segment)
+            range_offset, = struct.unpack_from(
+                '>H', cmap, ranges + 2 * segment
+            )
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    position = (ranges + 2 * segment + range_offset
+                                + 2 * (code - start))
+                    glyph, = struct.unpack_from('>H', cmap, position)
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                else:
+                    glyph = (code + delta) & 0xFFFF
+                if glyph:
+                    glyphs[chr(code)] = glyph
+        return glyphs
+
+    def glyph(self, index):
+        return self.tables[b'glyf'][self.loca[index]:self.loca[index + 1]]
+
+    def components(self, index):
+        """Номера глифов, из которых состоит составной глиф."""
+        data = self.glyph(index)
+        if len(data) < 10 or struct.unpack_from('>h', data)[0] >= 0:
+            return []
+        result = []
+        position = 10
+        flags = MORE_COMPONENTS
+        while flags & MORE_COMPONENTS:
+            flags, component = struct.unpack_from('>HH', data, position)
+            result.append(component)
+            position += 4
+            position += 4 if flags & ARG_1_AND_2_ARE_WORDS else 2
+            if flags & WE_HAVE_A_SCALE:
+                position += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                position += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                position += 8
+        return result
+
+    def scale(self, value):
+        return round(value * 1000 / self.units_per_em)
+
+    def width(self, index):
+        return self.scale(self.advances[index])
+
+    def subset(self, indexes):
+        """
+        Файл шрифта только с глифами indexes (и их компонентами)
+        и таблицами EMBEDDED_TABLES.
+        """
+        keep = {0}
+        stack = list(indexes)
+        while stack:
+            index = stack.pop()
+            if index not in keep:
+                keep.add(index)
+                stack.extend(self.components(index))
+        glyf = bytearray()
+        loca = [0]
+        for index in range(self.glyph_count):
+            if index in keep:
+                data = self.glyph(index)
+                glyf += data + b'\0' * (-len(data) % 4)
+            loca.append(len(glyf))
+        head = bytearray(self.tables[b'head'])
+        head[8:12] = b'\0' * 4
+        head[50:52] = struct.pack('>h', 1)
+        tables = {
+            **{
+                tag: self.tables[tag] for tag in EMBEDDED_TABLES
+                if tag in self.tables
+            },
+            b'glyf': bytes(glyf),
+            b'head': bytes(head),
+            b'loca': struct.pack(f'>{len(loca)}L', *loca),
+        }
+        count = len(tables)
+        power = 1 << (count.bit_length() - 1)
+        header = struct.pack(
+            '>LHHHH', 0x00010000, count, power * 16,
+            power.bit_length() - 1, (count - power) * 16
+        )
+        directory = []
+        body = bytearray()
+        offset = len(header) + 16 * count
+        for tag in sorted(tables):
+            data = tables[tag]
+            if tag == b'head':
+                head_offset = offset + len(body)
+            directory.append(struct.pack(
+                '>4sLLL', tag, checksum(data), offset + len(body), len(data)
+            ))
+            body += data + b'\0' * (-len(data) % 4)
+        font = bytearray(header + b''.join(directory) + body)
+        adjustment = (0xB1B0AFBA - checksum(bytes(font))) & 0xFFFFFFFF
+        font[head_offset + 8:head_offset + 12] = struct.pack(
+            '>L', adjustment
+        )
+        return bytes(font)
+
+
+_fonts = {}
+_lock = threading.Lock()
+
+
+def get_font(path):
+    """Шрифт из файла path, прочитанный один раз на процесс."""
+    with _lock:
+        if path not in _fonts:
+            _fonts[path] = TrueTypeFont(path)
+        return _fonts[path]
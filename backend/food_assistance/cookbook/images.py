@@ -0,0 +1,208 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from cookbook.cache import response_cache
+from food_assistance.settings import (RECIPE_IMAGE_RENDITIONS,
+                                      RECIPE_IMAGE_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+# Расширение файла, формат Pillow и параметры сохранения.
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+FORMAT_KEYS = {'webp': 'webp', 'jpg': 'jpeg'}
+
+
+def rendition_name(image_name: str, size: str, extension: str) -> str:
+    """
+    Имя файла уменьшенной копии: вычисляется из имени оригинала,
+    поэтому для сериализации не нужны дополнительные запросы.
+    """
+    stem = os.path.splitext(image_name)[0]
+    return f'{RENDITIONS_DIR}/{stem}_{size}.{extension}'
+
+
+def rendition_names(image_name: str) -> list:
+    """Имена всех уменьшенных копий изображения."""
+    return [
+        rendition_name(image_name, size, extension)
+        for size in RECIPE_IMAGE_RENDITIONS
+        for extension, _, _ in FORMATS
+    ]
+
+
+def to_rgb(image):
+    """JPEG не поддерживает прозрачность: фон заливается белым."""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def render(image, bounds):
+    """Копия изображения, вписанная в bounds с сохранением пропорций."""
+    rendition = image.copy()
+    rendition.thumbnail(bounds, Image.LANCZOS)
+    return rendition
+
+
+def build_renditions(recipe_id: int, image_name: str = None,
+                     force: bool = False) -> bool:
+    """
+    Строит уменьшенные копии изображения рецепта во всех форматах
+    и отмечает их готовность в Recipe.image_renditions.
+    Копии хранятся рядом с блобом оригинала и, как и он, не меняются,
+    поэтому уже построенные копии (тот же файл в другом рецепте)
+    переиспользуются, если не задан force.
+    Возвращает False, если рецепт удалён или картинка уже заменена.
+    """
+    from cookbook.models import Recipe
+
+    recipe = Recipe.objects.filter(id=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return False
+    if image_name is not None and recipe.image.name != image_name:
+        return False
+    image_name = recipe.image.name
+    missing = [
+        (size, bounds, extension, image_format, options)
+        for size, bounds in RECIPE_IMAGE_RENDITIONS.items()
+        for extension, image_format, options in FORMATS
+        if force or not default_storage.exists(
+            rendition_name(image_name, size, extension)
+        )
+    ]
+    if missing:
+        largest = max(RECIPE_IMAGE_RENDITIONS.values())
+        with recipe.image.storage.open(image_name, 'rb') as source:
+            image = Image.open(source)
+            # Для JPEG декодер сразу уменьшает изображение в 2-8 раз.
+            image.draft('RGB', largest)
+            image = to_rgb(ImageOps.exif_transpose(image))
+        renditions = {}
+        for size, bounds, extension, image_format, options in missing:
+            if size not in renditions:
+                renditions[size] = render(image, bounds)
+            buffer = BytesIO()
+            renditions[size].save(buffer, image_format, **options)
+            name = rendition_name(image_name, size, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    if not Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        image_renditions=image_name,
+        updated=timezone.now()
+    ):
+        return False
+    response_cache.invalidate_object('recipes', recipe_id)
+    return True
+
+
+class RenditionPool:
+    """
+    Пул потоков для построения уменьшенных копий вне потока запроса.
+    workers=0 - построение синхронно в вызывающем потоке.
+    """
+    def __init__(self, workers: int = RECIPE_IMAGE_WORKERS) -> None:
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = set()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='recipe-images'
+                )
+            return self._executor
+
+    def run(self, recipe_id, image_name, force=False):
+        try:
+            return build_renditions(recipe_id, image_name, force)
+        except Exception:
+            logger.exception(f'Renditions for recipe {recipe_id} failed')
+            return False
+        finally:
+            if self.workers:
+                connection.close()
+
+    def submit(self, recipe_id: int, image_name: str,
+               force: bool = False) -> None:
+        if not self.workers:
+            self.run(recipe_id, image_name, force)
+            return
+        future = self.executor.submit(
+            self.run, recipe_id, image_name, force
+        )
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def wait(self) -> None:
+        """Ожидает завершения всех поставленных задач."""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+
+
+rendition_pool = RenditionPool()
+
+
+class RecipeImagesField(serializers.Field):
+    """
+    URL уменьшенных копий изображения рецепта:
+    {"thumbnail": {"webp": ..., "jpeg": ...}, "medium": {...}}.
+    Пока копии не построены, все URL указывают на оригинал.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, url):
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        image_name = recipe.image.name
+        ready = recipe.image_renditions == image_name
+        original = self.build_url(recipe.image.url)
+        return {
+            size: {
+                FORMAT_KEYS[extension]: (
+                    self.build_url(default_storage.url(
+                        rendition_name(image_name, size, extension)
+                    )) if ready else original
+                )
+                for extension, _, _ in FORMATS
+            }
+            for size in RECIPE_IMAGE_RENDITIONS
+        }
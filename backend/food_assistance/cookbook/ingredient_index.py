@@ -0,0 +1,112 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from cookbook.models import Ingredient
+from food_assistance.settings import INGREDIENT_INDEX_TTL
+
+MAX_CHAR = chr(0x10FFFF)
+SEPARATOR = '\n'
+# При большом числе вхождений проход по всем названиям дешевле поиска
+# каждого вхождения по отдельности.
+DENSE_MATCHES_RATIO = 8
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит название к виду для поиска без учёта регистра:
+    casefold корректно работает с кириллицей, «ё» приравнивается к «е».
+    """
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Процессный индекс названий ингредиентов для автодополнения.
+
+    Хранит отсортированный массив нормализованных названий и отвечает
+    на запросы по префиксу бинарным поиском, не обращаясь к БД.
+    Индекс строится при первом обращении, сбрасывается сигналами
+    при изменении Ingredient и перестраивается не реже чем раз
+    в INGREDIENT_INDEX_TTL секунд, чтобы изменения из других
+    процессов не терялись.
+    """
+    def __init__(self, ttl: int = INGREDIENT_INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self) -> None:
+        """Помечает индекс устаревшим."""
+        self._state = None
+
+    def build(self):
+        """Загружает ингредиенты из БД и строит индекс."""
+        items = list(
+            Ingredient.objects.order_by('id').values(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        ordered = sorted(
+            ((normalize(item['name']), item['id'], item) for item in items),
+            key=lambda entry: entry[:2]
+        )
+        keys = [key for key, _, _ in ordered]
+        starts = []
+        offset = 0
+        for key in keys:
+            starts.append(offset)
+            offset += len(key) + 1
+        state = (
+            keys,
+            [item for _, _, item in ordered],
+            items,
+            time.monotonic(),
+            SEPARATOR.join(keys),
+            starts
+        )
+        self._state = state
+        return state
+
+    def is_stale(self, state) -> bool:
+        return state is None or time.monotonic() - state[3] > self.ttl
+
+    def get_state(self):
+        """Возвращает актуальное состояние индекса."""
+        if self.is_stale(self._state):
+            with self._lock:
+                if self.is_stale(self._state):
+                    return self.build()
+        return self._state
+
+    def search(self, name: str) -> list:
+        """
+        Ингредиенты, название которых начинается с name,
+        а за ними - содержащие name в середине названия.
+        """
+        keys, items, all_items, _, haystack, starts = self.get_state()
+        query = normalize(name)
+        if not query:
+            return list(all_items)
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + MAX_CHAR, start)
+        matches = items[start:end]
+        if SEPARATOR in query:
+            return matches
+        if haystack.count(query) * DENSE_MATCHES_RATIO > len(keys):
+            return matches + [
+                item for key, item in zip(keys, items)
+                if query in key and not key.startswith(query)
+            ]
+        position = haystack.find(query)
+        while position != -1:
+            number = bisect_right(starts, position) - 1
+            if starts[number] != position:
+                matches.append(items[number])
+            if number + 1 == len(starts):
+                break
+            position = haystack.find(query, starts[number + 1])
+        return matches
+
+
+ingredient_index = IngredientIndex()
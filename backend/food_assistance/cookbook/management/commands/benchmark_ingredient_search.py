@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from cookbook.ingredient_index import IngredientIndex
+from cookbook.models import Ingredient
+from cookbook.serializers import IngredientSerializer
+from cookbook.utils import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение задержек поиска ингредиентов по префиксу: '
+        'ORM (ILIKE) и процессный индекс'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--queries', type=int, default=1000,
+            help='Количество запросов для каждого способа'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed для выбора префиксов'
+        )
+
+    def handle(self, *args, **kwargs):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            self.stderr.write('Нет ингредиентов для замера.')
+            return
+        rnd = random.Random(kwargs['seed'])
+        prefixes = [
+            name[:rnd.randint(1, min(4, len(name)))]
+            for name in rnd.choices(names, k=kwargs['queries'])
+        ]
+        index = IngredientIndex()
+        index.build()
+        self.report('orm', prefixes, self.orm_search)
+        self.report('index', prefixes, index.search)
+
+    def orm_search(self, prefix):
+        return IngredientSerializer(
+            Ingredient.objects.filter(name__istartswith=prefix),
+            many=True
+        ).data
+
+    def report(self, label, prefixes, search):
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            search(prefix)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        timings.sort()
+        self.stdout.write(
+            f'{label}: p50={percentile(timings, 50):.1f}us '
+            f'p99={percentile(timings, 99):.1f}us'
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from cookbook.images import RenditionPool
+from cookbook.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Построение уменьшенных копий (WebP и JPEG) для изображений '
+        'рецептов, у которых их ещё нет'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить копии для всех рецептов'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков, 0 - в текущем потоке'
+        )
+
+    def handle(self, *args, **kwargs):
+        recipes = Recipe.objects.exclude(image='')
+        if not kwargs['all']:
+            recipes = recipes.exclude(image_renditions=F('image'))
+        recipes = list(recipes.values_list('id', 'image'))
+        started = time.monotonic()
+        pool = RenditionPool(workers=max(kwargs['workers'], 0))
+        for recipe_id, image_name in recipes:
+            pool.submit(recipe_id, image_name, force=kwargs['all'])
+        pool.wait()
+        built = Recipe.objects.filter(
+            id__in=[recipe_id for recipe_id, _ in recipes],
+            image_renditions=F('image')
+        ).count()
+        self.stdout.write(
+            f'built: {built}, failed: {len(recipes) - built}, '
+            f'elapsed: {time.monotonic() - started:.2f}s'
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from cookbook.shopping_list import reconcile_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка списков покупок с полной агрегацией ингредиентов '
+        'рецептов в корзинах'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Исправить найденные расхождения'
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Проверить только этого пользователя (можно несколько)'
+        )
+
+    def handle(self, *args, **kwargs):
+        result = reconcile_shopping_lists(
+            dry_run=not kwargs['fix'],
+            user_ids=kwargs['users']
+        )
+        prefix = 'fixed' if kwargs['fix'] else 'drifted'
+        self.stdout.write(
+            f'{prefix}: missing {result["missing"]}, '
+            f'extra {result["extra"]}, wrong {result["wrong"]}, '
+            f'users {result["users"]}'
+        )
@@ -0,0 +1,128 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from cookbook.images import rendition_names
+from cookbook.models import MediaBlob, Recipe
+from cookbook.storage import recipe_image_storage
+from food_assistance.settings import MEDIA_BLOB_DIR, MEDIA_GC_GRACE
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление изображений рецептов, на которые не ссылается '
+        'ни один рецепт, вместе с их уменьшенными копиями'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--grace', type=int, default=MEDIA_GC_GRACE,
+            help='Удалять только файлы без ссылок старше стольких секунд'
+        )
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help='Пересчитать число ссылок по таблице рецептов'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено'
+        )
+
+    def handle(self, *args, **kwargs):
+        self.dry_run = kwargs['dry_run']
+        self.cutoff = time.time() - kwargs['grace']
+        self.removed = 0
+        self.freed = 0
+        if kwargs['reconcile']:
+            self.reconcile()
+        self.collect_released(timezone.now() - timedelta(
+            seconds=kwargs['grace']
+        ))
+        self.collect_untracked()
+        prefix = 'would remove' if self.dry_run else 'removed'
+        self.stdout.write(
+            f'{prefix}: {self.removed}, freed: {self.freed} bytes'
+        )
+
+    def reconcile(self):
+        """Приводит MediaBlob.refcount к фактическому числу рецептов."""
+        counts = dict(
+            Recipe.objects.exclude(image='').values_list('image').annotate(
+                Count('id')
+            ).order_by()
+        )
+        blobs = MediaBlob.objects.in_bulk(field_name='name')
+        changed = []
+        for name, blob in blobs.items():
+            refcount = counts.pop(name, 0)
+            if blob.refcount != refcount:
+                blob.refcount = refcount
+                blob.updated = timezone.now()
+                changed.append(blob)
+        if self.dry_run:
+            return
+        MediaBlob.objects.bulk_update(changed, ('refcount', 'updated'))
+        MediaBlob.objects.bulk_create(
+            MediaBlob(name=name, refcount=refcount)
+            for name, refcount in counts.items()
+        )
+
+    def is_expired(self, name):
+        try:
+            modified = recipe_image_storage.get_modified_time(name)
+        except FileNotFoundError:
+            return True
+        return modified.timestamp() < self.cutoff
+
+    def remove(self, name):
+        """Удаляет блоб и его уменьшенные копии."""
+        for storage, file_name in (
+            (recipe_image_storage, name),
+            *((default_storage, rendition) for rendition in
+              rendition_names(name))
+        ):
+            if not storage.exists(file_name):
+                continue
+            self.freed += storage.size(file_name)
+            if not self.dry_run:
+                storage.delete(file_name)
+        self.removed += 1
+
+    def collect_released(self, updated_before):
+        """Блобы, на которые давно нет ссылок."""
+        for blob in MediaBlob.objects.filter(
+            refcount=0,
+            updated__lt=updated_before
+        ):
+            if not self.is_expired(blob.name):
+                continue
+            if self.dry_run:
+                self.remove(blob.name)
+                continue
+            # Блоб мог снова понадобиться после выборки.
+            if MediaBlob.objects.filter(id=blob.id, refcount=0).delete()[0]:
+                self.remove(blob.name)
+
+    def collect_untracked(self):
+        """
+        Файлы блобов без записи MediaBlob и без рецепта: загрузки,
+        транзакция которых была отменена, и незавершённые временные
+        файлы.
+        """
+        root = recipe_image_storage.path(MEDIA_BLOB_DIR)
+        if not os.path.isdir(root):
+            return
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        known.update(Recipe.objects.values_list('image', flat=True))
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(
+                    path, recipe_image_storage.location
+                ).replace(os.sep, '/')
+                if name not in known and self.is_expired(name):
+                    self.remove(name)
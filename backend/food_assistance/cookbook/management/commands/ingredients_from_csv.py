@@ -1,10 +1,18 @@
+import io
 import os
+import sys
 import logging
+import time
 from csv import DictReader
+from itertools import islice
 from logging.handlers import RotatingFileHandler
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from cookbook.cache import response_cache
+from cookbook.ingredient_index import ingredient_index
 from cookbook.models import Ingredient
+from cookbook.toggles import can_return_rows
 
 from food_assistance.settings import BASE_DIR
 
@@ -27,12 +35,37 @@ LOG_STATUS = {
     'default': logging.ERROR
 }
 
+DEFAULT_CHUNK_SIZE = 5000
+CSV_COLUMNS = ('name', 'measurement_unit')
+
+
+def chunked(rows, size):
+    """Разбивает итератор строк на списки длиной не более size."""
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
 
 class Command(BaseCommand):
-    help = 'Копирование ингредиентов из csv'
+    help = (
+        'Копирование ингредиентов из csv. '
+        'Повторный запуск пропускает уже существующие ингредиенты.'
+    )
     shift_path = os.path.join(BASE_DIR, 'static_web')
 
     def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(self.shift_path, 'ingredients.csv'),
+            help='Путь к csv-файлу с колонками name,measurement_unit '
+                 'или "-" для чтения из stdin'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк в одной пачке вставки'
+        )
         parser.add_argument(
             '-log_level', type=str,
             help='Режим логгирования'
@@ -40,29 +73,103 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         """Основная функция выполнения команды."""
-        print('start inserts')
         log_level = kwargs.get('log_level')
-        print('log_level', log_level)
         if log_level and log_level.lower() in (LOG_STATUS):
             logger.setLevel(LOG_STATUS[log_level.lower()])
         else:
             logger.setLevel(LOG_STATUS['default'])
-        self.insert_ingredient()
-        print('stop inserts')
+        chunk_size = kwargs['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size должен быть больше 0.')
+        path = kwargs['path']
+        started = time.monotonic()
+        if path == '-':
+            csv_file = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+            inserted, total = self.insert_ingredients(csv_file, chunk_size)
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    inserted, total = self.insert_ingredients(f, chunk_size)
+            except FileNotFoundError:
+                raise CommandError(f'Файл {path} не найден.')
+        if inserted:
+            # Вставка пачками не отправляет post_save, сигналы
+            # не сбрасывают индекс и кэш ответов.
+            ingredient_index.invalidate()
+            response_cache.invalidate_group('ingredients')
+            response_cache.invalidate_group('recipes')
+        elapsed = time.monotonic() - started
+        logger.info(f'{path}: {inserted} inserted, {total - inserted} skipped')
+        self.stdout.write(
+            f'inserted: {inserted}, skipped: {total - inserted}, '
+            f'elapsed: {elapsed:.2f}s'
+        )
 
-    def insert_ingredient(self):
-        """Вставка данных в модель Ingredient."""
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'ingredients.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    Ingredient.objects.create(**row)
-                    logger.info('row inserts in database')
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+    def insert_ingredients(self, csv_file, chunk_size):
+        """
+        Вставка данных в модель Ingredient пачками.
+        Конфликты по uniq_name-measurement_unit_pair пропускаются
+        (INSERT ... ON CONFLICT DO NOTHING), поэтому команда идемпотентна.
+        Возвращает число вставленных и число прочитанных строк.
+        """
+        reader = DictReader(csv_file)
+        missing = [
+            column for column in CSV_COLUMNS
+            if column not in (reader.fieldnames or ())
+        ]
+        if missing:
+            raise CommandError(
+                f'В файле нет колонок: {", ".join(missing)}.'
+            )
+        using = router.db_for_write(Ingredient)
+        # Не больше параметров в запросе, чем допускает СУБД
+        # (SQLite - 999).
+        chunk_size = min(chunk_size, connections[using].ops.bulk_batch_size(
+            CSV_COLUMNS, range(chunk_size)
+        ))
+        inserted = 0
+        total = 0
+        for chunk in chunked(reader, chunk_size):
+            inserted += self.insert_chunk(using, list(dict.fromkeys(
+                (row['name'], row['measurement_unit']) for row in chunk
+            )))
+            total += len(chunk)
+            logger.debug(f'{total} rows processed')
+        return inserted, total
+
+    def insert_chunk(self, using, pairs):
+        """
+        Вставляет пары (название, единица) и возвращает число
+        вставленных строк. Оно берётся из RETURNING самого INSERT,
+        поэтому одновременные записи, в том числе другой импорт,
+        его не искажают. Без RETURNING строки считаются COUNT(*)
+        до и после вставки в одной транзакции.
+        """
+        connection = connections[using]
+        if not can_return_rows(connection):
+            with transaction.atomic(using=using):
+                count_before = Ingredient.objects.using(using).count()
+                Ingredient.objects.using(using).bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in pairs
+                    ),
+                    ignore_conflicts=True
+                )
+                return (
+                    Ingredient.objects.using(using).count() - count_before
+                )
+        quote_name = connection.ops.quote_name
+        opts = Ingredient._meta
+        columns = ', '.join(
+            quote_name(opts.get_field(name).column) for name in CSV_COLUMNS
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote_name(opts.db_table)} ({columns}) '
+                f'VALUES {", ".join(["(%s, %s)"] * len(pairs))} '
+                f'ON CONFLICT DO NOTHING '
+                f'RETURNING {quote_name(opts.pk.column)}',
+                [value for pair in pairs for value in pair]
+            )
+            return len(cursor.fetchall())
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from cookbook.utils import percentile
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=%D1%81',
+    '/api/recipes/?page=1&limit=6',
+)
+DOWNLOAD_PATH = '/api/recipes/download_shopping_cart/?format=txt'
+UPLOAD_PATH = '/api/recipes/'
+READ_SIZE = 16 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного API: пропускная способность '
+        'и задержки для одной или нескольких конфигураций сервера '
+        '(например, gunicorn с sync-воркерами и ASGI), в том числе '
+        'при медленных клиентах'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='Сервер в виде имя=http://host:port, можно несколько'
+        )
+        parser.add_argument(
+            '--path', action='append',
+            help='Путь запроса, можно несколько (по умолчанию теги, '
+                 'ингредиенты, рецепты и список покупок с --token)'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Число одновременных клиентов'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=20,
+            help='Длительность теста для каждого сервера, в секундах'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для списка покупок и медленных клиентов'
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Число медленных клиентов: загрузка картинки рецепта '
+                 'и скачивание списка покупок со скоростью --slow-rate'
+        )
+        parser.add_argument(
+            '--slow-rate', type=int, default=4096,
+            help='Скорость медленного клиента, байт в секунду'
+        )
+        parser.add_argument(
+            '--slow-bytes', type=int, default=256 * 1024,
+            help='Размер тела запроса медленного клиента, в байтах'
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['slow_clients'] and not kwargs['token']:
+            raise CommandError('--slow-clients requires --token.')
+        paths = kwargs['path'] or list(DEFAULT_PATHS)
+        if kwargs['token'] and not kwargs['path']:
+            paths.append(DOWNLOAD_PATH)
+        self.token = kwargs['token']
+        self.slow_rate = kwargs['slow_rate']
+        self.slow_bytes = kwargs['slow_bytes']
+        for target in kwargs['target']:
+            name, separator, url = target.partition('=')
+            if not separator:
+                raise CommandError(f'Bad --target {target!r}.')
+            address = urlsplit(url)
+            timings, errors = asyncio.run(self.run(
+                (address.hostname, address.port or 80),
+                paths,
+                kwargs['concurrency'],
+                kwargs['slow_clients'],
+                kwargs['duration']
+            ))
+            self.report(name, timings, errors, kwargs['duration'])
+
+    def build_request(self, method, path, body=b''):
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            'Host: localhost',
+            'Connection: close',
+            'Accept: */*',
+        ]
+        if self.token:
+            lines.append(f'Authorization: Token {self.token}')
+        if body:
+            lines.append('Content-Type: application/json')
+            lines.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    async def fetch(self, address, path, method='GET', body=b'', rate=None):
+        """Выполняет запрос и возвращает код ответа."""
+        reader, writer = await asyncio.open_connection(*address)
+        try:
+            writer.write(self.build_request(method, path, body))
+            step = max(1, rate // 10) if rate else len(body) or 1
+            for start in range(0, len(body), step):
+                writer.write(body[start:start + step])
+                await writer.drain()
+                if rate:
+                    await asyncio.sleep(0.1)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError('Empty response.')
+            chunk = await reader.read(READ_SIZE)
+            while chunk:
+                if rate:
+                    await asyncio.sleep(len(chunk) / rate)
+                chunk = await reader.read(READ_SIZE)
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    async def client(self, address, paths, deadline, timings, errors):
+        number = 0
+        while time.monotonic() < deadline:
+            path = paths[number % len(paths)]
+            number += 1
+            start = time.perf_counter()
+            try:
+                status = await self.fetch(address, path)
+            except (OSError, ValueError, IndexError):
+                errors.append(path)
+                continue
+            if status >= 500:
+                errors.append(path)
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+
+    async def slow_client(self, address, deadline):
+        """
+        Медленный клиент: по очереди загружает рецепт с картинкой
+        base64 и скачивает список покупок со скоростью slow_rate.
+        """
+        body = json.dumps({
+            'name': 'load test',
+            'text': 'load test',
+            'cooking_time': 1,
+            'tags': [],
+            'ingredients': [],
+            'image': 'data:image/png;base64,' + 'A' * self.slow_bytes,
+        }).encode()
+        upload = True
+        while time.monotonic() < deadline:
+            try:
+                if upload:
+                    await self.fetch(
+                        address, UPLOAD_PATH, 'POST', body, self.slow_rate
+                    )
+                else:
+                    await self.fetch(
+                        address, DOWNLOAD_PATH, rate=self.slow_rate
+                    )
+            except (OSError, ValueError, IndexError):
+                await asyncio.sleep(0.1)
+            upload = not upload
+
+    async def run(self, address, paths, concurrency, slow_clients,
+                  duration):
+        deadline = time.monotonic() + duration
+        timings = []
+        errors = []
+        slow = [
+            asyncio.ensure_future(self.slow_client(address, deadline))
+            for _ in range(slow_clients)
+        ]
+        await asyncio.gather(*(
+            self.client(address, paths, deadline, timings, errors)
+            for _ in range(concurrency)
+        ))
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return sorted(timings), errors
+
+    def report(self, name, timings, errors, duration):
+        if not timings:
+            self.stdout.write(f'{name}: no successful requests, '
+                              f'errors={len(errors)}')
+            return
+        self.stdout.write(
+            f'{name}: requests={len(timings)} '
+            f'rps={len(timings) / duration:.1f} errors={len(errors)} '
+            f'p50={percentile(timings, 50):.1f}ms '
+            f'p95={percentile(timings, 95):.1f}ms '
+            f'p99={percentile(timings, 99):.1f}ms '
+            f'max={timings[-1]:.1f}ms'
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cookbook.cache import response_cache
+from cookbook.conditional import touch_recipes_ranked
+from cookbook.trending import recompute_trending
+from food_assistance.settings import TRENDING_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт рейтинга trending для рецептов, которые добавляли '
+        'в избранное или корзину после предыдущего запуска'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать рейтинг всех рецептов'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRENDING_BATCH_SIZE,
+            help='Количество рецептов в одном запросе'
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        recomputed = recompute_trending(
+            recompute_all=kwargs['all'],
+            batch_size=max(kwargs['batch_size'], 1)
+        )
+        if recomputed:
+            response_cache.invalidate_lists('recipes')
+            touch_recipes_ranked()
+        self.stdout.write(
+            f'recomputed: {recomputed}, '
+            f'elapsed: {time.monotonic() - started:.2f}s'
+        )
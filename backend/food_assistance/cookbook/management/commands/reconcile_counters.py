@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from cookbook.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка денормализованных счётчиков (избранное, список покупок, '
+        'рецепты и подписчики автора) с фактическими данными'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число расхождений'
+        )
+
+    def handle(self, *args, **kwargs):
+        fixed = reconcile_counters(dry_run=kwargs['dry_run'])
+        prefix = 'drifted' if kwargs['dry_run'] else 'fixed'
+        for label, count in fixed.items():
+            self.stdout.write(f'{label}: {prefix} {count}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from cookbook.cache import response_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Счётчики попаданий и промахов кэша ответов API '
+        '(общие для процессов только при разделяемом бэкенде кэша)'
+    )
+
+    def handle(self, *args, **kwargs):
+        stats = response_cache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f"hits: {stats['hits']}, misses: {stats['misses']}, "
+            f'hit ratio: {ratio:.2%}'
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_created(apps, schema_editor):
+    Recipe = apps.get_model('cookbook', 'Recipe')
+    Recipe.objects.update(updated=models.F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0002_auto_20220617_1344'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
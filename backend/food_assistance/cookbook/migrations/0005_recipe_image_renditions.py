@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0004_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.CharField(blank=True, editable=False, help_text='Имя изображения, для которого готовы уменьшенные копии', max_length=100, verbose_name='Уменьшенные копии построены для'),
+        ),
+    ]
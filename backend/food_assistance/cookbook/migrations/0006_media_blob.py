@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+import cookbook.models
+import cookbook.storage
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def count_references(apps, schema_editor):
+    Recipe = apps.get_model('cookbook', 'Recipe')
+    MediaBlob = apps.get_model('cookbook', 'MediaBlob')
+    MediaBlob.objects.bulk_create(
+        MediaBlob(name=row['image'], refcount=row['refcount'])
+        for row in Recipe.objects.exclude(image='').values('image').annotate(
+            refcount=models.Count('id')
+        ).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0005_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Имя файла')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Файл изображения',
+                'verbose_name_plural': 'Файлы изображений',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(help_text='Изображение для рецепта', storage=cookbook.storage.ContentAddressedStorage(), upload_to=cookbook.models.get_img_path, verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    # Миграция не импортирует код приложения: счётчики заполняются
+    # подзапросами с фактическим числом связанных строк.
+    recipe = apps.get_model('cookbook', 'Recipe')
+    user = apps.get_model('users', 'User')
+    using = schema_editor.connection.alias
+    counters = (
+        (recipe, 'favorites_count',
+         apps.get_model('cookbook', 'FavoritRecipes'), 'recipe'),
+        (recipe, 'cart_count',
+         apps.get_model('cookbook', 'ShoppingCartRecipes'), 'recipe'),
+        (user, 'recipes_count', recipe, 'author'),
+        (user, 'followers_count', apps.get_model('users', 'Follow'), 'author'),
+    )
+    for model, field, related_model, related_field in counters:
+        model.objects.using(using).update(**{field: Coalesce(
+            models.Subquery(
+                related_model.objects.filter(
+                    **{related_field: models.OuterRef('pk')}
+                ).order_by().values(related_field).annotate(
+                    total=models.Count('pk')
+                ).values('total'),
+                output_field=models.IntegerField()
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0006_media_blob'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число пользователей, добавивших рецепт в корзину', verbose_name='В корзине'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число пользователей, добавивших рецепт в избранное', verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favoritrecipes',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='activity',
+            field=models.DateTimeField(editable=False, help_text='Последнее добавление или удаление из избранного или корзины', null=True, verbose_name='Последняя активность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, help_text='Затухающая сумма добавлений в избранное и корзину', verbose_name='Рейтинг trending'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_updated',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Рейтинг пересчитан'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcartrecipes',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', 'id'], name='recipe_trending_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', 'id'], name='recipe_popular_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', 'id'], name='recipe_cooking_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['activity'], name='recipe_activity_idx'),
+        ),
+    ]
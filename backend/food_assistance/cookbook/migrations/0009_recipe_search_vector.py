@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+INDEX_NAME = 'recipe_search_vector_idx'
+# Конфигурации на момент миграции, дальше вектор ведут сигналы.
+SEARCH_CONFIGS = ('russian', 'english')
+
+
+def fill_search_vectors(apps, schema_editor):
+    """
+    Вектор рецепта: название (вес A), ингредиенты (B) и описание (C).
+    Миграция не импортирует код приложения (cookbook.search).
+    """
+    # Агрегаты django.contrib.postgres требуют psycopg2.
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    recipe = apps.get_model('cookbook', 'Recipe')
+    recipe_ingredients = apps.get_model('cookbook', 'RecipeIngredients')
+    names = models.Subquery(
+        recipe_ingredients.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names'),
+        output_field=models.TextField()
+    )
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for expression, weight in (
+            (models.F('name'), 'A'), (names, 'B'), (models.F('text'), 'C')
+        ):
+            part = SearchVector(expression, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    recipe.objects.using(schema_editor.connection.alias).update(
+        search_vector=vector
+    )
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Индекс GIN создаётся только на PostgreSQL, поэтому его нет
+    в Recipe.Meta.indexes: тесты на SQLite применяют те же миграции.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX_NAME} ON cookbook_recipe '
+        'USING gin (search_vector)'
+    )
+    fill_search_vectors(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0008_recipe_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Название, ингредиенты и описание для полнотекстового поиска (только PostgreSQL)', null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Составной индекс (tag_id, recipe_id) на автоматической таблице
+    связи Recipe.tags: фильтр ?tags= выбирает id рецептов по тегам
+    только из индекса. Meta у автоматической таблицы связи нет,
+    поэтому индекс создаётся SQL-запросом.
+    """
+
+    dependencies = [
+        ('cookbook', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON cookbook_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipe_tags_tag_recipe_idx'
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    # Миграция не импортирует код приложения: списки покупок
+    # собираются агрегацией ингредиентов рецептов в корзинах.
+    cart = apps.get_model('cookbook', 'ShoppingCartRecipes')
+    item = apps.get_model('cookbook', 'ShoppingListItem')
+    using = schema_editor.connection.alias
+    rows = cart.objects.using(using).filter(
+        recipe__igredients_in_recipe__isnull=False
+    ).values_list(
+        'user_id', 'recipe__igredients_in_recipe__ingredient_id'
+    ).annotate(
+        models.Sum('recipe__igredients_in_recipe__amount')
+    ).order_by()
+    item.objects.using(using).bulk_create(
+        (
+            item(user_id=user_id, ingredient_id=ingredient_id, amount=amount)
+            for user_id, ingredient_id, amount in rows.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cookbook', '0010_recipe_tags_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(help_text='Суммарное количество ингредиента в корзине', verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(help_text='Ингредиент', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cookbook.Ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(help_text='Владелец списка покупок', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Владелец списка')),
+            ],
+            options={
+                'verbose_name': 'Строка списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,26 @@
-from datetime import datetime
-
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import RowNumber
 from django.db.models.fields.related import ForeignKey
+from django.utils import timezone
 
+from cookbook.counters import DerivedFieldsMixin
+from cookbook.storage import recipe_image_storage
 from food_assistance.settings import (MINIMUM_AMOUNT_OF_INGREDIENT,
                                       MINIMUM_COOKING_TIME)
-from users.models import User
+from users.models import Follow, User
 
 
 def get_img_path(instanse: 'Recipe', filename: str) -> str:
     """
-    Возвращает путь до изображения для Recipe.image.
+    Возвращает имя загружаемого изображения для Recipe.image.
+    Итоговый путь определяется содержимым файла
+    (см. ContentAddressedStorage), из имени берётся расширение.
     """
-    timestamp = str(int(datetime.timestamp(datetime.now())))
-    return timestamp + filename
+    return filename
 
 
 class Tag(models.Model):
@@ -78,8 +84,98 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet рецептов с общим планом загрузки для RecipesSerializer."""
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует флаги is_favorited и is_in_shopping_cart
+        подзапросами EXISTS в основном запросе.
+        Для анонимного пользователя флаги - константа False.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                FavoritRecipes.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCartRecipes.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )
+            )
+        )
+
+    def with_related(self, user):
+        """
+        Подгружает всё, что читает RecipesSerializer, за фиксированное
+        число запросов независимо от размера страницы.
+        """
+        queryset = self.with_user_flags(user).prefetch_related(
+            'tags',
+            Prefetch(
+                'igredients_in_recipe',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+        if not user.is_authenticated:
+            return queryset.select_related('author')
+        return queryset.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=User.objects.annotate(
+                    is_subscribed=Exists(
+                        Follow.objects.filter(
+                            user=user,
+                            author=OuterRef('pk')
+                        )
+                    )
+                )
+            )
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """
+        Последние рецепты авторов author_ids, не более limit на автора,
+        одним запросом с оконной функцией ROW_NUMBER().
+        """
+        queryset = self.filter(author__in=author_ids)
+        if limit is None:
+            return list(queryset.order_by('author', '-created', '-id'))
+        if limit == 0 or not author_ids:
+            return []
+        ranked = queryset.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created').desc(), F('id').desc())
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        return list(self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            'WHERE ranked.recipe_rank <= %s '
+            'ORDER BY ranked.author_id, ranked.recipe_rank',
+            (*params, limit)
+        ))
+
+
+class Recipe(DerivedFieldsMixin, models.Model):
     """Модель рецепта."""
+    derived_fields = (
+        'favorites_count', 'cart_count', 'trending_score', 'activity',
+        'trending_updated', 'image_renditions', 'search_vector'
+    )
+
     tags = models.ManyToManyField(
         Tag,
         related_name='recipes_by_tag',
@@ -113,8 +209,16 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to=get_img_path,
+        storage=recipe_image_storage,
         help_text='Изображение для рецепта'
     )
+    image_renditions = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии построены для',
+        help_text='Имя изображения, для которого готовы уменьшенные копии'
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления, мин.',
         help_text='Введите время приготовления (в минутах)',
@@ -124,11 +228,77 @@ class Recipe(models.Model):
         'Дата создания',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+        help_text='Число пользователей, добавивших рецепт в избранное'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзине',
+        help_text='Число пользователей, добавивших рецепт в корзину'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Рейтинг trending',
+        help_text='Затухающая сумма добавлений в избранное и корзину'
+    )
+    activity = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='Последняя активность',
+        help_text='Последнее добавление или удаление из избранного '
+                  'или корзины'
+    )
+    trending_updated = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='Рейтинг пересчитан'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+        help_text='Название, ингредиенты и описание для полнотекстового '
+                  'поиска (только PostgreSQL)'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-created',)
+        ordering = ('-created', 'id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-created', 'id'),
+                name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=('-trending_score', 'id'),
+                name='recipe_trending_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', 'id'),
+                name='recipe_popular_id_idx'
+            ),
+            models.Index(
+                fields=('cooking_time', 'id'),
+                name='recipe_cooking_time_id_idx'
+            ),
+            models.Index(
+                fields=('activity',),
+                name='recipe_activity_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return f'Рецепт "{self.name}" автора {self.author}'
@@ -180,6 +350,10 @@ class FavoritRecipes(models.Model):
         verbose_name='Рецепт',
         help_text='Избранный рецепт'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -211,6 +385,10 @@ class ShoppingCartRecipes(models.Model):
         verbose_name='Рецепт',
         help_text='Рецепт в корзину'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт в корзине'
@@ -224,3 +402,92 @@ class ShoppingCartRecipes(models.Model):
 
     def __str__(self) -> str:
         return f'{self.recipe} в корзине у {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Строка списка покупок пользователя: суммарное количество
+    ингредиента по рецептам в корзине. Ведётся приращениями
+    (cookbook.shopping_list), сверяется командой check_shopping_lists.
+    """
+    user = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Владелец списка',
+        help_text='Владелец списка покупок'
+    )
+    ingredient = ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент',
+        help_text='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
+        help_text='Суммарное количество ингредиента в корзине'
+    )
+
+    class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.ingredient} - {self.amount} у {self.user}'
+
+
+class MediaBlobQuerySet(models.QuerySet):
+    def acquire(self, name: str) -> None:
+        """
+        Увеличивает число ссылок на блоб. Запись создаётся
+        INSERT ... ON CONFLICT DO NOTHING, поэтому конкурентные
+        загрузки одного файла не конфликтуют.
+        """
+        self.bulk_create((self.model(name=name),), ignore_conflicts=True)
+        self.filter(name=name).update(
+            refcount=F('refcount') + 1,
+            updated=timezone.now()
+        )
+
+    def release(self, name: str) -> None:
+        """Уменьшает число ссылок на блоб."""
+        self.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1,
+            updated=timezone.now()
+        )
+
+
+class MediaBlob(models.Model):
+    """
+    Файл изображения в хранилище и число рецептов, которые на него
+    ссылаются. Блобы без ссылок удаляет команда gc_media.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Имя файла'
+    )
+    refcount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        default=timezone.now
+    )
+
+    objects = MediaBlobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.refcount})'
@@ -0,0 +1,49 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+
+from food_assistance.settings import RECIPE_JSON_MAX_BYTES
+
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body is too large.'
+    default_code = 'request_entity_too_large'
+
+
+class LimitedStream:
+    """Поток, который прерывает чтение после max_bytes байт."""
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.remaining = max_bytes
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.remaining + 1
+        data = self.stream.read(min(size, self.remaining + 1))
+        self.remaining -= len(data)
+        if self.remaining < 0:
+            raise RequestEntityTooLarge
+        return data
+
+
+class LimitedJSONParser(JSONParser):
+    """
+    JSONParser с ограничением размера тела запроса: слишком большое
+    тело отклоняется по Content-Length до чтения, а без него -
+    как только прочитано больше max_bytes байт.
+    """
+    max_bytes = RECIPE_JSON_MAX_BYTES
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        if request is not None:
+            try:
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+            if length > self.max_bytes:
+                raise RequestEntityTooLarge
+        if stream is not None:
+            stream = LimitedStream(stream, self.max_bytes)
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,264 @@
+import csv
+import json
+import zlib
+
+from rest_framework.renderers import BaseRenderer
+
+from cookbook.fonts import get_font
+from food_assistance.settings import SHOPPING_LIST_PDF_FONT
+
+# Записей в одном блоке bfchar CMap ToUnicode, не больше 100.
+TO_UNICODE_BLOCK = 100
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку."""
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый renderer списка покупок.
+    Строки списка - кортежи (название, единица измерения, количество).
+    """
+    charset = 'utf-8'
+
+    def stream(self, rows):
+        """
+        Генератор байтовых фрагментов ответа.
+        """
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(self.stream(data))
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for name, unit, amount in rows:
+            yield f'{name} ({unit}) - {amount}\n'.encode(self.charset)
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'measurement_unit', 'amount')
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(row).encode(self.charset)
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for name, unit, amount in rows:
+            item = json.dumps(
+                {'name': name, 'measurement_unit': unit, 'amount': amount},
+                ensure_ascii=False
+            )
+            yield f'{separator}{item}'.encode(self.charset)
+            separator = ','
+        yield ('[]' if separator == '[' else ']').encode(self.charset)
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Компактный PDF без сторонних библиотек.
+    В документ встраивается подмножество шрифта TrueType
+    SHOPPING_LIST_PDF_FONT (по умолчанию DejaVuSans) с глифами
+    только использованных символов, так что кириллица отображается
+    в любом просмотрщике, а CMap ToUnicode позволяет копировать
+    и искать текст. Страницы отдаются по мере заполнения, шрифт -
+    после них, смещения объектов для таблицы xref считаются на лету.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+    page_size = (595, 842)
+    margin = 50
+    font_size = 11
+    leading = 14
+    lines_per_page = 54
+
+    def __init__(self, font_path=SHOPPING_LIST_PDF_FONT):
+        self.font_path = font_path
+
+    def encode_text(self, font, text, used):
+        """
+        Кодирует строку в шестнадцатеричную PDF-строку номеров
+        глифов. Символы, которых нет в шрифте, заменяются на '?'.
+        Использованные глифы добавляются в словарь used.
+        """
+        result = []
+        for char in text:
+            if char not in font.glyphs:
+                char = '?'
+            glyph = font.glyphs[char]
+            used.setdefault(glyph, char)
+            result.append(b'%04X' % glyph)
+        return b'<' + b''.join(result) + b'>'
+
+    def font_objects(self, font, first_id, used):
+        """
+        Тела объектов шрифта: Type0, CIDFontType2, дескриптор,
+        файл шрифта и CMap ToUnicode - с номерами от first_id.
+        Сам шрифт Type0 - объект 3, на него ссылаются страницы.
+        """
+        cid_id, descriptor_id, file_id, unicode_id = range(
+            first_id, first_id + 4
+        )
+        name = font.name.encode('ascii')
+        glyphs = sorted(used)
+        widths = b' '.join(
+            b'%d [%d]' % (glyph, font.width(glyph)) for glyph in glyphs
+        )
+        font_file = font.subset(glyphs)
+        compressed = zlib.compress(font_file)
+        ascent, descent = font.scale(font.ascent), font.scale(font.descent)
+        bbox = b' '.join(b'%d' % font.scale(value) for value in font.bbox)
+        blocks = []
+        for start in range(0, len(glyphs), TO_UNICODE_BLOCK):
+            block = glyphs[start:start + TO_UNICODE_BLOCK]
+            blocks.append(b'%d beginbfchar\n%s\nendbfchar' % (
+                len(block),
+                b'\n'.join(
+                    b'<%04X> <%04X>' % (glyph, ord(used[glyph]))
+                    for glyph in block
+                )
+            ))
+        to_unicode = b'\n'.join((
+            b'/CIDInit /ProcSet findresource begin',
+            b'12 dict begin',
+            b'begincmap',
+            b'/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) '
+            b'/Supplement 0 >> def',
+            b'/CMapName /Adobe-Identity-UCS def',
+            b'/CMapType 2 def',
+            b'1 begincodespacerange',
+            b'<0000> <FFFF>',
+            b'endcodespacerange',
+            *blocks,
+            b'endcmap',
+            b'CMapName currentdict /CMap defineresource pop',
+            b'end',
+            b'end',
+        ))
+        return (
+            (3, b'<< /Type /Font /Subtype /Type0 /BaseFont /%s '
+                b'/Encoding /Identity-H /DescendantFonts [%d 0 R] '
+                b'/ToUnicode %d 0 R >>' % (name, cid_id, unicode_id)),
+            (cid_id, b'<< /Type /Font /Subtype /CIDFontType2 '
+                     b'/BaseFont /%s /CIDSystemInfo << /Registry (Adobe) '
+                     b'/Ordering (Identity) /Supplement 0 >> '
+                     b'/FontDescriptor %d 0 R /CIDToGIDMap /Identity '
+                     b'/W [%s] >>' % (name, descriptor_id, widths)),
+            (descriptor_id, b'<< /Type /FontDescriptor /FontName /%s '
+                            b'/Flags 32 /FontBBox [%s] /ItalicAngle 0 '
+                            b'/Ascent %d /Descent %d /CapHeight %d '
+                            b'/StemV 80 /FontFile2 %d 0 R >>'
+                            % (name, bbox, ascent, descent, ascent,
+                               file_id)),
+            (file_id, b'<< /Length %d /Length1 %d /Filter /FlateDecode >>'
+                      b'\nstream\n%s\nendstream'
+                      % (len(compressed), len(font_file), compressed)),
+            (unicode_id, b'<< /Length %d >>\nstream\n%s\nendstream'
+                         % (len(to_unicode), to_unicode)),
+        )
+
+    def page_content(self, font, lines, used):
+        width, height = self.page_size
+        content = [
+            b'BT',
+            b'/F1 %d Tf' % self.font_size,
+            b'%d TL' % self.leading,
+            b'%d %d Td' % (self.margin, height - self.margin),
+        ]
+        for line in lines:
+            content.append(self.encode_text(font, line, used) + b' Tj T*')
+        content.append(b'ET')
+        return b'\n'.join(content)
+
+    def stream(self, rows):
+        font = get_font(self.font_path)
+        used = {}
+        offsets = {}
+        position = 0
+        page_ids = []
+
+        def pdf_object(number, body):
+            nonlocal position
+            offsets[number] = position
+            chunk = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+            position += len(chunk)
+            return chunk
+
+        def pdf_page(lines):
+            content_id = 4 + 2 * len(page_ids)
+            page_id = content_id + 1
+            page_ids.append(page_id)
+            content = self.page_content(font, lines, used)
+            content_chunk = pdf_object(
+                content_id,
+                b'<< /Length %d >>\nstream\n%s\nendstream'
+                % (len(content), content)
+            )
+            page_chunk = pdf_object(
+                page_id,
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                b'/Resources << /Font << /F1 3 0 R >> >> '
+                b'/Contents %d 0 R >>' % (*self.page_size, content_id)
+            )
+            return content_chunk + page_chunk
+
+        header = b'%PDF-1.4\n'
+        position = len(header)
+        yield header
+        lines = []
+        for name, unit, amount in rows:
+            lines.append(f'{name} ({unit}) - {amount}')
+            if len(lines) == self.lines_per_page:
+                yield pdf_page(lines)
+                lines = []
+        if lines or not page_ids:
+            yield pdf_page(lines)
+        for number, body in self.font_objects(
+            font, 4 + 2 * len(page_ids), used
+        ):
+            yield pdf_object(number, body)
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+        yield pdf_object(
+            2,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>'
+            % (kids, len(page_ids))
+        )
+        yield pdf_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        size = max(offsets) + 1
+        xref = [b'xref', b'0 %d' % size, b'0000000000 65535 f ']
+        for number in range(1, size):
+            xref.append(b'%010d 00000 n ' % offsets[number])
+        yield b'\n'.join(xref) + b'\n'
+        yield (
+            b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, position)
+        )
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+)
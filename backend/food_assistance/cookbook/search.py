@@ -0,0 +1,163 @@
+import re
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import (Case, F, FloatField, OuterRef, Subquery,
+                              TextField, Value, When)
+from django.db.models.functions import Cast
+
+from cookbook.ingredient_index import normalize
+from food_assistance.settings import RECIPE_SEARCH_CONFIGS
+
+WORD_RE = re.compile(r'\w+')
+# Веса ts_rank по умолчанию для весов A, B и C поискового вектора.
+FIELD_WEIGHTS = (('name', 1.0), ('ingredients', 0.4), ('text', 0.2))
+# Окончания для упрощённого стемминга в запасном ранжировании.
+SUFFIXES = sorted((
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ах', 'ях',
+    'ов', 'ев', 'ей', 'ой', 'ый', 'ий', 'ая', 'яя', 'ое', 'ее', 'ые',
+    'ие', 'ом', 'ем', 'ам', 'ям', 'у', 'ю', 'а', 'я', 'о', 'е', 'ы', 'и',
+    'ь', 'й', 'ing', 'ed', 'es', 's',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+
+def is_full_text_supported() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def ingredient_names(apps=global_apps):
+    """Подзапрос с названиями ингредиентов рецепта через пробел."""
+    # Агрегаты django.contrib.postgres требуют psycopg2.
+    from django.contrib.postgres.aggregates import StringAgg
+
+    recipe_ingredients = apps.get_model('cookbook', 'RecipeIngredients')
+    return Subquery(
+        recipe_ingredients.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names'),
+        output_field=TextField()
+    )
+
+
+def search_vector(apps=global_apps):
+    """
+    Вектор рецепта: название (вес A), ингредиенты (B) и описание (C)
+    в каждой из конфигураций RECIPE_SEARCH_CONFIGS.
+    """
+    names = ingredient_names(apps)
+    vector = None
+    for config in RECIPE_SEARCH_CONFIGS:
+        for expression, weight in (
+            (F('name'), 'A'), (names, 'B'), (F('text'), 'C')
+        ):
+            part = SearchVector(expression, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vectors(apps=global_apps, **lookup):
+    """Пересчитывает поисковый вектор рецептов, выбранных по lookup."""
+    if not is_full_text_supported():
+        return
+    recipe = apps.get_model('cookbook', 'Recipe')
+    recipe.objects.filter(**lookup).update(search_vector=search_vector(apps))
+
+
+def search_query(text):
+    """Запрос plainto_tsquery в каждой из конфигураций, через OR."""
+    query = None
+    for config in RECIPE_SEARCH_CONFIGS:
+        part = SearchQuery(text, config=config)
+        query = part if query is None else query | part
+    return query
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if (word.endswith(suffix)
+                and len(word) - len(suffix) >= MIN_STEM_LENGTH):
+            return word[:-len(suffix)]
+    return word
+
+
+def get_terms(text: str) -> list:
+    return [stem(word) for word in WORD_RE.findall(normalize(text))]
+
+
+def rank_documents(documents, text) -> dict:
+    """
+    Запасное ранжирование на Python: документ подходит, если в нём
+    есть все слова запроса, ранг - сумма весов полей по вхождениям.
+    documents - {id: {'name': ..., 'ingredients': ..., 'text': ...}}.
+    """
+    query_terms = set(get_terms(text))
+    ranks = {}
+    if not query_terms:
+        return ranks
+    for document_id, fields in documents.items():
+        rank = 0.0
+        found = set()
+        for field, weight in FIELD_WEIGHTS:
+            for term in get_terms(fields[field]):
+                if term in query_terms:
+                    rank += weight
+                    found.add(term)
+        if found == query_terms:
+            ranks[document_id] = rank
+    return ranks
+
+
+def python_search(queryset, text):
+    """
+    Поиск без PostgreSQL (тесты на SQLite): рецепты ранжируются
+    в памяти, ранг передаётся в queryset выражением CASE.
+    """
+    documents = {
+        recipe_id: {'name': name, 'text': recipe_text, 'ingredients': ''}
+        for recipe_id, name, recipe_text in queryset.order_by().values_list(
+            'id', 'name', 'text'
+        )
+    }
+    names = defaultdict(list)
+    recipe_ingredients = global_apps.get_model('cookbook', 'RecipeIngredients')
+    for recipe_id, name in recipe_ingredients.objects.filter(
+        recipe__in=list(documents)
+    ).values_list('recipe', 'ingredient__name'):
+        names[recipe_id].append(name)
+    for recipe_id, recipe_names in names.items():
+        documents[recipe_id]['ingredients'] = ' '.join(recipe_names)
+    ranks = rank_documents(documents, text)
+    if not ranks:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.filter(id__in=ranks).annotate(search_rank=Case(
+        *(When(id=recipe_id, then=Value(rank))
+          for recipe_id, rank in ranks.items()),
+        default=Value(0.0),
+        output_field=FloatField()
+    ))
+
+
+def search_recipes(queryset, text):
+    """
+    Рецепты, подходящие под запрос, с рангом search_rank.
+    На PostgreSQL - по индексу GIN на Recipe.search_vector и ts_rank.
+    """
+    if not is_full_text_supported():
+        return python_search(queryset, text)
+    query = search_query(text)
+    return queryset.filter(search_vector=query).annotate(
+        # real -> double precision: ранг точно переживает
+        # передачу в курсоре ?cursor=.
+        search_rank=Cast(
+            SearchRank(F('search_vector'), query),
+            FloatField()
+        )
+    )
@@ -1,14 +1,23 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import router, transaction
+from django.http import QueryDict
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
 from users.serializers import UserSerializer
-from cookbook.models import (Ingredient, Recipe, RecipeIngredients,
-                             ShoppingCartRecipes, Tag)
+from cookbook.fields import ImageUploadField
+from cookbook.images import RecipeImagesField
+from cookbook.models import Ingredient, Recipe, RecipeIngredients, Tag
+from cookbook.shopping_list import change_recipe, lock_recipes
+from food_assistance.settings import BULK_MAX_IDS, COOKABLE_MAX_MISSING
 from food_assistance.settings import MINIMUM_AMOUNT_OF_INGREDIENT as MIN_AMOUNT
 
 User = get_user_model()
 
+DOES_NOT_EXIST = serializers.PrimaryKeyRelatedField.default_error_messages[
+    'does_not_exist'
+]
+
 
 class TagSerializer(serializers.ModelSerializer):
     """
@@ -89,12 +98,15 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class FavoriteRecipesSerializer(serializers.ModelSerializer):
+    images = RecipeImagesField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
@@ -111,6 +123,7 @@ class RecipesSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='get_is_in_shopping_cart'
     )
+    images = RecipeImagesField()
 
     class Meta:
         model = Recipe
@@ -123,21 +136,27 @@ class RecipesSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
 
-    def get_is_in_shopping_cart(self, obj):
+    def get_current_user(self):
+        """
+        Возвращает текущего пользователя или None для анонимного.
+        """
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            current_user = request.user
-        try:
-            current_user.shopping_cart_recipes.get(
-                id=obj.id
-            )
-            return True
-        except Exception:
+        if request is None or not request.user.is_authenticated:
+            return None
+        return request.user
+
+    def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        current_user = self.get_current_user()
+        if current_user is None:
             return False
+        return obj.cart_recipe.filter(user=current_user).exists()
 
     def get_ingredients(self, recipe_obj):
         ingr_in_recipe_obj = recipe_obj.igredients_in_recipe.all()
@@ -148,25 +167,21 @@ class RecipesSerializer(serializers.ModelSerializer):
         ).data
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            current_user = request.user
-        try:
-            current_user.favorite_recipes.get(
-                id=obj.id
-            )
-            return True
-        except Exception:
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        current_user = self.get_current_user()
+        if current_user is None:
             return False
+        return obj.favorit_recipe.filter(user=current_user).exists()
 
 
 class IngredientInCreateUpdateRecipeSerializer(serializers.ModelSerializer):
     """
     Serializer для просмотра ингредиентов в составе рецепта.
+    Существование ингредиентов проверяется одним запросом
+    в RecipesCreateSerializer.validate_ingredients.
     """
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -188,12 +203,9 @@ class IngredientInCreateUpdateRecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipesCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientInCreateUpdateRecipeSerializer(many=True)
-    image = Base64ImageField()
+    image = ImageUploadField()
 
     class Meta:
         model = Recipe
@@ -206,6 +218,66 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
             'cooking_time'
         )
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.from_multipart(data)
+        return super().to_internal_value(data)
+
+    def from_multipart(self, data):
+        """
+        Приводит multipart/form-data к виду JSON-запроса:
+        tags - повторяющееся поле, ingredients - JSON-массив в строке.
+        """
+        result = data.dict()
+        if 'tags' in data:
+            result['tags'] = data.getlist('tags')
+        if isinstance(result.get('ingredients'), str):
+            try:
+                result['ingredients'] = json.loads(result['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'ingredients': ['Invalid JSON.']}
+                )
+        return result
+
+    def validate_tags(self, value):
+        """
+        Проверка существования тегов одним запросом.
+        """
+        tags = Tag.objects.in_bulk(set(value))
+        errors = [
+            DOES_NOT_EXIST.format(pk_value=tag_id)
+            for tag_id in value if tag_id not in tags
+        ]
+        if errors:
+            raise serializers.ValidationError(detail=errors)
+        return list(tags.values())
+
+    def validate_ingredients(self, value):
+        """
+        Проверка существования и уникальности ингредиентов одним запросом.
+        """
+        ingredient_ids = [ingredient['id'] for ingredient in value]
+        existing = Ingredient.objects.in_bulk(set(ingredient_ids))
+        errors = []
+        seen = set()
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in existing:
+                errors.append(
+                    {'id': [DOES_NOT_EXIST.format(pk_value=ingredient_id)]}
+                )
+            elif ingredient_id in seen:
+                errors.append({'id': ['Duplicate ingredient.']})
+            else:
+                errors.append({})
+            seen.add(ingredient_id)
+        if any(errors):
+            raise serializers.ValidationError(detail=errors)
+        return [
+            {'id': existing[ingredient['id']], 'amount': ingredient['amount']}
+            for ingredient in value
+        ]
+
     @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
@@ -213,16 +285,63 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        for tag in tags:
-            recipe.tags.add(tag)
-        for full_ingredient in ingredients:
-            RecipeIngredients.objects.create(
+        recipe.tags.add(*tags)
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
                 recipe=recipe,
-                ingredient=full_ingredient.get('id'),
-                amount=full_ingredient.get('amount')
+                ingredient=ingredient['id'],
+                amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        """
+        Применяет к ингредиентам рецепта только изменения:
+        удаляет лишние строки, обновляет изменившиеся количества
+        и добавляет новые ингредиенты. Те же изменения применяются
+        к спискам покупок пользователей с рецептом в корзине.
+        Строка рецепта блокируется до чтения ингредиентов, чтобы
+        одновременное добавление рецепта в корзину не прочитало
+        старые ингредиенты после того, как приращения уже применены.
+        """
+        lock_recipes((instance.id,), router.db_for_write(Recipe))
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_delete = []
+        to_update = []
+        deltas = {}
+        for recipe_ingredient in RecipeIngredients.objects.filter(
+            recipe_id=instance.id
+        ):
+            ingredient_id = recipe_ingredient.ingredient_id
+            amount = amounts.pop(ingredient_id, None)
+            if amount is None:
+                to_delete.append(recipe_ingredient.id)
+                deltas[ingredient_id] = -recipe_ingredient.amount
+            elif amount != recipe_ingredient.amount:
+                deltas[ingredient_id] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        deltas.update(amounts)
+        if to_delete:
+            RecipeIngredients.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredients.objects.bulk_update(to_update, ('amount',))
+        if amounts:
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=instance,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for ingredient_id, amount in amounts.items()
+            )
+        change_recipe(instance.id, deltas)
+
     @transaction.atomic
     def update(self, instance, validated_data):
         empty_required_fields = dict()
@@ -239,23 +358,41 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         instance.name = validated_data.get('name')
         instance.text = validated_data.get('text')
         instance.cooking_time = validated_data.get('cooking_time')
-        instance.tags.clear()
-        tags_data = self.initial_data.get('tags')
-        if tags_data:
-            instance.tags.set(tags_data)
-        RecipeIngredients.objects.filter(recipe=instance).all().delete()
-        ingredients = validated_data.get('ingredients')
-        for ingredient in ingredients:
-            RecipeIngredients.objects.create(
-                ingredient=ingredient['id'],
-                recipe=instance,
-                amount=ingredient['amount']
-            )
+        instance.tags.set(validated_data.get('tags'))
+        self.update_ingredients(instance, validated_data.get('ingredients'))
         instance.save()
         return instance
 
 
-class DownloadShoppingCartSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ShoppingCartRecipes
-        fields = ('user', 'resipe')
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id для пакетных запросов: {"ids": [...]}."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """
+    Параметры поиска рецептов по имеющимся ингредиентам:
+    ?ingredients=<id>&ingredients=<id>&max_missing=<n>.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        max_value=COOKABLE_MAX_MISSING,
+        default=0
+    )
+
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = {
+                'ingredients': data.getlist('ingredients'),
+                **({'max_missing': data['max_missing']}
+                   if 'max_missing' in data else {})
+            }
+        return super().to_internal_value(data)
@@ -0,0 +1,177 @@
+from django.apps import apps as global_apps
+from django.db import connections, router, transaction
+from django.db.models import Sum
+from cookbook.models import (Recipe, RecipeIngredients,
+                             ShoppingCartRecipes, ShoppingListItem)
+
+
+def upsert_items(select_sql, params):
+    """
+    INSERT ... SELECT строк (пользователь, ингредиент, приращение)
+    в списки покупок: для существующих строк количество
+    увеличивается на приращение (ON CONFLICT DO UPDATE).
+    """
+    using = router.db_for_write(ShoppingListItem)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    opts = ShoppingListItem._meta
+    table = quote_name(opts.db_table)
+    user, ingredient, amount = (
+        quote_name(opts.get_field(name).column)
+        for name in ('user', 'ingredient', 'amount')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({user}, {ingredient}, {amount}) '
+            f'{select_sql} '
+            f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+            f'SET {amount} = {table}.{amount} + EXCLUDED.{amount}',
+            params
+        )
+    return using
+
+
+def lock_recipes(recipe_ids, using):
+    """
+    Блокирует строки рецептов до конца транзакции (SELECT FOR UPDATE).
+    Изменение ингредиентов рецепта и изменение корзин с ним читают
+    ингредиенты только под этой блокировкой, поэтому каждое изменение
+    корзины учитывает либо старые ингредиенты вместе с приращениями
+    change_recipe, либо уже новые.
+    """
+    list(Recipe.objects.using(using).select_for_update().filter(
+        pk__in=recipe_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def change_cart(user_id, recipe_ids, sign):
+    """
+    Прибавляет (sign=1) к списку покупок пользователя ингредиенты
+    рецептов recipe_ids или вычитает их (sign=-1) одним запросом.
+    """
+    if not recipe_ids:
+        return
+    using = router.db_for_write(ShoppingListItem)
+    with transaction.atomic(using=using):
+        lock_recipes(recipe_ids, using)
+        apply_cart(user_id, recipe_ids, sign)
+
+
+def apply_cart(user_id, recipe_ids, sign):
+    quote_name = connections[
+        router.db_for_write(ShoppingListItem)
+    ].ops.quote_name
+    opts = RecipeIngredients._meta
+    recipe, ingredient, amount = (
+        quote_name(opts.get_field(name).column)
+        for name in ('recipe', 'ingredient', 'amount')
+    )
+    total = f'SUM({amount})' if sign > 0 else f'-SUM({amount})'
+    using = upsert_items(
+        f'SELECT %s, {ingredient}, {total} '
+        f'FROM {quote_name(opts.db_table)} '
+        f'WHERE {recipe} IN ({", ".join(["%s"] * len(recipe_ids))}) '
+        f'GROUP BY {ingredient}',
+        (user_id, *recipe_ids)
+    )
+    if sign < 0:
+        ShoppingListItem.objects.using(using).filter(
+            user_id=user_id,
+            amount__lte=0
+        ).delete()
+
+
+def change_recipe(recipe_id, deltas):
+    """
+    Применяет изменения количеств ингредиентов рецепта
+    ({ингредиент: приращение}) к спискам покупок всех пользователей,
+    у которых рецепт в корзине, одним запросом. Вызывается после
+    записи ингредиентов под блокировкой lock_recipes.
+    """
+    if not deltas:
+        return
+    quote_name = connections[
+        router.db_for_write(ShoppingListItem)
+    ].ops.quote_name
+    opts = ShoppingCartRecipes._meta
+    user, recipe = (
+        quote_name(opts.get_field(name).column)
+        for name in ('user', 'recipe')
+    )
+    values = ' UNION ALL '.join(
+        ['SELECT %s AS ingredient_id, %s AS amount'] * len(deltas)
+    )
+    using = upsert_items(
+        f'SELECT cart.{user}, delta.ingredient_id, delta.amount '
+        f'FROM {quote_name(opts.db_table)} cart '
+        f'CROSS JOIN ({values}) delta '
+        f'WHERE cart.{recipe} = %s',
+        (*(value for item in deltas.items() for value in item), recipe_id)
+    )
+    decreased = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta < 0
+    ]
+    if decreased:
+        ShoppingListItem.objects.using(using).filter(
+            user__cart_owner__recipe_id=recipe_id,
+            ingredient_id__in=decreased,
+            amount__lte=0
+        ).delete()
+
+
+def reconcile_shopping_lists(apps=global_apps, dry_run=False,
+                             user_ids=None) -> dict:
+    """
+    Сверяет списки покупок с полной агрегацией ингредиентов рецептов
+    в корзинах и исправляет расхождения. Возвращает число
+    недостающих, лишних и неверных строк и затронутых пользователей.
+    """
+    cart = apps.get_model('cookbook', 'ShoppingCartRecipes')
+    item = apps.get_model('cookbook', 'ShoppingListItem')
+    carts = cart.objects.filter(
+        recipe__igredients_in_recipe__isnull=False
+    )
+    items = item.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+        items = items.filter(user_id__in=user_ids)
+    expected = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in carts.values_list(
+            'user_id', 'recipe__igredients_in_recipe__ingredient_id'
+        ).annotate(
+            Sum('recipe__igredients_in_recipe__amount')
+        ).order_by().iterator()
+    }
+    stored = {
+        (row.user_id, row.ingredient_id): row
+        for row in items.only('user_id', 'ingredient_id', 'amount')
+    }
+    missing = expected.keys() - stored.keys()
+    extra = stored.keys() - expected.keys()
+    wrong = [
+        stored[key] for key in expected.keys() & stored.keys()
+        if stored[key].amount != expected[key]
+    ]
+    result = {
+        'missing': len(missing),
+        'extra': len(extra),
+        'wrong': len(wrong),
+        'users': len(
+            {user_id for user_id, _ in missing | extra}
+            | {row.user_id for row in wrong}
+        ),
+    }
+    if dry_run:
+        return result
+    for row in wrong:
+        row.amount = expected[(row.user_id, row.ingredient_id)]
+    with transaction.atomic():
+        item.objects.filter(pk__in=[stored[key].pk for key in extra]).delete()
+        item.objects.bulk_update(wrong, ('amount',))
+        item.objects.bulk_create(
+            item(user_id=user_id, ingredient_id=ingredient_id,
+                 amount=expected[(user_id, ingredient_id)])
+            for user_id, ingredient_id in missing
+        )
+    return result
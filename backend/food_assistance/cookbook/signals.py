@@ -0,0 +1,343 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from cookbook.cache import response_cache
+from cookbook.conditional import (touch_recipes_deleted, touch_recipes_ranked,
+                                  touch_user_state)
+from cookbook.cookable_index import cookable_index
+from cookbook.counters import change_counter, change_counters
+from cookbook.images import rendition_pool
+from cookbook.ingredient_index import ingredient_index
+from cookbook.models import (FavoritRecipes, Ingredient, MediaBlob, Recipe,
+                             RecipeIngredients, ShoppingCartRecipes, Tag)
+from cookbook.search import update_search_vectors
+from cookbook.shopping_list import change_cart
+from cookbook.toggles import relations_changed
+from users.models import USER_IDENTITY_FIELDS, Follow
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сбрасывает индекс автодополнения при изменении ингредиентов."""
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_cache(sender, **kwargs):
+    """Ингредиенты входят и в ответы по рецептам."""
+    response_cache.invalidate_group('ingredients')
+    response_cache.invalidate_group('recipes')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(sender, **kwargs):
+    """Теги входят и в ответы по рецептам."""
+    response_cache.invalidate_group('tags')
+    response_cache.invalidate_group('recipes')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    response_cache.invalidate_object('recipes', instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_renditions(sender, instance, **kwargs):
+    """
+    Уменьшенные копии новой картинки строятся в пуле потоков
+    после коммита транзакции.
+    """
+    if not instance.image or instance.image_renditions == instance.image.name:
+        return
+    recipe_id = instance.pk
+    image_name = instance.image.name
+    transaction.on_commit(
+        lambda: rendition_pool.submit(recipe_id, image_name)
+    )
+
+
+def image_name(value):
+    return getattr(value, 'name', value) or None
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_state(sender, instance, **kwargs):
+    """
+    Запоминает сохранённые в БД картинку и автора
+    для подсчёта ссылок и счётчиков.
+    """
+    saved = instance.pk is not None
+    instance._saved_image = (
+        image_name(instance.__dict__.get('image')) if saved else None
+    )
+    instance._saved_author_id = (
+        instance.__dict__.get('author_id') if saved else None
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_image_references(sender, instance, update_fields=None,
+                                  **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    new_image = image_name(instance.image)
+    old_image = instance._saved_image
+    if new_image == old_image:
+        return
+    if new_image:
+        MediaBlob.objects.acquire(new_image)
+    if old_image:
+        MediaBlob.objects.release(old_image)
+    instance._saved_image = new_image
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    if instance._saved_image:
+        MediaBlob.objects.release(instance._saved_image)
+
+
+@receiver(post_save, sender=Recipe)
+def count_author_recipes(sender, instance, update_fields=None, **kwargs):
+    """Ведёт User.recipes_count при создании рецепта и смене автора."""
+    if update_fields is not None and 'author' not in update_fields:
+        return
+    old_author_id = instance._saved_author_id
+    if instance.author_id == old_author_id:
+        return
+    change_counter(User, instance.author_id, 'recipes_count', 1)
+    change_counter(User, old_author_id, 'recipes_count', -1)
+    instance._saved_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_author_recipe(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+RECIPE_COUNTERS = {
+    FavoritRecipes: 'favorites_count',
+    ShoppingCartRecipes: 'cart_count',
+}
+
+
+@receiver(post_save, sender=FavoritRecipes)
+@receiver(post_save, sender=ShoppingCartRecipes)
+def count_added_recipe(sender, instance, created, **kwargs):
+    """
+    Ведёт счётчики избранного и списка покупок рецепта
+    и отмечает активность для пересчёта рейтинга trending.
+    """
+    if created:
+        change_counter(
+            Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1,
+            activity=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=FavoritRecipes)
+@receiver(post_delete, sender=ShoppingCartRecipes)
+def count_removed_recipe(sender, instance, **kwargs):
+    change_counter(
+        Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1,
+        activity=timezone.now()
+    )
+
+
+@receiver(relations_changed, sender=FavoritRecipes)
+@receiver(relations_changed, sender=ShoppingCartRecipes)
+def count_changed_recipes(sender, ids, delta, **kwargs):
+    """Счётчики рецептов при пакетном изменении (cookbook.toggles)."""
+    change_counters(
+        Recipe, ids, RECIPE_COUNTERS[sender], delta, activity=timezone.now()
+    )
+
+
+@receiver((post_save, post_delete, relations_changed), sender=FavoritRecipes)
+def touch_popular_ordering(sender, **kwargs):
+    """
+    Избранное меняет порядок рецептов при ?ordering=popular.
+    Счётчик пишется через update(), post_save рецепта не отправляется,
+    поэтому кэш списков для анонимных клиентов сбрасывается здесь.
+    """
+    touch_recipes_ranked()
+    response_cache.invalidate_lists('recipes')
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def invalidate_recipe_ingredients_cache(sender, instance, **kwargs):
+    response_cache.invalidate_object('recipes', instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags_cache(sender, instance, action, reverse,
+                                 pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        response_cache.invalidate_object('recipes', instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            response_cache.invalidate_object('recipes', pk)
+    else:
+        response_cache.invalidate_group('recipes')
+
+
+def saves_identity(update_fields):
+    """Сохранение затрагивает поля пользователя, видимые в API."""
+    return update_fields is None or bool(
+        USER_IDENTITY_FIELDS & set(update_fields)
+    )
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_authors_cache(sender, created=False, update_fields=None,
+                             **kwargs):
+    """
+    Данные автора входят в ответы по рецептам.
+    У только что созданного пользователя рецептов нет,
+    а вход (update_last_login) данные автора не меняет.
+    """
+    if created or not saves_identity(update_fields):
+        return
+    response_cache.invalidate_group('recipes')
+
+
+def touch_recipes(**lookup):
+    """Обновляет Recipe.updated у рецептов, чей ответ изменился."""
+    Recipe.objects.filter(**lookup).update(updated=timezone.now())
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def touch_recipe_by_ingredients(sender, instance, **kwargs):
+    touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_by_tags(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes(pk=instance.pk)
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+    else:
+        touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_recipes_by_tag(sender, instance, **kwargs):
+    touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_by_ingredient(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+def schedule_cookable_update(recipe_id):
+    """
+    Индекс по ингредиентам обновляется после коммита, когда
+    ингредиенты рецепта (в том числе из bulk_create) уже сохранены.
+    """
+    transaction.on_commit(
+        lambda: cookable_index.update_recipes((recipe_id,))
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_cookable_index(sender, instance, **kwargs):
+    schedule_cookable_update(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def update_cookable_index_by_ingredients(sender, instance, **kwargs):
+    schedule_cookable_update(instance.recipe_id)
+
+
+def schedule_search_update(**lookup):
+    """
+    Поисковый вектор пересчитывается после коммита: ингредиенты
+    нового рецепта сохраняются bulk_create уже после его post_save.
+    """
+    transaction.on_commit(lambda: update_search_vectors(**lookup))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields=None,
+                                **kwargs):
+    if update_fields is not None and not {'name', 'text'} & set(
+        update_fields
+    ):
+        return
+    schedule_search_update(pk=instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def update_search_vector_by_ingredients(sender, instance, **kwargs):
+    schedule_search_update(pk=instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_by_ingredient(sender, instance, created=False,
+                                        **kwargs):
+    if not created:
+        schedule_search_update(ingredients=instance)
+
+
+@receiver(post_save, sender=User)
+def touch_recipes_by_author(sender, instance, created=False,
+                            update_fields=None, **kwargs):
+    if created or not saves_identity(update_fields):
+        return
+    touch_recipes(author=instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def touch_deleted_recipe(sender, **kwargs):
+    touch_recipes_deleted()
+
+
+@receiver((post_save, post_delete), sender=FavoritRecipes)
+@receiver((post_save, post_delete), sender=ShoppingCartRecipes)
+@receiver((post_save, post_delete), sender=Follow)
+def touch_user_recipes_state(sender, instance, **kwargs):
+    """Флаги is_favorited, is_in_shopping_cart, is_subscribed."""
+    touch_user_state(instance.user_id)
+
+
+@receiver(relations_changed, sender=FavoritRecipes)
+@receiver(relations_changed, sender=ShoppingCartRecipes)
+@receiver(relations_changed, sender=Follow)
+def touch_user_relations_state(sender, user_id, **kwargs):
+    touch_user_state(user_id)
+
+
+@receiver(post_save, sender=ShoppingCartRecipes)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    """Список покупок пользователя (cookbook.shopping_list)."""
+    if created:
+        change_cart(instance.user_id, (instance.recipe_id,), 1)
+
+
+@receiver(pre_delete, sender=ShoppingCartRecipes)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """
+    pre_delete: при каскадном удалении рецепта его ингредиенты
+    ещё не удалены.
+    """
+    change_cart(instance.user_id, (instance.recipe_id,), -1)
+
+
+@receiver(relations_changed, sender=ShoppingCartRecipes)
+def change_shopping_list(sender, user_id, ids, delta, **kwargs):
+    change_cart(user_id, ids, delta)
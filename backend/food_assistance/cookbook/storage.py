@@ -0,0 +1,66 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from food_assistance.settings import MEDIA_BLOB_DIR
+
+HASH_CHUNK_SIZE = 64 * 1024
+# mkstemp создаёт файл с правами 0600, веб-сервер не смог бы его отдать.
+BLOB_PERMISSIONS = 0o644
+
+
+def blob_name(digest: str, extension: str) -> str:
+    """Путь блоба: images/ab/cd/abcd....png."""
+    return f'{MEDIA_BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла - SHA-256 его содержимого.
+
+    Содержимое пишется во временный файл и одновременно хэшируется,
+    затем переименовывается в путь блоба. Если такой блоб уже есть,
+    временный файл удаляется: одинаковые картинки хранятся один раз.
+    Файл по имени никогда не меняется, поэтому URL можно кэшировать
+    бессрочно. Ссылки на блобы считает MediaBlob, сироты удаляет
+    команда gc_media.
+    """
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в _save, одинаковое
+        # содержимое должно получать одинаковое имя.
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        directory = self.path(MEDIA_BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            name = blob_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                # Отметка для gc_media: блоб только что снова понадобился.
+                os.utime(full_path)
+                return name
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(
+                temp_path,
+                self.file_permissions_mode or BLOB_PERMISSIONS
+            )
+            os.replace(temp_path, full_path)
+            return name
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+recipe_image_storage = ContentAddressedStorage()
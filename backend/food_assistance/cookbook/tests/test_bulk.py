@@ -0,0 +1,213 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import FavoritRecipes, Recipe, ShoppingCartRecipes
+from cookbook.tests.test_toggles import table_queries
+from cookbook.toggles import (ADDED, ALREADY_ADDED, INVALID, NOT_ADDED,
+                              NOT_FOUND, REMOVED)
+from users.models import Follow
+
+User = get_user_model()
+
+
+class BulkEndpointsTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.author,
+                name=f'recipe{number}',
+                text='text',
+                image='',
+                cooking_time=10
+            )
+            for number in range(3)
+        ]
+        self.ids = [recipe.id for recipe in self.recipes]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, url, ids):
+        return self.client.post(url, {'ids': ids}, format='json')
+
+    def results(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (item['id'], item['status'])
+            for item in response.json()['results']
+        ]
+
+    def test_add_and_remove(self):
+        """
+        Добавление и удаление пачкой - по одному INSERT и DELETE,
+        результат по каждому id в порядке запроса.
+        """
+        first, second, third = self.ids
+        ShoppingCartRecipes.objects.create(
+            user=self.user, recipe=self.recipes[1]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(
+                '/api/recipes/shopping_cart/',
+                [third, 999, second, first, third]
+            )
+        self.assertEqual(self.results(response), [
+            (third, ADDED), (999, NOT_FOUND), (second, ALREADY_ADDED),
+            (first, ADDED),
+        ])
+        writes = [
+            sql for sql in table_queries(queries, ShoppingCartRecipes)
+            if sql.startswith('INSERT')
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(
+            set(ShoppingCartRecipes.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)),
+            set(self.ids)
+        )
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'cart_count', flat=True
+            )),
+            [1, 1, 1]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(
+                '/api/recipes/shopping_cart/remove/', [first, 999, first]
+            )
+        self.assertEqual(
+            self.results(response), [(first, REMOVED), (999, NOT_FOUND)]
+        )
+        writes = [
+            sql for sql in table_queries(queries, ShoppingCartRecipes)
+            if sql.startswith('DELETE')
+        ]
+        self.assertEqual(len(writes), 1)
+        response = self.post('/api/recipes/shopping_cart/remove/', [first])
+        self.assertEqual(self.results(response), [(first, NOT_ADDED)])
+        self.assertEqual(Recipe.objects.get(id=first).cart_count, 0)
+
+    def test_favorites(self):
+        response = self.post('/api/recipes/favorite/', self.ids[:2])
+        self.assertEqual(
+            self.results(response),
+            [(pk, ADDED) for pk in self.ids[:2]]
+        )
+        self.assertEqual(
+            FavoritRecipes.objects.filter(user=self.user).count(),
+            2
+        )
+        self.assertEqual(
+            Recipe.objects.get(id=self.ids[0]).favorites_count,
+            1
+        )
+
+    def test_clear_cart(self):
+        """Очистка корзины - один DELETE, чужая корзина не меняется."""
+        ShoppingCartRecipes.objects.bulk_create(
+            ShoppingCartRecipes(user=user, recipe=recipe)
+            for user in (self.user, self.author)
+            for recipe in self.recipes
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete('/api/recipes/shopping_cart/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        writes = [
+            sql for sql in table_queries(queries, ShoppingCartRecipes)
+            if sql.startswith('DELETE')
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertFalse(
+            ShoppingCartRecipes.objects.filter(user=self.user).exists()
+        )
+        self.assertEqual(
+            ShoppingCartRecipes.objects.filter(user=self.author).count(),
+            3
+        )
+
+    def test_clear_only_cart(self):
+        """Избранное и подписки DELETE не очищает."""
+        FavoritRecipes.objects.create(user=self.user, recipe=self.recipes[0])
+        Follow.objects.create(user=self.user, author=self.author)
+        for url in ('/api/recipes/favorite/', '/api/users/subscribe/'):
+            with self.subTest(url=url):
+                response = self.client.delete(url)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+        self.assertTrue(FavoritRecipes.objects.filter(user=self.user).exists())
+        self.assertTrue(Follow.objects.filter(user=self.user).exists())
+
+    def test_subscribe(self):
+        """Подписка пачкой: на себя нельзя, счётчик авторов ведётся."""
+        response = self.post(
+            '/api/users/subscribe/',
+            [self.author.id, self.user.id, 999]
+        )
+        self.assertEqual(self.results(response), [
+            (self.author.id, ADDED),
+            (self.user.id, INVALID),
+            (999, NOT_FOUND),
+        ])
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        response = self.post('/api/users/subscribe/remove/', [self.author.id])
+        self.assertEqual(self.results(response), [(self.author.id, REMOVED)])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_without_returning(self):
+        """Без RETURNING затронутые строки читаются до изменения."""
+        ShoppingCartRecipes.objects.create(
+            user=self.user, recipe=self.recipes[0]
+        )
+        with mock.patch(
+            'cookbook.toggles.can_return_rows', return_value=False
+        ):
+            added = self.post('/api/recipes/shopping_cart/', self.ids)
+            removed = self.post(
+                '/api/recipes/shopping_cart/remove/', self.ids[1:]
+            )
+        self.assertEqual(self.results(added), [
+            (self.ids[0], ALREADY_ADDED), (self.ids[1], ADDED),
+            (self.ids[2], ADDED),
+        ])
+        self.assertEqual(
+            self.results(removed),
+            [(pk, REMOVED) for pk in self.ids[1:]]
+        )
+
+    def test_validation(self):
+        """Пустой, слишком длинный и нечисловой список - 400."""
+        for ids in ([], list(range(1, 1000)), ['x'], [0], None):
+            with self.subTest(ids=ids):
+                response = self.post('/api/recipes/favorite/', ids)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST
+                )
+        self.client.force_authenticate(user=None)
+        response = self.post('/api/recipes/favorite/', self.ids)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
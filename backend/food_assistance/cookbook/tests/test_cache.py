@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.cache import response_cache
+from cookbook.models import Ingredient, Recipe, RecipeIngredients, Tag
+
+User = get_user_model()
+
+
+class AnonymousCacheTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.tag1 = Tag.objects.create(
+            name='tag1_name',
+            color='#A12345',
+            slug='tag1'
+        )
+        self.tag2 = Tag.objects.create(
+            name='tag2_name',
+            color='#B12345',
+            slug='tag2'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='ingr1_name',
+            measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='test_recipe_name',
+            text='test_recipe_text',
+            image='',
+            cooking_time=12
+        )
+        self.recipe2 = Recipe.objects.create(
+            author=self.author,
+            name='test_recipe2_name',
+            text='test_recipe2_text',
+            image='',
+            cooking_time=12
+        )
+        self.recipe.tags.add(self.tag1, self.tag2)
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.author)
+
+    def get(self, url, cache_status):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], cache_status)
+        return response.json()
+
+    def test_anonymous_hit(self):
+        """
+        Повторный анонимный запрос обслуживается из кэша.
+        Для рецептов остается только запрос для ETag.
+        """
+        for url, num_queries in (('/api/recipes/?page=1&limit=6', 1),
+                                 (f'/api/recipes/{self.recipe.id}/', 1),
+                                 ('/api/tags/', 0),
+                                 ('/api/ingredients/?name=ingr', 0)):
+            with self.subTest(url=url):
+                data = self.get(url, 'MISS')
+                with self.assertNumQueries(num_queries):
+                    self.assertEqual(self.get(url, 'HIT'), data)
+
+    def test_normalized_query_string(self):
+        """
+        Порядок параметров и посторонние параметры не влияют на ключ.
+        """
+        self.get('/api/recipes/?tags=tag1&tags=tag2&page=1', 'MISS')
+        self.get('/api/recipes/?page=1&tags=tag2&tags=tag1&utm=x', 'HIT')
+        self.get('/api/recipes/?page=1&tags=tag2', 'MISS')
+
+    def test_authenticated_not_cached(self):
+        """
+        Ответы авторизованным пользователям не кэшируются.
+        """
+        self.get('/api/recipes/', 'MISS')
+        response = self.auth_client.get('/api/recipes/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_recipe_invalidation(self):
+        """
+        Изменение рецепта сбрасывает его детальный ответ и списки,
+        но не детальные ответы других рецептов.
+        """
+        detail_url = f'/api/recipes/{self.recipe.id}/'
+        detail2_url = f'/api/recipes/{self.recipe2.id}/'
+        self.get('/api/recipes/', 'MISS')
+        self.get(detail_url, 'MISS')
+        self.get(detail2_url, 'MISS')
+        self.recipe.name = 'new_name'
+        self.recipe.save()
+        self.assertEqual(self.get(detail_url, 'MISS')['name'], 'new_name')
+        self.get('/api/recipes/', 'MISS')
+        self.get(detail2_url, 'HIT')
+
+    def test_related_invalidation(self):
+        """
+        Изменение ингредиентов, тегов рецепта и самих тегов
+        сбрасывает ответы по рецептам.
+        """
+        detail_url = f'/api/recipes/{self.recipe.id}/'
+        self.get(detail_url, 'MISS')
+        RecipeIngredients.objects.create(
+            recipe=self.recipe,
+            ingredient=self.ingredient,
+            amount=3
+        )
+        self.assertEqual(len(self.get(detail_url, 'MISS')['ingredients']), 1)
+        self.recipe.tags.remove(self.tag2)
+        self.assertEqual(len(self.get(detail_url, 'MISS')['tags']), 1)
+        self.get('/api/tags/', 'MISS')
+        self.tag1.name = 'new_tag_name'
+        self.tag1.save()
+        self.assertEqual(
+            self.get(detail_url, 'MISS')['tags'][0]['name'],
+            'new_tag_name'
+        )
+        self.get('/api/tags/', 'MISS')
+
+    def test_author_invalidation(self):
+        """
+        Изменение имени автора сбрасывает ответы по рецептам,
+        вход пользователя - нет.
+        """
+        detail_url = f'/api/recipes/{self.recipe.id}/'
+        self.get(detail_url, 'MISS')
+        update_last_login(None, self.author)
+        self.get(detail_url, 'HIT')
+        self.author.first_name = 'new_name'
+        self.author.save()
+        self.assertEqual(
+            self.get(detail_url, 'MISS')['author']['first_name'],
+            'new_name'
+        )
+
+    def test_stats(self):
+        """
+        Счётчики попаданий и промахов.
+        """
+        self.get('/api/tags/', 'MISS')
+        self.get('/api/tags/', 'HIT')
+        self.get('/api/tags/', 'HIT')
+        self.assertEqual(response_cache.stats(), {'hits': 2, 'misses': 1})
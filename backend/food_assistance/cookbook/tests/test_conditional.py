@@ -0,0 +1,173 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import (FavoritRecipes, Ingredient, Recipe,
+                             RecipeIngredients, Tag)
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.tag = Tag.objects.create(
+            name='tag1_name',
+            color='#A12345',
+            slug='tag1'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='ingr1_name',
+            measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='test_recipe_name',
+            text='test_recipe_text',
+            image='',
+            cooking_time=12
+        )
+        self.recipe2 = Recipe.objects.create(
+            author=self.author,
+            name='test_recipe2_name',
+            text='test_recipe2_text',
+            image='',
+            cooking_time=12
+        )
+        self.detail_url = f'/api/recipes/{self.recipe.id}/'
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.author)
+
+    def assert_not_modified(self, url, etag, client=None):
+        client = client or self.client
+        with self.assertNumQueries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def assert_modified(self, url, etag, client=None):
+        client = client or self.client
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_detail_etag(self):
+        """
+        Детальный ответ отдает 304 до изменения рецепта,
+        его ингредиентов или тегов.
+        """
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assert_not_modified(self.detail_url, etag)
+        self.recipe.name = 'new_name'
+        self.recipe.save()
+        etag = self.assert_modified(self.detail_url, etag)
+        RecipeIngredients.objects.create(
+            recipe=self.recipe,
+            ingredient=self.ingredient,
+            amount=3
+        )
+        etag = self.assert_modified(self.detail_url, etag)
+        self.recipe.tags.add(self.tag)
+        etag = self.assert_modified(self.detail_url, etag)
+        self.tag.name = 'new_tag_name'
+        self.tag.save()
+        etag = self.assert_modified(self.detail_url, etag)
+        self.assert_not_modified(self.detail_url, etag)
+
+    def test_list_etag(self):
+        """
+        Список отдает 304, пока набор рецептов не изменился.
+        """
+        url = '/api/recipes/?page=1&limit=10'
+        etag = self.client.get(url)['ETag']
+        self.assert_not_modified(url, etag)
+        self.recipe2.delete()
+        etag = self.assert_modified(url, etag)
+        Recipe.objects.create(
+            author=self.author,
+            name='test_recipe3_name',
+            text='test_recipe3_text',
+            image='',
+            cooking_time=12
+        )
+        self.assert_modified(url, etag)
+
+    def test_list_etag_without_count(self):
+        """
+        В курсорном режиме и с ?count=approximate валидатор
+        строится без COUNT по выборке и меняется при выходе
+        рецепта из неё.
+        """
+        for url in ('/api/recipes/?cursor=&tags=tag1',
+                    '/api/recipes/?page=1&count=approximate&tags=tag1'):
+            with self.subTest(url=url):
+                self.recipe.tags.set((self.tag,))
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    self.assert_not_modified(url, etag)
+                self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+                self.recipe.tags.clear()
+                self.assert_modified(url, etag)
+
+    def test_user_flags_change_etag(self):
+        """
+        Изменение избранного меняет ETag для пользователя.
+        """
+        etag = self.auth_client.get(self.detail_url)['ETag']
+        self.assert_not_modified(self.detail_url, etag, self.auth_client)
+        FavoritRecipes.objects.create(user=self.author, recipe=self.recipe)
+        self.assert_modified(self.detail_url, etag, self.auth_client)
+
+    def test_if_modified_since(self):
+        """
+        Проверка заголовка If-Modified-Since.
+        """
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_author_login(self):
+        """Вход автора не меняет Recipe.updated его рецептов."""
+        updated = Recipe.objects.get(id=self.recipe.id).updated
+        update_last_login(None, self.author)
+        self.assertEqual(
+            Recipe.objects.get(id=self.recipe.id).updated,
+            updated
+        )
+        self.author.last_name = 'new_family'
+        self.author.save()
+        self.assertGreater(
+            Recipe.objects.get(id=self.recipe.id).updated,
+            updated
+        )
+
+    def test_not_found(self):
+        """
+        Несуществующий рецепт - 404 без ETag.
+        """
+        response = self.client.get('/api/recipes/1000/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,162 @@
+from collections import defaultdict
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cookbook.cookable_index import CookableIndex, cookable_index
+from cookbook.models import Ingredient, Recipe, RecipeIngredients
+
+User = get_user_model()
+
+
+class CookableRecipesTests(APITestCase):
+    def setUp(self) -> None:
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.ingredients = {
+            name: Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'яйца', 'молоко', 'сахар', 'соль')
+        }
+        self.recipes = {}
+        for name, ingredients in (
+            ('блины', ('мука', 'яйца', 'молоко')),
+            ('омлет', ('яйца', 'молоко', 'соль')),
+            ('безе', ('яйца', 'сахар')),
+            ('соленая вода', ('соль',)),
+        ):
+            self.recipes[name] = self.create_recipe(name, ingredients)
+        cookable_index.invalidate()
+        self.addCleanup(cookable_index.invalidate)
+
+    def create_recipe(self, name, ingredients):
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name=name,
+            text=f'{name}_text',
+            image='',
+            cooking_time=10
+        )
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe,
+                ingredient=self.ingredients[ingredient],
+                amount=1
+            )
+            for ingredient in ingredients
+        )
+        return recipe
+
+    def get(self, *ingredients, **params):
+        response = self.client.get('/api/recipes/cookable/', {
+            'ingredients': [self.ingredients[name].id for name in ingredients],
+            **params
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (item['name'], item['ingredients_matched'],
+             item['ingredients_missing'])
+            for item in response.json()
+        ]
+
+    def test_exact(self):
+        """Без max_missing - только рецепты из имеющихся ингредиентов."""
+        self.assertEqual(
+            self.get('яйца', 'молоко', 'соль', 'мука'),
+            [('блины', 3, 0), ('омлет', 3, 0), ('соленая вода', 1, 0)]
+        )
+
+    def test_max_missing(self):
+        """Сортировка по доле имеющихся, затем по недостающим."""
+        self.assertEqual(
+            self.get('яйца', 'молоко', max_missing=2),
+            [('блины', 2, 1), ('омлет', 2, 1), ('безе', 1, 1)]
+        )
+        self.assertEqual(self.get('сахар', max_missing=0), [])
+
+    def test_pagination(self):
+        response = self.client.get('/api/recipes/cookable/', {
+            'ingredients': self.ingredients['яйца'].id,
+            'max_missing': 2,
+            'limit': 2
+        })
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(
+            [item['name'] for item in data['results']],
+            ['безе', 'блины']
+        )
+
+    def test_invalid_params(self):
+        for params in (
+            {},
+            {'ingredients': 'x'},
+            {'ingredients': 1, 'max_missing': -1},
+            {'ingredients': 1, 'max_missing': 100},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/cookable/', params)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST
+                )
+
+    def test_update_recipes(self):
+        """Точечное обновление даёт тот же индекс, что и перестроение."""
+        index = CookableIndex()
+        index.build()
+        blini = self.recipes['блины']
+        RecipeIngredients.objects.filter(
+            recipe=blini, ingredient=self.ingredients['мука']
+        ).delete()
+        RecipeIngredients.objects.create(
+            recipe=blini, ingredient=self.ingredients['сахар'], amount=1
+        )
+        new_recipe = self.create_recipe('сладкое молоко', ('молоко', 'сахар'))
+        removed = self.recipes['безе']
+        removed_id = removed.id
+        removed.delete()
+        index.update_recipes((blini.id, new_recipe.id, removed_id))
+        rebuilt = CookableIndex()
+        rebuilt.build()
+        self.assertEqual(index._recipes, rebuilt._recipes)
+        for ingredients in self.get_subsets():
+            with self.subTest(ingredients=ingredients):
+                self.assertEqual(
+                    index.search(ingredients, 1),
+                    rebuilt.search(ingredients, 1)
+                )
+
+    def get_subsets(self):
+        ids = [ingredient.id for ingredient in self.ingredients.values()]
+        return [
+            [ingredient_id for bit, ingredient_id in enumerate(ids)
+             if mask >> bit & 1]
+            for mask in range(1, 2 ** len(ids))
+        ]
+
+    def test_matches_brute_force(self):
+        """Побитовый подсчёт совпадает с прямым перебором рецептов."""
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredients.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ):
+            recipes[recipe_id].add(ingredient_id)
+        for ingredients, max_missing in product(self.get_subsets(), range(3)):
+            expected = {
+                (recipe_id, len(recipe & set(ingredients)), len(recipe))
+                for recipe_id, recipe in recipes.items()
+                if recipe & set(ingredients)
+                and len(recipe - set(ingredients)) <= max_missing
+            }
+            with self.subTest(ingredients=ingredients,
+                              max_missing=max_missing):
+                self.assertEqual(
+                    set(cookable_index.search(ingredients, max_missing)),
+                    expected
+                )
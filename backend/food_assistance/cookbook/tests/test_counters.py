@@ -0,0 +1,164 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import FavoritRecipes, Ingredient, Recipe, Tag
+from cookbook.serializers import RecipesCreateSerializer
+from cookbook.tests.test_uploads import (TemporaryMediaMixin, data_uri,
+                                         image_bytes)
+from users.authentication import token_cache
+from users.models import Follow
+
+User = get_user_model()
+
+
+class CountersTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.reader = User.objects.create(
+            email='reader@yandex.ru',
+            username='reader',
+            first_name='reader_name',
+            last_name='reader_family',
+            password='Reader**Qwerty123'
+        )
+        self.recipe = self.create_recipe(self.author)
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(user=self.reader)
+
+    def create_recipe(self, author):
+        return Recipe.objects.create(
+            author=author,
+            name='recipe',
+            text='recipe_text',
+            image='recipe.png',
+            cooking_time=10
+        )
+
+    def assert_counters(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual(
+            {field: getattr(obj, field) for field in expected},
+            expected
+        )
+
+    def test_favorite_and_cart(self):
+        """Добавление и удаление через API меняют счётчики рецепта."""
+        url = f'/api/recipes/{self.recipe.id}'
+        for path in ('favorite', 'shopping_cart'):
+            response = self.reader_client.post(f'{url}/{path}/')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.reader_client.post(f'{url}/{path}/')
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+        self.assert_counters(self.recipe, favorites_count=1, cart_count=1)
+        response = self.reader_client.delete(f'{url}/favorite/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_counters(self.recipe, favorites_count=0, cart_count=1)
+
+    def test_author_counters(self):
+        """Счётчики рецептов и подписчиков автора."""
+        self.assert_counters(self.author, recipes_count=1)
+        response = self.reader_client.post(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['recipes_count'], 1)
+        self.assert_counters(self.author, followers_count=1)
+        self.recipe.author = self.reader
+        self.recipe.save()
+        self.assert_counters(self.author, recipes_count=0)
+        self.assert_counters(self.reader, recipes_count=1)
+        self.recipe.delete()
+        self.assert_counters(self.reader, recipes_count=0)
+        Follow.objects.all().delete()
+        self.assert_counters(self.author, followers_count=0)
+
+    def test_subscriptions_use_counter(self):
+        """Список подписок не считает рецепты запросом с COUNT."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with self.assertNumQueries(2):
+            response = self.reader_client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['recipes_count'], 1)
+
+    def test_reconcile(self):
+        """Команда находит и исправляет расхождения счётчиков."""
+        FavoritRecipes.objects.bulk_create(
+            [FavoritRecipes(user=self.reader, recipe=self.recipe)]
+        )
+        User.objects.filter(id=self.author.id).update(recipes_count=5)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('Recipe.favorites_count: drifted 1', out.getvalue())
+        self.assertIn('User.recipes_count: drifted 1', out.getvalue())
+        self.assert_counters(self.recipe, favorites_count=0)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Recipe.favorites_count: fixed 1', out.getvalue())
+        self.assert_counters(self.recipe, favorites_count=1)
+        self.assert_counters(self.author, recipes_count=1)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertNotIn('drifted 1', out.getvalue())
+
+    def test_recipe_update_keeps_counters(self):
+        """
+        Редактирование рецепта, прочитанного до добавления
+        в избранное, не затирает счётчик.
+        """
+        stale = Recipe.objects.get(id=self.recipe.id)
+        self.reader_client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        serializer = RecipesCreateSerializer(stale, data={
+            'ingredients': [{
+                'id': Ingredient.objects.create(
+                    name='ingredient', measurement_unit='г'
+                ).id,
+                'amount': 10
+            }],
+            'tags': [Tag.objects.create(
+                name='tag', color='#A12345', slug='tag'
+            ).id],
+            'image': data_uri(image_bytes()),
+            'name': 'new_name',
+            'text': 'new_text',
+            'cooking_time': 20
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assert_counters(self.recipe, favorites_count=1, name='new_name')
+
+    def test_set_password_keeps_counters(self):
+        """
+        Смена пароля пользователем из кэша токенов не затирает
+        число его подписчиков.
+        """
+        token_cache.clear()
+        self.author.set_password('Author**Qwerty123')
+        self.author.save()
+        token = Token.objects.create(user=self.author)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(
+            client.get('/api/users/me/').status_code,
+            status.HTTP_200_OK
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = client.post('/api/users/set_password/', {
+            'current_password': 'Author**Qwerty123',
+            'new_password': 'New**Qwerty456'
+        })
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_counters(self.author, followers_count=1, recipes_count=1)
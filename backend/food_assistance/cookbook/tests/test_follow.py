@@ -226,3 +226,83 @@ class SubscribeTests(APITestCase):
             response_dict.get('errors'),
             'Subscription does not exist.'
         )
+
+
+class SubscriptionsQueriesTests(APITestCase):
+    def setUp(self) -> None:
+        self.follower = User.objects.create(
+            email='follower@yandex.ru',
+            username='follower',
+            first_name='follower_name',
+            last_name='follower_family',
+            password='Follower**Qwerty123'
+        )
+        self.authors = []
+        for number in range(10):
+            author = User.objects.create(
+                email=f'author{number}@yandex.ru',
+                username=f'author{number}',
+                first_name='author_name',
+                last_name='author_family',
+                password='Author**Qwerty123'
+            )
+            for recipe_number in range(number % 4):
+                Recipe.objects.create(
+                    author=author,
+                    name=f'recipe{recipe_number}_name',
+                    text='recipe_text',
+                    image='',
+                    cooking_time=12
+                )
+            Follow.objects.create(author=author, user=self.follower)
+            self.authors.append(author)
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.follower)
+
+    def test_subscriptions_queries_count(self):
+        """
+        Число запросов к БД не зависит от числа авторов на странице.
+        """
+        url = '/api/users/subscriptions/?page=1&recipes_limit=2&limit='
+        for page_size in (1, 10):
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(3):
+                    response = self.auth_client.get(url + str(page_size))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    len(response.json().get('results')),
+                    page_size
+                )
+
+    def test_subscriptions_recipes(self):
+        """
+        Для каждого автора возвращаются его последние рецепты
+        с учетом recipes_limit и общее число рецептов.
+        """
+        url = '/api/users/subscriptions/?page=1&limit=10&recipes_limit='
+        for recipes_limit in (0, 2, 5):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.auth_client.get(url + str(recipes_limit))
+                results = response.json().get('results')
+                for author, result in zip(self.authors, results):
+                    recipes_count = author.recipes.count()
+                    self.assertEqual(result['id'], author.id)
+                    self.assertTrue(result['is_subscribed'])
+                    self.assertEqual(result['recipes_count'], recipes_count)
+                    self.assertEqual(
+                        [recipe['id'] for recipe in result['recipes']],
+                        list(author.recipes.order_by(
+                            '-created', '-id'
+                        ).values_list('id', flat=True)[:recipes_limit])
+                    )
+
+    def test_subscriptions_empty(self):
+        """
+        Пустой список подписок не выполняет запрос рецептов.
+        """
+        Follow.objects.all().delete()
+        with self.assertNumQueries(1):
+            response = self.auth_client.get(
+                '/api/users/subscriptions/?page=1&limit=10&recipes_limit=2'
+            )
+        self.assertEqual(response.json().get('results'), [])
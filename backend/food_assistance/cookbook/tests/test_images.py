@@ -0,0 +1,96 @@
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cookbook.images import build_renditions, rendition_name
+from cookbook.models import Recipe
+from cookbook.tests.test_uploads import TemporaryMediaMixin
+
+User = get_user_model()
+
+
+def make_image(size=(2000, 1000), mode='RGBA', image_format='PNG'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 100, 50, 128)[:len(mode)]).save(
+        buffer, image_format
+    )
+    return ContentFile(buffer.getvalue(), name=f'test.{image_format.lower()}')
+
+
+class RecipeRenditionsTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='recipe',
+            text='recipe_text',
+            image=make_image(),
+            cooking_time=10
+        )
+
+    def test_build_renditions(self):
+        """
+        Для каждого размера строятся WebP и JPEG, вписанные в границы
+        с сохранением пропорций.
+        """
+        self.assertTrue(build_renditions(self.recipe.id))
+        image_name = self.recipe.image.name
+        for size, bounds, expected in (
+            ('thumbnail', (320, 320), (320, 160)),
+            ('medium', (960, 960), (960, 480)),
+        ):
+            for extension, image_format in (('webp', 'WEBP'),
+                                            ('jpg', 'JPEG')):
+                with self.subTest(size=size, extension=extension):
+                    name = rendition_name(image_name, size, extension)
+                    with default_storage.open(name) as rendition_file:
+                        rendition = Image.open(rendition_file)
+                        self.assertEqual(rendition.format, image_format)
+                        self.assertEqual(rendition.size, expected)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, image_name)
+
+    def test_replaced_image_skipped(self):
+        """Копии не отмечаются готовыми, если картинку уже заменили."""
+        self.assertFalse(build_renditions(self.recipe.id, 'other.png'))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, '')
+
+    def test_serializer_urls(self):
+        """
+        До построения копий URL указывают на оригинал,
+        после - на файлы копий.
+        """
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['images']['thumbnail']['webp'], data['image'])
+        build_renditions(self.recipe.id)
+        data = self.client.get(f'/api/recipes/{self.recipe.id}/').json()
+        self.assertTrue(
+            data['images']['thumbnail']['webp'].endswith('_thumbnail.webp')
+        )
+        self.assertTrue(
+            data['images']['medium']['jpeg'].endswith('_medium.jpg')
+        )
+
+    def test_backfill_command(self):
+        """Команда строит копии только для рецептов без них."""
+        out = StringIO()
+        call_command('build_recipe_renditions', '--workers', '0', stdout=out)
+        self.assertIn('built: 1, failed: 0', out.getvalue())
+        out = StringIO()
+        call_command('build_recipe_renditions', '--workers', '0', stdout=out)
+        self.assertIn('built: 0, failed: 0', out.getvalue())
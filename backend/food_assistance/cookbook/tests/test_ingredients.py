@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APITestCase
+from cookbook.ingredient_index import ingredient_index
 from cookbook.models import Ingredient
 
 
@@ -73,3 +74,65 @@ class IngredientsListTests(APITestCase):
         self.assertEqual(response_dict.get('name'), 'ingr3_name')
         response = self.client.get('/api/ingredients/123/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class IngredientIndexTests(APITestCase):
+    def setUp(self) -> None:
+        for name in ('Сахар', 'сахарная пудра', 'Ванильный сахар',
+                     'Соль', 'Ёжевика'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def get_names(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_before_substring(self):
+        """
+        Поиск без учёта регистра: сначала совпадения по началу
+        названия, затем по вхождению.
+        """
+        self.assertEqual(
+            self.get_names('САХ'),
+            ['Сахар', 'сахарная пудра', 'Ванильный сахар']
+        )
+        self.assertEqual(self.get_names('ежев'), ['Ёжевика'])
+        self.assertEqual(self.get_names('not_exist_name'), [])
+
+    def test_search_without_queries(self):
+        """
+        Построенный индекс отвечает без обращения к БД.
+        """
+        self.get_names('с')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.get_names('с')), 4)
+            self.assertEqual(len(self.get_names('')), 5)
+
+    def test_invalidation(self):
+        """
+        Индекс сбрасывается при создании и удалении ингредиента.
+        """
+        self.assertEqual(self.get_names('соль'), ['Соль'])
+        ingredient = Ingredient.objects.create(
+            name='Соль морская',
+            measurement_unit='г'
+        )
+        self.assertEqual(self.get_names('соль'), ['Соль', 'Соль морская'])
+        ingredient.delete()
+        self.assertEqual(self.get_names('соль'), ['Соль'])
+
+    def test_ttl_rebuild(self):
+        """
+        Устаревший индекс перестраивается после истечения TTL.
+        """
+        ingredient_index.search('с')
+        Ingredient.objects.bulk_create(
+            (Ingredient(name='Соль каменная', measurement_unit='г'),)
+        )
+        self.assertEqual(len(ingredient_index.search('соль')), 1)
+        ttl = ingredient_index.ttl
+        ingredient_index.ttl = -1
+        try:
+            self.assertEqual(len(ingredient_index.search('соль')), 2)
+        finally:
+            ingredient_index.ttl = ttl
@@ -0,0 +1,119 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from cookbook.cache import response_cache
+from cookbook.ingredient_index import ingredient_index
+from cookbook.management.commands.ingredients_from_csv import Command
+from cookbook.models import Ingredient
+
+
+class IngredientsFromCsvTests(TestCase):
+    def setUp(self) -> None:
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        csv_file = tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8', delete=False
+        )
+        with csv_file:
+            csv_file.write(
+                'name,measurement_unit\n'
+                'соль,г\n'
+                'сахар,г\n'
+                'сахар,кг\n'
+                'молоко,мл\n'
+                'молоко,мл\n'
+            )
+        self.path = csv_file.name
+        self.addCleanup(os.remove, self.path)
+
+    def import_csv(self):
+        out = StringIO()
+        call_command('ingredients_from_csv', self.path, chunk_size=2,
+                     stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        """
+        Импорт пропускает существующие ингредиенты и дубликаты в файле.
+        """
+        self.assertIn('inserted: 3, skipped: 2', self.import_csv())
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_import_is_idempotent(self):
+        """
+        Повторный импорт ничего не вставляет.
+        """
+        self.import_csv()
+        self.assertIn('inserted: 0, skipped: 5', self.import_csv())
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_concurrent_insert(self):
+        """
+        Одновременная вставка других ингредиентов не меняет
+        число вставленных и пропущенных строк.
+        """
+        insert_chunk = Command.insert_chunk
+
+        def concurrent_insert_chunk(command, using, pairs):
+            Ingredient.objects.get_or_create(
+                name='перец', measurement_unit='г'
+            )
+            return insert_chunk(command, using, pairs)
+
+        for returning in (True, False):
+            Ingredient.objects.exclude(name='соль').delete()
+            with self.subTest(returning=returning), mock.patch.object(
+                Command, 'insert_chunk', concurrent_insert_chunk
+            ), mock.patch(
+                'cookbook.management.commands.ingredients_from_csv.'
+                'can_return_rows',
+                return_value=returning
+            ):
+                self.assertIn('inserted: 3, skipped: 2', self.import_csv())
+
+    def test_missing_columns(self):
+        with open(self.path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write('title,unit\nсоль,г\n')
+        with self.assertRaisesMessage(
+            CommandError, 'В файле нет колонок: name, measurement_unit.'
+        ):
+            self.import_csv()
+
+    def test_chunk_size_capped(self):
+        """Размер пачки ограничен числом параметров запроса СУБД."""
+        with mock.patch.object(
+            connection.ops, 'bulk_batch_size', return_value=2
+        ), mock.patch.object(
+            Command, 'insert_chunk', autospec=True, return_value=0
+        ) as insert_chunk:
+            call_command('ingredients_from_csv', self.path, stdout=StringIO())
+        self.assertEqual(
+            [len(call.args[2]) for call in insert_chunk.call_args_list],
+            [2, 2, 1]
+        )
+
+    def test_invalidates_caches(self):
+        """
+        bulk_create обходит сигналы, индекс и кэш ответов
+        сбрасываются явно и только если что-то вставлено.
+        """
+        with mock.patch.object(
+            ingredient_index, 'invalidate'
+        ) as invalidate_index, mock.patch.object(
+            response_cache, 'invalidate_group'
+        ) as invalidate_group:
+            self.import_csv()
+            invalidate_index.assert_called_once_with()
+            self.assertEqual(
+                [call.args for call in invalidate_group.call_args_list],
+                [('ingredients',), ('recipes',)]
+            )
+            invalidate_index.reset_mock()
+            invalidate_group.reset_mock()
+            self.import_csv()
+            invalidate_index.assert_not_called()
+            invalidate_group.assert_not_called()
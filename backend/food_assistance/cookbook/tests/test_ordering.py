@@ -0,0 +1,159 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import FavoritRecipes, Recipe, ShoppingCartRecipes
+from cookbook.trending import trending_score
+
+User = get_user_model()
+
+
+class RecipeOrderingTests(APITestCase):
+    def setUp(self) -> None:
+        self.users = [
+            User.objects.create(
+                email=f'user{number}@yandex.ru',
+                username=f'user{number}',
+                first_name=f'user{number}_name',
+                last_name=f'user{number}_family',
+                password='User**Qwerty123'
+            )
+            for number in range(3)
+        ]
+        self.recipes = {
+            name: Recipe.objects.create(
+                author=self.users[0],
+                name=name,
+                text=f'{name}_text',
+                image='',
+                cooking_time=cooking_time
+            )
+            for name, cooking_time in (
+                ('old_hit', 30), ('fresh', 10), ('quiet', 20)
+            )
+        }
+        month_ago = timezone.now() - timedelta(days=30)
+        for user in self.users:
+            self.add(FavoritRecipes, user, 'old_hit', month_ago)
+        self.add(FavoritRecipes, self.users[0], 'fresh')
+        self.add(ShoppingCartRecipes, self.users[1], 'fresh')
+
+    def add(self, model, user, name, created=None):
+        entry = model.objects.create(user=user, recipe=self.recipes[name])
+        if created is not None:
+            model.objects.filter(id=entry.id).update(created=created)
+
+    def get_names(self, ordering, client=None):
+        response = (client or self.client).get(
+            '/api/recipes/', {'ordering': ordering}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['name'] for recipe in response.json()]
+
+    def recompute(self, *args):
+        out = StringIO()
+        call_command('recompute_trending', *args, stdout=out)
+        return out.getvalue()
+
+    def test_orderings(self):
+        """popular, cooking_time и newest (по умолчанию)."""
+        self.assertEqual(
+            self.get_names('popular'),
+            ['old_hit', 'fresh', 'quiet']
+        )
+        self.assertEqual(
+            self.get_names('cooking_time'),
+            ['fresh', 'quiet', 'old_hit']
+        )
+        self.assertEqual(
+            self.get_names('newest'),
+            ['quiet', 'fresh', 'old_hit']
+        )
+
+    def test_trending(self):
+        """Свежая активность важнее старой, но более частой."""
+        self.assertIn('recomputed: 2', self.recompute())
+        self.assertEqual(
+            self.get_names('trending'),
+            ['fresh', 'old_hit', 'quiet']
+        )
+
+    def test_incremental_recompute(self):
+        """Пересчитываются только рецепты с новой активностью."""
+        self.recompute()
+        self.assertIn('recomputed: 0', self.recompute())
+        self.add(FavoritRecipes, self.users[2], 'quiet')
+        self.assertIn('recomputed: 1', self.recompute())
+        FavoritRecipes.objects.filter(recipe=self.recipes['quiet']).delete()
+        self.assertIn('recomputed: 1', self.recompute())
+        self.recipes['quiet'].refresh_from_db()
+        self.assertEqual(self.recipes['quiet'].trending_score, 0)
+        self.assertIn('recomputed: 3', self.recompute('--all'))
+
+    def test_trending_score(self):
+        """Вклад события уменьшается вдвое за период полураспада."""
+        now = timezone.now()
+        half_life = 60 * 60
+        self.assertAlmostEqual(
+            trending_score(
+                [(1.0, now - timedelta(seconds=half_life))], half_life
+            ),
+            trending_score([(0.5, now)], half_life)
+        )
+        self.assertAlmostEqual(
+            trending_score([(1.0, now), (1.0, now)], half_life),
+            trending_score([(1.0, now)], half_life) + 1
+        )
+        self.assertEqual(trending_score([]), 0)
+
+    def test_cache_refreshed(self):
+        """
+        Пересчёт сбрасывает кэш списков, а избранное - ETag
+        для сортировки popular.
+        """
+        self.assertEqual(self.get_names('trending')[0], 'old_hit')
+        self.recompute()
+        self.assertEqual(self.get_names('trending')[0], 'fresh')
+        client = APIClient()
+        client.force_authenticate(user=self.users[2])
+        response = client.get('/api/recipes/', {'ordering': 'popular'})
+        etag = response['ETag']
+        self.add(FavoritRecipes, self.users[1], 'quiet')
+        self.add(FavoritRecipes, self.users[2], 'quiet')
+        response = client.get(
+            '/api/recipes/', {'ordering': 'popular'},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_popular_anonymous_cache(self):
+        """Избранное сбрасывает кэш анонимного списка popular."""
+        self.assertEqual(
+            self.get_names('popular'),
+            ['old_hit', 'fresh', 'quiet']
+        )
+        self.add(FavoritRecipes, self.users[1], 'quiet')
+        self.add(FavoritRecipes, self.users[2], 'quiet')
+        self.assertEqual(
+            self.get_names('popular'),
+            ['old_hit', 'quiet', 'fresh']
+        )
+
+    def test_cursor(self):
+        """Навигация по ?cursor= использует выбранную сортировку."""
+        names = []
+        url = '/api/recipes/?ordering=popular&cursor=&limit=1'
+        while url:
+            data = self.client.get(url).json()
+            names.extend(recipe['name'] for recipe in data['results'])
+            url = data['next']
+        self.assertEqual(names, ['old_hit', 'fresh', 'quiet'])
+
+    def test_invalid_ordering(self):
+        response = self.client.get('/api/recipes/', {'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.json())
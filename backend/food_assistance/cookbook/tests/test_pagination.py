@@ -0,0 +1,193 @@
+import json
+from base64 import b64encode
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+RECIPES_COUNT = 13
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self) -> None:
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        created = timezone.now()
+        for number in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name=f'recipe_{number}',
+                text=f'recipe_{number}_text',
+                image='',
+                cooking_time=10
+            )
+            # Каждые три рецепта имеют одинаковую дату создания,
+            # порядок внутри группы определяется id.
+            Recipe.objects.filter(id=recipe.id).update(
+                created=created + timedelta(seconds=number // 3)
+            )
+        self.expected = list(
+            Recipe.objects.order_by('-created', 'id').values_list(
+                'name', flat=True
+            )
+        )
+
+    def walk(self, url, link):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertNotIn('count', data)
+            names.extend(recipe['name'] for recipe in data['results'])
+            url = data[link]
+        return names
+
+    def test_walk_forward(self):
+        """
+        Проход по ?cursor= возвращает все рецепты по (-created, id)
+        без пропусков и повторов.
+        """
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=4', 'next'),
+            self.expected
+        )
+
+    def test_walk_backward(self):
+        """Ссылки previous возвращают к началу списка."""
+        url = '/api/recipes/?cursor=&limit=4'
+        while True:
+            data = self.client.get(url).json()
+            if data['next'] is None:
+                break
+            url = data['next']
+        names = self.walk(data['previous'], 'previous')
+        pages = [self.expected[start:start + 4]
+                 for start in range(0, RECIPES_COUNT, 4)]
+        self.assertEqual(
+            names,
+            [name for page in reversed(pages[:-1]) for name in page]
+        )
+
+    def test_first_page_links(self):
+        """У первой страницы нет ссылки previous."""
+        data = self.client.get('/api/recipes/?cursor=&limit=5').json()
+        self.assertIsNone(data['previous'])
+        self.assertIn('cursor=', data['next'])
+        self.assertEqual(
+            [recipe['name'] for recipe in data['results']],
+            self.expected[:5]
+        )
+
+    def test_default_page_size(self):
+        """Без ?limit= в режиме cursor используется размер по умолчанию."""
+        data = self.client.get('/api/recipes/?cursor=').json()
+        self.assertEqual(len(data['results']), 6)
+
+    def test_no_count_query(self):
+        """В режиме cursor не выполняется COUNT(*)."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/recipes/?cursor=&limit=4')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(*)', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор возвращает 404."""
+        cursors = (
+            'abc',
+            'eyJwIjogMX0=',
+            'eyJwIjogWyJ4IiwgIjEiXSwgInIiOiAwfQ==',
+            *(
+                quote(b64encode(json.dumps(
+                    {'p': position, 'r': 0}
+                ).encode()).decode())
+                for position in (
+                    [['2020-01-01T00:00:00+00:00'], '1'],
+                    [{'a': 1}, '1'],
+                    ['2020-01-01T00:00:00+00:00', [1]],
+                    [None, '1'],
+                )
+            )
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_404_NOT_FOUND
+                )
+
+    def test_page_number_mode_kept(self):
+        """?page=&limit= работает как прежде и использует тот же порядок."""
+        data = self.client.get('/api/recipes/?page=2&limit=4').json()
+        self.assertEqual(data['count'], RECIPES_COUNT)
+        self.assertEqual(
+            [recipe['name'] for recipe in data['results']],
+            self.expected[4:8]
+        )
+
+    def test_approximate_count(self):
+        """
+        ?count=approximate на небольшой выборке возвращает точное число,
+        ссылка next определяется по наличию следующих строк.
+        """
+        data = self.client.get(
+            '/api/recipes/?page=4&limit=4&count=approximate'
+        ).json()
+        self.assertEqual(data['count'], RECIPES_COUNT)
+        self.assertIsNone(data['next'])
+        self.assertEqual(
+            [recipe['name'] for recipe in data['results']],
+            self.expected[12:]
+        )
+        response = self.client.get(
+            '/api/recipes/?page=5&limit=4&count=approximate'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_subscriptions_cursor(self):
+        """Подписки листаются курсором по id автора."""
+        follower = User.objects.create(
+            email='follower@yandex.ru',
+            username='follower',
+            first_name='follower_name',
+            last_name='follower_family',
+            password='Follower**Qwerty123'
+        )
+        authors = [self.author] + [
+            User.objects.create(
+                email=f'author{number}@yandex.ru',
+                username=f'author{number}',
+                first_name='author_name',
+                last_name='author_family',
+                password='Author**Qwerty123'
+            )
+            for number in range(4)
+        ]
+        for author in authors:
+            Follow.objects.create(user=follower, author=author)
+        client = APIClient()
+        client.force_authenticate(user=follower)
+        url = '/api/users/subscriptions/?cursor=&limit=2&recipes_limit=1'
+        ids = []
+        while url:
+            data = client.get(url).json()
+            ids.extend(author['id'] for author in data['results'])
+            url = data['next']
+        self.assertEqual(ids, sorted(author.id for author in authors))
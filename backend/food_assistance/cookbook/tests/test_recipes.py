@@ -4,6 +4,7 @@ from rest_framework.test import APIClient, APITestCase
 from food_assistance.settings import MINIMUM_AMOUNT_OF_INGREDIENT as MIN_AMOUNT
 from cookbook.models import (FavoritRecipes, Ingredient, Recipe,
                              RecipeIngredients, Tag)
+from cookbook.tests.test_uploads import TemporaryMediaMixin
 
 User = get_user_model()
 
@@ -201,8 +202,9 @@ class RecipesListTests(APITestCase):
         )
 
 
-class CreateRecipeTests(APITestCase):
+class CreateRecipeTests(TemporaryMediaMixin, APITestCase):
     def setUp(self) -> None:
+        super().setUp()
         self.test_user = User.objects.create(
             email='test_user@yandex.ru',
             username='test_user',
@@ -283,7 +285,8 @@ class CreateRecipeTests(APITestCase):
             list(response_dict.keys()),
             [
                 'id', 'tags', 'author', 'ingredients', 'is_favorited',
-                'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+                'is_in_shopping_cart', 'name', 'image', 'images', 'text',
+                'cooking_time'
             ]
         )
         self.assertEqual(type(response_dict.get('tags')), type([]))
@@ -338,8 +341,9 @@ class CreateRecipeTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class GetPatchDelRecipeTests(APITestCase):
+class GetPatchDelRecipeTests(TemporaryMediaMixin, APITestCase):
     def setUp(self) -> None:
+        super().setUp()
         self.test_user = User.objects.create(
             email='test_user@yandex.ru',
             username='test_user',
@@ -0,0 +1,288 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import (FavoritRecipes, Ingredient, Recipe,
+                             RecipeIngredients, ShoppingCartRecipes, Tag)
+from cookbook.tests.test_uploads import TemporaryMediaMixin
+from users.models import Follow
+
+User = get_user_model()
+
+PAGE_SIZES = (1, 10, 100)
+
+
+class RecipesQueriesCountTests(APITestCase):
+    def setUp(self) -> None:
+        self.test_user = User.objects.create(
+            email='test_user@yandex.ru',
+            username='test_user',
+            first_name='test_user_name',
+            last_name='test_user_family',
+            password='Test**Qwerty123'
+        )
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        Follow.objects.create(user=self.test_user, author=self.author)
+        self.tag1 = Tag.objects.create(
+            name='tag1_name',
+            color='#A12345',
+            slug='tag1'
+        )
+        self.tag2 = Tag.objects.create(
+            name='tag2_name',
+            color='#B12345',
+            slug='tag2'
+        )
+        self.ingr1 = Ingredient.objects.create(
+            name='ingr1_name',
+            measurement_unit='шт'
+        )
+        self.ingr2 = Ingredient.objects.create(
+            name='ingr2_name',
+            measurement_unit='кг'
+        )
+        for number in range(max(PAGE_SIZES)):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name=f'recipe_{number}',
+                text=f'recipe_{number}_text',
+                image='',
+                cooking_time=10
+            )
+            recipe.tags.set((self.tag1, self.tag2))
+            RecipeIngredients.objects.bulk_create((
+                RecipeIngredients(
+                    recipe=recipe, ingredient=self.ingr1, amount=1
+                ),
+                RecipeIngredients(
+                    recipe=recipe, ingredient=self.ingr2, amount=2
+                ),
+            ))
+            if number % 2:
+                FavoritRecipes.objects.create(
+                    user=self.test_user,
+                    recipe=recipe
+                )
+            if number % 3:
+                ShoppingCartRecipes.objects.create(
+                    user=self.test_user,
+                    recipe=recipe
+                )
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.test_user)
+
+    def get_page(self, client, page_size, num_queries):
+        with self.assertNumQueries(num_queries):
+            response = client.get(f'/api/recipes/?page=1&limit={page_size}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json().get('results')
+
+    def test_list_queries_count_auth(self):
+        """
+        Число запросов к БД для авторизованного пользователя
+        не зависит от размера страницы.
+        """
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size):
+                results = self.get_page(self.auth_client, page_size, 6)
+                self.assertEqual(len(results), page_size)
+                self.assertTrue(results[0]['author']['is_subscribed'])
+                self.assertEqual(len(results[0]['ingredients']), 2)
+                self.assertEqual(len(results[0]['tags']), 2)
+
+    def test_list_queries_count_anonymous(self):
+        """
+        Число запросов к БД для анонимного пользователя
+        не зависит от размера страницы.
+        """
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size):
+                results = self.get_page(self.client, page_size, 5)
+                self.assertEqual(len(results), page_size)
+                self.assertFalse(results[0]['author']['is_subscribed'])
+                self.assertFalse(results[0]['is_favorited'])
+
+    def test_list_flags(self):
+        """
+        Флаги is_favorited и is_in_shopping_cart соответствуют БД.
+        """
+        results = self.get_page(self.auth_client, 100, 6)
+        for recipe in results:
+            with self.subTest(recipe=recipe['name']):
+                number = int(recipe['name'].split('_')[1])
+                self.assertEqual(recipe['is_favorited'], bool(number % 2))
+                self.assertEqual(
+                    recipe['is_in_shopping_cart'],
+                    bool(number % 3)
+                )
+
+    def test_retrieve_queries_count(self):
+        """
+        Детальный просмотр рецепта использует тот же план загрузки.
+        """
+        recipe_id = Recipe.objects.first().id
+        with self.assertNumQueries(5):
+            response = self.auth_client.get(f'/api/recipes/{recipe_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_anonymous_flags_without_join(self):
+        """
+        Для анонимного пользователя флаги вычисляются без обращения
+        к таблицам избранного и корзины.
+        """
+        with CaptureQueriesContext(connection) as context:
+            results = self.get_page(self.client, 10, 5)
+        for recipe in results:
+            self.assertFalse(recipe['is_favorited'])
+            self.assertFalse(recipe['is_in_shopping_cart'])
+        for query in context.captured_queries:
+            self.assertNotIn('favoritrecipes', query['sql'])
+            self.assertNotIn('shoppingcartrecipes', query['sql'])
+
+
+class RecipesWriteQueriesTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.test_user = User.objects.create(
+            email='test_user@yandex.ru',
+            username='test_user',
+            first_name='test_user_name',
+            last_name='test_user_family',
+            password='Test**Qwerty123'
+        )
+        self.tags = [
+            Tag.objects.create(
+                name=f'tag{number}_name',
+                color=f'#A1234{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'ingr{number}_name',
+                measurement_unit='г'
+            )
+            for number in range(30)
+        ]
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.test_user)
+
+    def get_data(self, ingredients, tags=None):
+        return {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+            'tags': [tag.id for tag in (tags or self.tags)],
+            'image': ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAA'
+                      'BAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMA'
+                      'AA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJR'
+                      'U5ErkJggg=='),
+            'name': 'new_recipe',
+            'text': 'text about new recipe',
+            'cooking_time': 30
+        }
+
+    def count_queries(self, method, url, data):
+        with CaptureQueriesContext(connection) as context:
+            response = method(url, data)
+        self.assertIn(
+            response.status_code,
+            (status.HTTP_200_OK, status.HTTP_201_CREATED)
+        )
+        return len(context.captured_queries)
+
+    def test_create_queries_count(self):
+        """
+        Число запросов при создании рецепта не зависит
+        от числа ингредиентов.
+        """
+        one = self.count_queries(
+            self.auth_client.post,
+            '/api/recipes/',
+            self.get_data(((self.ingredients[0], 1),))
+        )
+        many = self.count_queries(
+            self.auth_client.post,
+            '/api/recipes/',
+            self.get_data((ingredient, 1) for ingredient in self.ingredients)
+        )
+        self.assertEqual(one, many)
+        self.assertEqual(RecipeIngredients.objects.count(), 31)
+
+    def test_update_applies_diff(self):
+        """
+        Обновление меняет только изменившиеся ингредиенты рецепта.
+        """
+        response = self.auth_client.post(
+            '/api/recipes/',
+            self.get_data(
+                (ingredient, 1) for ingredient in self.ingredients[:3]
+            )
+        )
+        recipe_id = response.json()['id']
+        kept = RecipeIngredients.objects.get(
+            recipe_id=recipe_id,
+            ingredient=self.ingredients[0]
+        )
+        changed = RecipeIngredients.objects.get(
+            recipe_id=recipe_id,
+            ingredient=self.ingredients[1]
+        )
+        response = self.auth_client.patch(
+            f'/api/recipes/{recipe_id}/',
+            self.get_data(
+                (
+                    (self.ingredients[0], 1),
+                    (self.ingredients[1], 5),
+                    (self.ingredients[3], 7),
+                ),
+                tags=self.tags[:1]
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = RecipeIngredients.objects.filter(recipe_id=recipe_id)
+        self.assertEqual(
+            sorted(rows.values_list('ingredient_id', 'amount')),
+            [
+                (self.ingredients[0].id, 1),
+                (self.ingredients[1].id, 5),
+                (self.ingredients[3].id, 7),
+            ]
+        )
+        self.assertTrue(rows.filter(id=kept.id, amount=1).exists())
+        self.assertTrue(rows.filter(id=changed.id, amount=5).exists())
+        self.assertEqual(len(response.json()['tags']), 1)
+
+    def test_invalid_ids(self):
+        """
+        Несуществующие и повторяющиеся id дают ошибку валидации.
+        """
+        data = self.get_data(
+            ((self.ingredients[0], 1), (self.ingredients[0], 2))
+        )
+        data['tags'].append(1000)
+        data['ingredients'].append({'id': 1000, 'amount': 1})
+        response = self.auth_client.post('/api/recipes/', data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response_dict = response.json()
+        self.assertEqual(
+            response_dict['tags'],
+            ['Invalid pk "1000" - object does not exist.']
+        )
+        self.assertEqual(
+            response_dict['ingredients'],
+            [
+                {},
+                {'id': ['Duplicate ingredient.']},
+                {'id': ['Invalid pk "1000" - object does not exist.']}
+            ]
+        )
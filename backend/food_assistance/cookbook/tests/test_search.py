@@ -0,0 +1,131 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cookbook.models import Ingredient, Recipe, RecipeIngredients
+from cookbook.search import get_terms, update_search_vectors
+
+User = get_user_model()
+
+
+class RecipeSearchTests(APITestCase):
+    def setUp(self) -> None:
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.recipes = {}
+        for name, text, ingredient in (
+            ('Пирог с яблоками', 'Сладкая выпечка', 'мука'),
+            ('Шарлотка', 'Пирог из яблок и муки', 'яблоко'),
+            ('Tomato soup', 'Classic soup with fresh tomatoes', 'томаты'),
+            ('Салат', 'Простой салат', 'огурцы'),
+        ):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name=name,
+                text=text,
+                image='',
+                cooking_time=10
+            )
+            RecipeIngredients.objects.create(
+                recipe=recipe,
+                ingredient=Ingredient.objects.get_or_create(
+                    name=ingredient,
+                    measurement_unit='г'
+                )[0],
+                amount=1
+            )
+            self.recipes[name] = recipe
+        update_search_vectors()
+
+    def search(self, text, **params):
+        response = self.client.get(
+            '/api/recipes/', {'search': text, **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['name'] for recipe in response.json()]
+
+    def test_rank(self):
+        """Совпадение в названии важнее совпадения в описании."""
+        self.assertEqual(
+            self.search('пироги'),
+            ['Пирог с яблоками', 'Шарлотка']
+        )
+
+    def test_ingredients(self):
+        """Поиск по названиям ингредиентов."""
+        self.assertEqual(self.search('огурцы'), ['Салат'])
+
+    def test_all_words(self):
+        """Рецепт должен содержать все слова запроса."""
+        self.assertEqual(self.search('tomatoes soup'), ['Tomato soup'])
+        self.assertEqual(self.search('пирог салат'), [])
+
+    def test_ordering(self):
+        """С ?search= работают и остальные сортировки."""
+        self.assertEqual(
+            self.search('пирог', ordering='newest'),
+            ['Шарлотка', 'Пирог с яблоками']
+        )
+        response = self.client.get('/api/recipes/', {'ordering': 'relevance'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor(self):
+        """Навигация по ?cursor= по рангу."""
+        names = []
+        data = self.client.get(
+            '/api/recipes/', {'search': 'пирог', 'cursor': '', 'limit': 1}
+        ).json()
+        while True:
+            names.extend(recipe['name'] for recipe in data['results'])
+            if not data['next']:
+                break
+            data = self.client.get(data['next']).json()
+        self.assertEqual(names, ['Пирог с яблоками', 'Шарлотка'])
+
+    def test_terms(self):
+        """Упрощённый стемминг запасного ранжирования."""
+        self.assertEqual(
+            get_terms('Пирогами и ЯБЛОКАМИ, tomatoes'),
+            ['пирог', 'и', 'яблок', 'tomato']
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL')
+class PostgresSearchVectorTests(APITestCase):
+    def test_search_vector(self):
+        """Вектор строится по названию, ингредиентам и описанию."""
+        author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            password='Author**Qwerty123'
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Борщ',
+            text='Traditional soup',
+            image='',
+            cooking_time=60
+        )
+        RecipeIngredients.objects.create(
+            recipe=recipe,
+            ingredient=Ingredient.objects.create(
+                name='свёкла',
+                measurement_unit='г'
+            ),
+            amount=1
+        )
+        update_search_vectors(pk=recipe.pk)
+        for text in ('борща', 'свёкла', 'soups'):
+            with self.subTest(text=text):
+                response = self.client.get('/api/recipes/', {'search': text})
+                self.assertEqual(
+                    [item['name'] for item in response.json()],
+                    ['Борщ']
+                )
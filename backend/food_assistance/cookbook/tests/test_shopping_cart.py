@@ -1,3 +1,7 @@
+import io
+import json
+
+import pypdf
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
@@ -160,5 +164,105 @@ class ShoppingCartTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         response = self.auth_client.get('/api/recipes/download_shopping_cart/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual('ingr1_name' in str(response.content), True)
-        self.assertEqual('ingr2_name' in str(response.content), True)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual('ingr1_name' in content, True)
+        self.assertEqual('ingr2_name' in content, True)
+
+    def get_shopping_list(self, list_format):
+        ShoppingCartRecipes.objects.create(
+            user=self.test_user,
+            recipe=self.test_recipe
+        )
+        ShoppingCartRecipes.objects.create(
+            user=self.test_user,
+            recipe=self.test_recipe2
+        )
+        with self.assertNumQueries(1):
+            response = self.auth_client.get(
+                '/api/recipes/download_shopping_cart/'
+                f'?format={list_format}'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename=shopping_list.{list_format}'
+        )
+        return b''.join(response.streaming_content)
+
+    def test_download_shopping_cart_txt(self):
+        """
+        Список покупок суммирует количество ингредиентов
+        и упорядочен по названию.
+        """
+        content = self.get_shopping_list('txt').decode()
+        self.assertEqual(
+            content,
+            'ingr1_name (шт) - 10\ningr2_name (кг) - 9\n'
+        )
+
+    def test_download_shopping_cart_csv(self):
+        """
+        Проверка списка покупок в формате csv.
+        """
+        content = self.get_shopping_list('csv').decode()
+        self.assertEqual(
+            content.splitlines(),
+            [
+                'name,measurement_unit,amount',
+                'ingr1_name,шт,10',
+                'ingr2_name,кг,9'
+            ]
+        )
+
+    def test_download_shopping_cart_json(self):
+        """
+        Проверка списка покупок в формате json.
+        """
+        content = json.loads(self.get_shopping_list('json'))
+        self.assertEqual(
+            content,
+            [
+                {'name': 'ingr1_name', 'measurement_unit': 'шт',
+                 'amount': 10},
+                {'name': 'ingr2_name', 'measurement_unit': 'кг',
+                 'amount': 9}
+            ]
+        )
+
+    def test_download_shopping_cart_pdf(self):
+        """
+        Проверка списка покупок в формате pdf.
+        """
+        content = self.get_shopping_list('pdf')
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        self.assertIn(b'/FontFile2', content)
+        self.assertNotIn(b'/Helvetica', content)
+        startxref = int(content.split(b'startxref\n')[1].split(b'\n')[0])
+        self.assertTrue(content[startxref:].startswith(b'xref'))
+
+    def test_download_shopping_cart_pdf_text(self):
+        """
+        Текст PDF с кириллицей читается обратно, шрифт встроен
+        в документ.
+        """
+        reader = pypdf.PdfReader(io.BytesIO(self.get_shopping_list('pdf')))
+        self.assertEqual(len(reader.pages), 1)
+        page = reader.pages[0]
+        self.assertEqual(
+            page.extract_text().splitlines(),
+            ['ingr1_name (шт) - 10', 'ingr2_name (кг) - 9']
+        )
+        font = page['/Resources']['/Font']['/F1']
+        self.assertEqual(font['/Subtype'], '/Type0')
+        descriptor = font['/DescendantFonts'][0]['/FontDescriptor']
+        self.assertTrue(
+            descriptor['/FontFile2'].get_data().startswith(b'\0\1\0\0')
+        )
+
+    def test_download_empty_shopping_cart(self):
+        """
+        Пустой список покупок возвращает 204.
+        """
+        response = self.auth_client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,235 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import (Ingredient, Recipe, RecipeIngredients,
+                             ShoppingCartRecipes, ShoppingListItem, Tag)
+from cookbook.shopping_list import reconcile_shopping_lists
+from cookbook.tests.test_uploads import (TemporaryMediaMixin, data_uri,
+                                         image_bytes)
+
+User = get_user_model()
+
+
+class ShoppingListTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        self.tag = Tag.objects.create(
+            name='tag_name',
+            color='#A12345',
+            slug='tag'
+        )
+        self.salt, self.flour, self.milk = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('salt', 'flour', 'milk')
+        )
+        self.bread = self.create_recipe('bread', {
+            self.salt: 5, self.flour: 500
+        })
+        self.pancakes = self.create_recipe('pancakes', {
+            self.salt: 2, self.flour: 200, self.milk: 300
+        })
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(user=self.author)
+
+    def create_recipe(self, name, amounts):
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name=name,
+            text='text',
+            image='',
+            cooking_time=10
+        )
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient,
+                              amount=amount)
+            for ingredient, amount in amounts.items()
+        )
+        return recipe
+
+    def shopping_list(self, user=None):
+        return dict(ShoppingListItem.objects.filter(
+            user=user or self.user
+        ).values_list('ingredient__name', 'amount'))
+
+    def assert_consistent(self):
+        self.assertEqual(
+            reconcile_shopping_lists(dry_run=True),
+            {'missing': 0, 'extra': 0, 'wrong': 0, 'users': 0}
+        )
+
+    def test_cart_changes(self):
+        """
+        Добавление и удаление рецептов в корзине (по одному, пачкой
+        и очисткой) меняют список покупок приращениями.
+        """
+        self.client.post(f'/api/recipes/{self.bread.id}/shopping_cart/')
+        self.assertEqual(self.shopping_list(), {'salt': 5, 'flour': 500})
+        self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'ids': [self.pancakes.id]},
+            format='json'
+        )
+        self.assertEqual(
+            self.shopping_list(),
+            {'salt': 7, 'flour': 700, 'milk': 300}
+        )
+        self.client.delete(f'/api/recipes/{self.bread.id}/shopping_cart/')
+        self.assertEqual(
+            self.shopping_list(),
+            {'salt': 2, 'flour': 200, 'milk': 300}
+        )
+        self.assert_consistent()
+        self.client.delete('/api/recipes/shopping_cart/')
+        self.assertEqual(self.shopping_list(), {})
+
+    def test_recipe_update(self):
+        """
+        Изменение ингредиентов рецепта переносится в списки покупок
+        всех пользователей, у которых он в корзине.
+        """
+        for user in (self.user, self.author):
+            ShoppingCartRecipes.objects.create(user=user, recipe=self.bread)
+        ShoppingCartRecipes.objects.create(
+            user=self.user, recipe=self.pancakes
+        )
+        response = self.author_client.patch(
+            f'/api/recipes/{self.bread.id}/',
+            {
+                'ingredients': [
+                    {'id': self.flour.id, 'amount': 400},
+                    {'id': self.milk.id, 'amount': 50},
+                ],
+                'tags': [self.tag.id],
+                'image': data_uri(image_bytes()),
+                'name': 'bread',
+                'text': 'text',
+                'cooking_time': 10
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.shopping_list(),
+            {'salt': 2, 'flour': 600, 'milk': 350}
+        )
+        self.assertEqual(
+            self.shopping_list(self.author),
+            {'flour': 400, 'milk': 50}
+        )
+        self.assert_consistent()
+
+    def test_recipe_update_order(self):
+        """
+        Рецепт блокируется до чтения ингредиентов, приращения
+        применяются после записи новых ингредиентов.
+        """
+        calls = []
+
+        def change_recipe(recipe_id, deltas):
+            calls.append(('change_recipe', dict(
+                RecipeIngredients.objects.filter(
+                    recipe_id=recipe_id
+                ).values_list('ingredient_id', 'amount')
+            ), deltas))
+
+        with mock.patch(
+            'cookbook.serializers.lock_recipes',
+            side_effect=lambda ids, using: calls.append(('lock', ids))
+        ), mock.patch(
+            'cookbook.serializers.change_recipe', change_recipe
+        ):
+            response = self.author_client.patch(
+                f'/api/recipes/{self.bread.id}/',
+                {
+                    'ingredients': [{'id': self.flour.id, 'amount': 400}],
+                    'tags': [self.tag.id],
+                    'image': data_uri(image_bytes()),
+                    'name': 'bread',
+                    'text': 'text',
+                    'cooking_time': 10
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(calls, [
+            ('lock', (self.bread.id,)),
+            ('change_recipe', {self.flour.id: 400},
+             {self.salt.id: -5, self.flour.id: -100}),
+        ])
+
+    def test_recipe_delete(self):
+        """Удаление рецепта из корзины каскадом вычитает его."""
+        ShoppingCartRecipes.objects.create(user=self.user, recipe=self.bread)
+        ShoppingCartRecipes.objects.create(
+            user=self.user, recipe=self.pancakes
+        )
+        self.bread.delete()
+        self.assertEqual(
+            self.shopping_list(),
+            {'salt': 2, 'flour': 200, 'milk': 300}
+        )
+        self.assert_consistent()
+
+    def test_download_reads_list(self):
+        """Скачивание читает готовый список без агрегации."""
+        ShoppingCartRecipes.objects.create(user=self.user, recipe=self.bread)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/recipes/download_shopping_cart/?format=txt'
+            )
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content, 'flour (г) - 500\nsalt (г) - 5\n')
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertIn(ShoppingListItem._meta.db_table, sql)
+        self.assertNotIn(RecipeIngredients._meta.db_table, sql)
+        self.assertNotIn('SUM(', sql.upper())
+
+    def test_check_command(self):
+        """Команда находит расхождения и с --fix исправляет их."""
+        ShoppingCartRecipes.objects.create(user=self.user, recipe=self.bread)
+        ShoppingListItem.objects.filter(ingredient=self.salt).update(
+            amount=1
+        )
+        ShoppingListItem.objects.filter(ingredient=self.flour).delete()
+        ShoppingListItem.objects.create(
+            user=self.author, ingredient=self.milk, amount=3
+        )
+        out = StringIO()
+        call_command('check_shopping_lists', stdout=out)
+        self.assertIn(
+            'drifted: missing 1, extra 1, wrong 1, users 2',
+            out.getvalue()
+        )
+        out = StringIO()
+        call_command(
+            'check_shopping_lists', '--fix', '--user', str(self.user.id),
+            stdout=out
+        )
+        self.assertIn('fixed: missing 1, extra 0, wrong 1', out.getvalue())
+        self.assertEqual(self.shopping_list(), {'salt': 5, 'flour': 500})
+        call_command('check_shopping_lists', '--fix', stdout=StringIO())
+        self.assertEqual(self.shopping_list(self.author), {})
+        self.assert_consistent()
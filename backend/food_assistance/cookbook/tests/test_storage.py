@@ -0,0 +1,116 @@
+import hashlib
+import os
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from cookbook.images import build_renditions, rendition_names
+from cookbook.models import MediaBlob, Recipe
+from cookbook.storage import recipe_image_storage
+from cookbook.tests.test_images import make_image
+from cookbook.tests.test_uploads import TemporaryMediaMixin
+
+User = get_user_model()
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            author=self.author,
+            name='recipe',
+            text='recipe_text',
+            image=image,
+            cooking_time=10
+        )
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--grace', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_hash_name(self):
+        """Имя файла - SHA-256 содержимого в шардированном каталоге."""
+        image = make_image()
+        digest = hashlib.sha256(image.read()).hexdigest()
+        recipe = self.create_recipe(image)
+        self.assertEqual(
+            recipe.image.name,
+            f'images/{digest[:2]}/{digest[2:4]}/{digest}.png'
+        )
+        self.assertTrue(recipe_image_storage.exists(recipe.image.name))
+
+    def test_permissions(self):
+        """Блоб доступен на чтение всем, а не только владельцу."""
+        recipe = self.create_recipe(make_image())
+        mode = os.stat(recipe_image_storage.path(recipe.image.name)).st_mode
+        self.assertEqual(mode & 0o777, 0o644)
+
+    def test_deduplication(self):
+        """Одинаковые картинки хранятся одним файлом с двумя ссылками."""
+        first = self.create_recipe(make_image())
+        second = self.create_recipe(make_image())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            MediaBlob.objects.get(name=first.image.name).refcount,
+            2
+        )
+
+    def test_refcount_on_change_and_delete(self):
+        """Замена и удаление картинки уменьшают число ссылок."""
+        recipe = self.create_recipe(make_image())
+        old_name = recipe.image.name
+        recipe.image = make_image(size=(10, 10))
+        recipe.save()
+        self.assertEqual(MediaBlob.objects.get(name=old_name).refcount, 0)
+        new_name = recipe.image.name
+        self.assertEqual(MediaBlob.objects.get(name=new_name).refcount, 1)
+        Recipe.objects.filter(id=recipe.id).delete()
+        self.assertEqual(MediaBlob.objects.get(name=new_name).refcount, 0)
+
+    def test_gc(self):
+        """
+        gc_media удаляет блобы без ссылок вместе с копиями
+        и оставляет используемые.
+        """
+        kept = self.create_recipe(make_image(size=(10, 10)))
+        removed = self.create_recipe(make_image())
+        build_renditions(removed.id)
+        name = removed.image.name
+        removed.delete()
+        self.assertIn('removed: 1', self.gc())
+        self.assertFalse(recipe_image_storage.exists(name))
+        for rendition in rendition_names(name):
+            self.assertFalse(default_storage.exists(rendition))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(recipe_image_storage.exists(kept.image.name))
+
+    def test_gc_untracked_and_reconcile(self):
+        """
+        Файлы без записи MediaBlob удаляются, --reconcile
+        восстанавливает число ссылок.
+        """
+        name = recipe_image_storage.save('x.png', ContentFile(b'orphan'))
+        recipe = self.create_recipe(make_image())
+        MediaBlob.objects.all().delete()
+        self.assertIn('would remove: 1', self.gc('--reconcile', '--dry-run'))
+        self.assertTrue(recipe_image_storage.exists(name))
+        self.assertIn('removed: 1', self.gc('--reconcile'))
+        self.assertFalse(recipe_image_storage.exists(name))
+        self.assertTrue(recipe_image_storage.exists(recipe.image.name))
+        self.assertEqual(
+            MediaBlob.objects.get(name=recipe.image.name).refcount,
+            1
+        )
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cookbook.models import Recipe, Tag
+
+User = get_user_model()
+
+
+class TagFilterTests(APITestCase):
+    def setUp(self) -> None:
+        author = User.objects.create(
+            email='author@yandex.ru',
+            username='author',
+            first_name='author_name',
+            last_name='author_family',
+            password='Author**Qwerty123'
+        )
+        tags = {
+            slug: Tag.objects.create(
+                name=slug,
+                color=f'#00000{number}',
+                slug=slug
+            )
+            for number, slug in enumerate(('breakfast', 'lunch', 'dinner'))
+        }
+        for name, recipe_tags in (
+            ('porridge', ('breakfast',)),
+            ('soup', ('lunch', 'dinner')),
+            ('omelette', ('breakfast', 'lunch', 'dinner')),
+            ('cake', ()),
+        ):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=name,
+                text=f'{name}_text',
+                image='',
+                cooking_time=10
+            )
+            recipe.tags.set(tags[slug] for slug in recipe_tags)
+
+    def get_names(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(recipe['name'] for recipe in response.json())
+
+    def test_any(self):
+        """Любой из тегов; рецепт с несколькими тегами не повторяется."""
+        self.assertEqual(
+            self.get_names(tags=['lunch', 'dinner']),
+            ['omelette', 'soup']
+        )
+        self.assertEqual(
+            self.get_names(tags=['breakfast', 'dinner'], tags_mode='any'),
+            ['omelette', 'porridge', 'soup']
+        )
+
+    def test_all(self):
+        self.assertEqual(
+            self.get_names(tags=['breakfast', 'lunch'], tags_mode='all'),
+            ['omelette']
+        )
+        self.assertEqual(
+            self.get_names(tags=['lunch', 'dinner', 'lunch'], tags_mode='all'),
+            ['omelette', 'soup']
+        )
+
+    def test_unknown_slug(self):
+        """Неизвестный тег - 400 в обоих режимах."""
+        for tags_mode in ('any', 'all'):
+            with self.subTest(tags_mode=tags_mode):
+                response = self.client.get('/api/recipes/', {
+                    'tags': ['breakfast', 'unknown'],
+                    'tags_mode': tags_mode
+                })
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn('unknown', response.json()['tags'][0])
+
+    def test_invalid_mode(self):
+        response = self.client.get(
+            '/api/recipes/', {'tags': 'lunch', 'tags_mode': 'some'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pages(self):
+        """Постранично рецепты не повторяются и не теряются."""
+        names = []
+        for page in (1, 2):
+            response = self.client.get('/api/recipes/', {
+                'tags': ['breakfast', 'lunch', 'dinner'],
+                'page': page,
+                'limit': 2
+            })
+            data = response.json()
+            self.assertEqual(data['count'], 3)
+            names.extend(recipe['name'] for recipe in data['results'])
+        self.assertEqual(sorted(names), ['omelette', 'porridge', 'soup'])
@@ -0,0 +1,228 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook import toggles
+from cookbook.models import FavoritRecipes, Recipe, ShoppingCartRecipes
+from cookbook.toggles import (ADDED, ALREADY_ADDED, NOT_ADDED, NOT_FOUND,
+                              REMOVED, ToggleBatcher, toggle_batcher)
+
+User = get_user_model()
+
+
+def table_queries(queries, model):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if model._meta.db_table in query['sql']
+        and 'SAVEPOINT' not in query['sql']
+    ]
+
+
+class TogglesTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        self.other = User.objects.create(
+            email='other@yandex.ru',
+            username='other',
+            first_name='other_name',
+            last_name='other_family',
+            password='Other**Qwerty123'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name='recipe',
+            text='text',
+            image='',
+            cooking_time=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def favorite(self, method='post', recipe_id=None):
+        if recipe_id is None:
+            recipe_id = self.recipe.id
+        return getattr(self.client, method)(
+            f'/api/recipes/{recipe_id}/favorite/'
+        )
+
+    def test_single_statement(self):
+        """
+        Добавление и удаление - один запрос к таблице связей,
+        счётчики рецепта ведутся как раньше.
+        """
+        for method, code, statement, count in (
+            ('post', status.HTTP_201_CREATED, 'INSERT', 1),
+            ('delete', status.HTTP_204_NO_CONTENT, 'DELETE', 0),
+        ):
+            with self.subTest(method=method):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.favorite(method)
+                self.assertEqual(response.status_code, code)
+                sql = table_queries(queries, FavoritRecipes)
+                self.assertEqual(len(sql), 1)
+                self.assertTrue(sql[0].startswith(statement))
+                self.recipe.refresh_from_db()
+                self.assertEqual(self.recipe.favorites_count, count)
+        self.assertFalse(FavoritRecipes.objects.exists())
+
+    def test_response_semantics(self):
+        """Коды ответов: 201, повтор - 400, нет рецепта - 404, 204."""
+        for method, recipe_id, code in (
+            ('post', None, status.HTTP_201_CREATED),
+            ('post', None, status.HTTP_400_BAD_REQUEST),
+            ('post', 0, status.HTTP_404_NOT_FOUND),
+            ('delete', None, status.HTTP_204_NO_CONTENT),
+            ('delete', None, status.HTTP_400_BAD_REQUEST),
+            ('delete', 0, status.HTTP_404_NOT_FOUND),
+        ):
+            with self.subTest(method=method, recipe_id=recipe_id):
+                response = self.favorite(method, recipe_id)
+                self.assertEqual(response.status_code, code)
+
+    def test_batched_api(self):
+        """В режиме накопления коды ответов те же."""
+        with mock.patch.object(toggle_batcher, 'enabled', True):
+            self.test_response_semantics()
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['name'], 'recipe')
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.cart_count),
+            (0, 1)
+        )
+
+    def test_batch_coalescing(self):
+        """
+        Изменения из окна применяются одним INSERT и одним DELETE,
+        результаты - как при выполнении по очереди.
+        """
+        other_recipe = Recipe.objects.create(
+            author=self.other,
+            name='other_recipe',
+            text='text',
+            image='',
+            cooking_time=10
+        )
+        FavoritRecipes.objects.create(user=self.other, recipe=self.recipe)
+        batcher = ToggleBatcher()
+        toggles = (
+            (self.user.id, self.recipe.id, True, ADDED),
+            (self.user.id, self.recipe.id, True, ALREADY_ADDED),
+            (self.user.id, self.recipe.id, False, REMOVED),
+            (self.user.id, self.recipe.id, True, ADDED),
+            (self.user.id, other_recipe.id, False, NOT_ADDED),
+            (self.user.id, other_recipe.id, True, ADDED),
+            (self.other.id, self.recipe.id, False, REMOVED),
+            (self.other.id, 0, True, NOT_FOUND),
+        )
+        futures = [
+            batcher.submit(FavoritRecipes, user_id, recipe_id, add)
+            for user_id, recipe_id, add, _ in toggles
+        ]
+        cart_future = batcher.submit(
+            ShoppingCartRecipes, self.user.id, self.recipe.id, True
+        )
+        with CaptureQueriesContext(connection) as queries:
+            batcher.flush()
+        self.assertEqual(
+            [future.result() for future in futures],
+            [result for *_, result in toggles]
+        )
+        self.assertEqual(cart_future.result(), ADDED)
+        self.assertEqual(
+            set(FavoritRecipes.objects.values_list('user', 'recipe')),
+            {(self.user.id, self.recipe.id), (self.user.id, other_recipe.id)}
+        )
+        statements = [
+            sql.split()[0]
+            for sql in table_queries(queries, FavoritRecipes)
+        ]
+        self.assertEqual(statements.count('INSERT'), 1)
+        self.assertEqual(statements.count('DELETE'), 1)
+        self.recipe.refresh_from_db()
+        other_recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, other_recipe.favorites_count,
+             self.recipe.cart_count),
+            (1, 1, 1)
+        )
+
+    def test_batch_concurrent_insert(self):
+        """
+        Строка, вставленная конкурентным запросом после чтения
+        снимка, не считается повторно.
+        """
+        batcher = ToggleBatcher()
+        future = batcher.submit(
+            FavoritRecipes, self.user.id, self.recipe.id, True
+        )
+        insert_relations = toggles.insert_relations
+
+        def concurrent_insert(*args):
+            FavoritRecipes.objects.bulk_create(
+                [FavoritRecipes(user=self.user, recipe=self.recipe)]
+            )
+            return insert_relations(*args)
+
+        with mock.patch(
+            'cookbook.toggles.insert_relations', concurrent_insert
+        ):
+            batcher.flush()
+        self.assertEqual(future.result(), ALREADY_ADDED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_batch_error(self):
+        """Ошибка применения передаётся всем запросам окна."""
+        batcher = ToggleBatcher()
+        future = batcher.submit(
+            FavoritRecipes, self.user.id, self.recipe.id, True
+        )
+        batcher.submit(FavoritRecipes, self.user.id, self.recipe.id, False)
+        with mock.patch.object(
+            ToggleBatcher, 'apply', side_effect=RuntimeError
+        ):
+            batcher.flush()
+        with self.assertRaises(RuntimeError):
+            future.result()
+
+    def test_batch_size(self):
+        """
+        Пакет не больше size изменений; запрос применяет очередь
+        сразу, пока его изменение не будет применено.
+        """
+        batcher = ToggleBatcher(size=2)
+        futures = [
+            batcher.submit(FavoritRecipes, self.user.id, self.recipe.id, add)
+            for add in (True, False, True)
+        ]
+        batcher.flush()
+        self.assertEqual(
+            [future.done() for future in futures], [True, True, False]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = batcher.toggle(
+                FavoritRecipes, self.other.id, self.recipe.id, True
+            )
+        self.assertEqual(result, ADDED)
+        self.assertEqual(
+            [future.result() for future in futures],
+            [ADDED, REMOVED, ADDED]
+        )
+        statements = [
+            sql.split()[0]
+            for sql in table_queries(queries, FavoritRecipes)
+        ]
+        self.assertEqual(statements.count('INSERT'), 2)
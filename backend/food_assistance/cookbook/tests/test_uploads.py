@@ -0,0 +1,186 @@
+import json
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import Ingredient, Recipe, Tag
+from cookbook.fields import ImageUploadField
+
+User = get_user_model()
+
+
+def image_bytes(size=(20, 10), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def data_uri(content, media_type='image/png'):
+    return f'data:{media_type};base64,{b64encode(content).decode()}'
+
+
+class TemporaryMediaMixin:
+    """
+    MEDIA_ROOT теста - временный каталог: загруженные картинки
+    не попадают в media/ проекта и удаляются после теста.
+    """
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+        super().setUp()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+
+class RecipeImageUploadTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.test_user = User.objects.create(
+            email='test_user@yandex.ru',
+            username='test_user',
+            first_name='test_user_name',
+            last_name='test_user_family',
+            password='Test**Qwerty123'
+        )
+        self.tag = Tag.objects.create(
+            name='tag1_name',
+            color='#A12345',
+            slug='tag1'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='ingr1_name',
+            measurement_unit='г'
+        )
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.test_user)
+
+    def get_data(self, image):
+        return {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 10}],
+            'tags': [self.tag.id],
+            'image': image,
+            'name': 'new_recipe',
+            'text': 'text about new recipe',
+            'cooking_time': 30
+        }
+
+    def test_base64_upload(self):
+        """base64 в JSON сохраняется с расширением по формату файла."""
+        response = self.auth_client.post(
+            '/api/recipes/',
+            self.get_data(data_uri(image_bytes(image_format='JPEG'))),
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get()
+        self.assertTrue(recipe.image.name.endswith('.jpg'))
+        self.assertEqual(recipe.image.width, 20)
+
+    def test_multipart_upload(self):
+        """
+        multipart: файл картинки, теги повторяющимся полем,
+        ингредиенты JSON-строкой.
+        """
+        data = self.get_data(
+            SimpleUploadedFile('photo.png', image_bytes(), 'image/png')
+        )
+        data['ingredients'] = json.dumps(data['ingredients'])
+        response = self.auth_client.post(
+            '/api/recipes/',
+            data,
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get()
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(recipe.ingredients.get(), self.ingredient)
+
+    def test_invalid_images(self):
+        """Некорректные base64 и не-изображения отклоняются."""
+        for image in (
+            'data:image/png;base64,@@@@',
+            'data:image/png;base64,iVBORw0',
+            data_uri(b'not an image at all'),
+            data_uri(image_bytes(image_format='BMP')),
+        ):
+            with self.subTest(image=image[:40]):
+                response = self.auth_client.post(
+                    '/api/recipes/',
+                    self.get_data(image),
+                    format='json'
+                )
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn('image', response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_max_bytes(self):
+        """Слишком большой файл отклоняется до декодирования."""
+        content = image_bytes(size=(400, 400))
+        with mock.patch.object(
+            ImageUploadField, 'max_bytes', len(content) // 2
+        ), mock.patch('cookbook.fields.b64decode') as b64decode:
+            response = self.auth_client.post(
+                '/api/recipes/',
+                self.get_data(data_uri(content)),
+                format='json'
+            )
+        b64decode.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', response.json()['image'][0])
+
+    def test_max_bytes_multipart(self):
+        """Лимит размера действует и для multipart."""
+        content = image_bytes(size=(400, 400))
+        data = self.get_data(
+            SimpleUploadedFile('photo.png', content, 'image/png')
+        )
+        data['ingredients'] = json.dumps(data['ingredients'])
+        with mock.patch.object(
+            ImageUploadField, 'max_bytes', len(content) - 1
+        ):
+            response = self.auth_client.post(
+                '/api/recipes/',
+                data,
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', response.json()['image'][0])
+
+    def test_max_pixels(self):
+        """Размеры проверяются по заголовку изображения."""
+        with mock.patch.object(ImageUploadField, 'max_pixels', 100):
+            response = self.auth_client.post(
+                '/api/recipes/',
+                self.get_data(data_uri(image_bytes(size=(20, 10)))),
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', response.json()['image'][0])
+
+    def test_body_limit(self):
+        """Слишком большое JSON-тело отклоняется с кодом 413."""
+        with mock.patch('cookbook.parsers.LimitedJSONParser.max_bytes', 100):
+            response = self.auth_client.post(
+                '/api/recipes/',
+                self.get_data(data_uri(image_bytes())),
+                format='json'
+            )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
@@ -0,0 +1,147 @@
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from cookbook.filters import RecipeFilter
+from cookbook.models import FavoritRecipes, Recipe, ShoppingCartRecipes, Tag
+
+User = get_user_model()
+
+FLAG_TABLES = {
+    'is_favorited': FavoritRecipes._meta.db_table,
+    'is_in_shopping_cart': ShoppingCartRecipes._meta.db_table,
+}
+
+
+class UserFlagFiltersTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        other = User.objects.create(
+            email='other@yandex.ru',
+            username='other',
+            first_name='other_name',
+            last_name='other_family',
+            password='Other**Qwerty123'
+        )
+        self.tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        self.flags = {}
+        # Рецепты со всеми сочетаниями избранного, корзины, тега
+        # и автора, плюс записи другого пользователя.
+        for number, (favorited, in_cart, tagged, own) in enumerate(
+            product((False, True), repeat=4)
+        ):
+            recipe = Recipe.objects.create(
+                author=self.user if own else other,
+                name=f'recipe_{number}',
+                text='text',
+                image='',
+                cooking_time=10
+            )
+            if tagged:
+                recipe.tags.add(self.tag)
+            if favorited:
+                FavoritRecipes.objects.create(user=self.user, recipe=recipe)
+            if in_cart:
+                ShoppingCartRecipes.objects.create(
+                    user=self.user,
+                    recipe=recipe
+                )
+            FavoritRecipes.objects.create(user=other, recipe=recipe)
+            ShoppingCartRecipes.objects.create(user=other, recipe=recipe)
+            self.flags[recipe.name] = {
+                'is_favorited': favorited,
+                'is_in_shopping_cart': in_cart,
+                'tags': tagged,
+                'author': own,
+            }
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def expected(self, params):
+        return sorted(
+            name for name, flags in self.flags.items()
+            if all(
+                flags[key] == (value in ('1', 'tag', self.user.id))
+                for key, value in params.items()
+            )
+        )
+
+    def test_combinations(self):
+        """
+        Все сочетания фильтров: один запрос к рецептам, условия
+        EXISTS/NOT EXISTS без JOIN таблиц избранного и корзины.
+        """
+        for favorited, in_cart, tags, author in product(
+            (None, '1', '0'), (None, '1', '0'), (None, 'tag'),
+            (None, self.user.id)
+        ):
+            params = {
+                key: value for key, value in (
+                    ('is_favorited', favorited),
+                    ('is_in_shopping_cart', in_cart),
+                    ('tags', tags),
+                    ('author', author),
+                ) if value is not None
+            }
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        '/api/recipes/', {**params, 'page': 1, 'limit': 100}
+                    )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                names = [item['name'] for item in response.json()['results']]
+                self.assertEqual(sorted(names), self.expected(params))
+                page_query = next(
+                    query['sql'] for query in queries.captured_queries
+                    if query['sql'].startswith('SELECT "cookbook_recipe"."id"')
+                    and 'LIMIT' in query['sql']
+                )
+                self.assertNotIn('JOIN', page_query)
+                self.assertNotIn('DISTINCT', page_query)
+                for flag, table in FLAG_TABLES.items():
+                    where = page_query.split(' WHERE ', 1)[-1]
+                    if flag in params:
+                        condition = (
+                            'EXISTS' if params[flag] == '1' else 'NOT EXISTS'
+                        )
+                        self.assertIn(f'{condition}(SELECT', where)
+                        self.assertIn(table, where)
+
+    def test_query_plan(self):
+        """План: флаги проверяются коррелированным поиском по индексу."""
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.user
+        queryset = RecipeFilter(
+            {'is_favorited': '1', 'is_in_shopping_cart': '0'},
+            queryset=Recipe.objects.all(),
+            request=request
+        ).qs
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            for table in FLAG_TABLES.values():
+                self.assertRegex(
+                    plan,
+                    f'SEARCH .* USING INDEX \\w*{table}\\w* '
+                    r'\(user_id=\? AND recipe_id=\?\)'
+                )
+        else:
+            # Полусоединение вместо JOIN с последующим DISTINCT.
+            self.assertNotRegex(plan, 'Unique|HashAggregate')
+
+    def test_anonymous(self):
+        """Для анонимного пользователя фильтры не применяются."""
+        response = APIClient().get('/api/recipes/', {'is_favorited': '1'})
+        self.assertEqual(len(response.json()), len(self.flags))
+
+    def test_invalid_value(self):
+        response = self.client.get('/api/recipes/', {'is_favorited': 'yes'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,335 @@
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import Future
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+from cookbook.models import Recipe
+from food_assistance.settings import (TOGGLE_BATCH_SIZE,
+                                      TOGGLE_BATCH_TIMEOUT, TOGGLE_BATCHING)
+
+ADDED = 'added'
+REMOVED = 'removed'
+ALREADY_ADDED = 'already_added'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+Toggle = namedtuple('Toggle', 'model user_id recipe_id add future')
+
+# Связи пользователя с рецептами или авторами изменены в обход
+# save() и delete(): sender - модель связей, ids - первичные ключи
+# рецептов (авторов), delta - 1 при добавлении и -1 при удалении.
+relations_changed = Signal(providing_args=('user_id', 'ids', 'delta',
+                                           'using'))
+
+
+def target_field(model):
+    """Поле связи с рецептом (автором) в модели связей пользователя."""
+    return next(
+        field for field in model._meta.concrete_fields
+        if field.is_relation and field.name != 'user'
+    )
+
+
+def send_changed(model, using, user_id, ids, delta):
+    if ids:
+        relations_changed.send(
+            sender=model, user_id=user_id, ids=ids, delta=delta, using=using
+        )
+
+
+def can_return_rows(connection):
+    """INSERT и DELETE ... RETURNING: PostgreSQL и SQLite 3.35+."""
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def execute_returning(using, sql, params, column, affected):
+    """
+    Выполняет INSERT или DELETE и возвращает значения column
+    затронутых строк. Без RETURNING они заранее читаются
+    запросом affected в той же транзакции.
+    """
+    connection = connections[using]
+    returning = can_return_rows(connection)
+    values = [] if returning else list(affected)
+    with connection.cursor() as cursor:
+        if returning:
+            sql = f'{sql} RETURNING {column}'
+        cursor.execute(sql, params)
+        if returning:
+            values.extend(row[0] for row in cursor.fetchall())
+    return values
+
+
+def get_missing_results(model, using, ids, result):
+    """
+    Причина, по которой строки не вставлены или не удалены:
+    объекта нет (NOT_FOUND) или result.
+    """
+    if not ids:
+        return {}
+    found = set(target_field(model).related_model.objects.using(
+        using
+    ).filter(pk__in=ids).values_list('pk', flat=True))
+    return {pk: result if pk in found else NOT_FOUND for pk in ids}
+
+
+def insert_relations(model, using, user_id, ids):
+    """
+    Вставляет связи пользователя с объектами ids одним
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING, который пропускает
+    отсутствующие объекты и уже существующие связи. Возвращает id
+    действительно вставленных строк. Вызывается в транзакции.
+    """
+    field = target_field(model)
+    target = field.related_model
+    ops = connections[using].ops
+    opts = model._meta
+    created = [
+        item for item in opts.concrete_fields
+        if getattr(item, 'auto_now_add', False)
+    ]
+    columns = ', '.join(
+        ops.quote_name(item.column)
+        for item in (opts.get_field('user'), field, *created)
+    )
+    now = ops.adapt_datetimefield_value(timezone.now())
+    return execute_returning(
+        using,
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(opts.db_table)} ({columns}) '
+        f'SELECT %s, {ops.quote_name(target._meta.pk.column)}'
+        f'{", %s" * len(created)} '
+        f'FROM {ops.quote_name(target._meta.db_table)} '
+        f'WHERE {ops.quote_name(target._meta.pk.column)} '
+        f'IN ({", ".join(["%s"] * len(ids))})'
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+        (user_id, *[now] * len(created), *ids),
+        ops.quote_name(field.column),
+        target.objects.using(using).filter(pk__in=ids).exclude(
+            pk__in=model.objects.using(using).filter(
+                user_id=user_id
+            ).values(field.attname)
+        ).values_list('pk', flat=True)
+    )
+
+
+def add_many(model, user_id, ids, excluded=()):
+    """
+    Добавляет пользователю связи с объектами ids (insert_relations).
+    Возвращает {id: результат}: ADDED, ALREADY_ADDED, NOT_FOUND
+    или INVALID для excluded.
+    """
+    ids = list(dict.fromkeys(ids))
+    allowed = [pk for pk in ids if pk not in excluded]
+    results = dict.fromkeys(ids, INVALID)
+    if not allowed:
+        return results
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        added = insert_relations(model, using, user_id, allowed)
+        send_changed(model, using, user_id, added, 1)
+        results.update(dict.fromkeys(added, ADDED))
+        results.update(get_missing_results(
+            model, using, [pk for pk in allowed if results[pk] != ADDED],
+            ALREADY_ADDED
+        ))
+    return results
+
+
+def remove_many(model, user_id, ids=None):
+    """
+    Удаляет связи пользователя с объектами ids (все связи,
+    если ids не заданы) одним DELETE. Возвращает {id: результат}:
+    REMOVED, NOT_ADDED или NOT_FOUND.
+    """
+    field = target_field(model)
+    using = router.db_for_write(model)
+    ops = connections[using].ops
+    opts = model._meta
+    user_column = ops.quote_name(opts.get_field('user').column)
+    sql = (
+        f'DELETE FROM {ops.quote_name(opts.db_table)} '
+        f'WHERE {user_column} = %s'
+    )
+    params = [user_id]
+    affected = model.objects.using(using).filter(user_id=user_id)
+    if ids is not None:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        sql += (
+            f' AND {ops.quote_name(field.column)} '
+            f'IN ({", ".join(["%s"] * len(ids))})'
+        )
+        params.extend(ids)
+        affected = affected.filter(**{f'{field.attname}__in': ids})
+    with transaction.atomic(using=using):
+        removed = execute_returning(
+            using, sql, params, ops.quote_name(field.column),
+            affected.values_list(field.attname, flat=True)
+        )
+        send_changed(model, using, user_id, removed, -1)
+        results = dict.fromkeys(removed, REMOVED)
+        if ids is not None:
+            results.update(get_missing_results(
+                model, using, [pk for pk in ids if pk not in results],
+                NOT_ADDED
+            ))
+    return results
+
+
+def add_recipe(model, user_id, recipe_id):
+    """Добавляет рецепт одним INSERT ... SELECT (add_many)."""
+    return add_many(model, user_id, (recipe_id,))[recipe_id]
+
+
+def remove_recipe(model, user_id, recipe_id):
+    """Удаляет рецепт одним DELETE по паре пользователь-рецепт."""
+    return remove_many(model, user_id, (recipe_id,))[recipe_id]
+
+
+class ToggleBatcher:
+    """
+    Пакетное применение добавлений и удалений рецептов.
+
+    Изменения применяет тот запрос, который первым освободился: пока
+    один пакет пишется в базу, новые изменения копятся в очереди и
+    следующим пакетом уходят в одной транзакции: INSERT ... ON
+    CONFLICT DO NOTHING на пользователя и одним DELETE. Одиночный
+    запрос применяется сразу, без ожидания. Повторные изменения одной
+    пары пользователь-рецепт схлопываются, а результат каждого
+    изменения (а с ним и код ответа) вычисляется так, как если бы
+    они выполнялись по очереди.
+    """
+    def __init__(self, enabled=TOGGLE_BATCHING, size=TOGGLE_BATCH_SIZE,
+                 timeout=TOGGLE_BATCH_TIMEOUT):
+        self.enabled = enabled
+        self.size = size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+
+    def submit(self, model, user_id, recipe_id, add):
+        """Ставит изменение в очередь и возвращает Future с результатом."""
+        future = Future()
+        with self._lock:
+            self._pending.append(
+                Toggle(model, user_id, recipe_id, add, future)
+            )
+        return future
+
+    def toggle(self, model, user_id, recipe_id, add):
+        future = self.submit(model, user_id, recipe_id, add)
+        # Изменение мог применить чужой пакет, пока запрос ждал
+        # блокировку: тогда писать уже нечего.
+        if self._flush_lock.acquire(timeout=self.timeout):
+            try:
+                while not future.done():
+                    self.flush()
+            finally:
+                self._flush_lock.release()
+        return future.result(self.timeout)
+
+    def flush(self):
+        """Применяет не больше size изменений из начала очереди."""
+        with self._lock:
+            toggles = self._pending[:self.size]
+            del self._pending[:self.size]
+        for model in {toggle.model for toggle in toggles}:
+            batch = [toggle for toggle in toggles if toggle.model is model]
+            try:
+                results = self.apply(model, batch)
+            except Exception as error:
+                for toggle in batch:
+                    toggle.future.set_exception(error)
+                continue
+            for toggle, result in zip(batch, results):
+                toggle.future.set_result(result)
+
+    def apply(self, model, toggles):
+        using = router.db_for_write(model)
+        recipe_ids = {toggle.recipe_id for toggle in toggles}
+        with transaction.atomic(using=using):
+            recipes = set(Recipe.objects.using(using).filter(
+                pk__in=recipe_ids
+            ).values_list('pk', flat=True))
+            existing = set(model.objects.using(using).filter(
+                user_id__in={toggle.user_id for toggle in toggles},
+                recipe_id__in=recipe_ids
+            ).values_list('user_id', 'recipe_id'))
+            present = {}
+            results = []
+            for toggle in toggles:
+                pair = (toggle.user_id, toggle.recipe_id)
+                if toggle.recipe_id not in recipes:
+                    results.append(NOT_FOUND)
+                    continue
+                was_present = present.get(pair, pair in existing)
+                if toggle.add:
+                    results.append(ALREADY_ADDED if was_present else ADDED)
+                else:
+                    results.append(REMOVED if was_present else NOT_ADDED)
+                present[pair] = toggle.add
+            added = [
+                pair for pair, is_present in present.items()
+                if is_present and pair not in existing
+            ]
+            removed = [
+                pair for pair, is_present in present.items()
+                if not is_present and pair in existing
+            ]
+            inserted = self.insert(model, using, added)
+            for index, toggle in enumerate(toggles):
+                pair = (toggle.user_id, toggle.recipe_id)
+                if (results[index] == ADDED and pair in added
+                        and pair not in inserted):
+                    # Строку успел вставить конкурентный запрос.
+                    results[index] = ALREADY_ADDED
+            if removed:
+                model.objects.using(using).filter(reduce(or_, (
+                    Q(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in removed
+                ))).delete()
+        return results
+
+    def insert(self, model, using, pairs):
+        """
+        Вставляет пары пользователь-рецепт и возвращает множество
+        действительно вставленных: сигнал relations_changed
+        отправляется только для них, а не для прочитанного ранее
+        снимка, который мог устареть.
+        """
+        recipe_ids = defaultdict(list)
+        for user_id, recipe_id in pairs:
+            recipe_ids[user_id].append(recipe_id)
+        inserted = set()
+        for user_id, ids in recipe_ids.items():
+            added = insert_relations(model, using, user_id, ids)
+            send_changed(model, using, user_id, added, 1)
+            inserted.update((user_id, recipe_id) for recipe_id in added)
+        return inserted
+
+
+toggle_batcher = ToggleBatcher()
+
+
+def toggle_recipe(model, user_id, recipe_id, add):
+    """
+    Добавляет рецепт в список пользователя (избранное, корзину)
+    или удаляет из него. Возвращает ADDED, REMOVED, ALREADY_ADDED,
+    NOT_ADDED или NOT_FOUND.
+    """
+    if toggle_batcher.enabled:
+        return toggle_batcher.toggle(model, user_id, recipe_id, add)
+    if add:
+        return add_recipe(model, user_id, recipe_id)
+    return remove_recipe(model, user_id, recipe_id)
@@ -0,0 +1,96 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from cookbook.models import FavoritRecipes, Recipe, ShoppingCartRecipes
+from food_assistance.settings import (TRENDING_BATCH_SIZE,
+                                      TRENDING_CART_WEIGHT,
+                                      TRENDING_FAVORITE_WEIGHT,
+                                      TRENDING_HALF_LIFE)
+
+# Точка отсчёта затухания. Рейтинг хранится как log2 суммы вкладов,
+# приведённых к этой точке: со временем все рейтинги уменьшаются
+# в одно и то же число раз, поэтому порядок рецептов без новой
+# активности не меняется и их рейтинг не нужно пересчитывать.
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=dt_timezone.utc)
+TRENDING_SOURCES = (
+    (FavoritRecipes, TRENDING_FAVORITE_WEIGHT),
+    (ShoppingCartRecipes, TRENDING_CART_WEIGHT),
+)
+
+
+def trending_score(events, half_life=TRENDING_HALF_LIFE) -> float:
+    """
+    Рейтинг по событиям (вес, время):
+    log2(сумма вес * 2 ** ((время - TRENDING_EPOCH) / half_life)).
+    Без событий рейтинг равен 0.
+    """
+    exponents = [
+        (weight, (moment - TRENDING_EPOCH).total_seconds() / half_life)
+        for weight, moment in events
+    ]
+    if not exponents:
+        return 0.0
+    top = max(exponent for _, exponent in exponents)
+    return top + math.log2(sum(
+        weight * 2 ** (exponent - top) for weight, exponent in exponents
+    ))
+
+
+def stale_recipes():
+    """Рецепты с активностью после последнего пересчёта рейтинга."""
+    return Recipe.objects.filter(activity__isnull=False).filter(
+        Q(trending_updated__isnull=True)
+        | Q(activity__gt=F('trending_updated'))
+    )
+
+
+def get_events(recipe_ids):
+    """
+    События рецептов, сгруппированные по часам:
+    (вес * число добавлений за час, час).
+    """
+    events = defaultdict(list)
+    for model, weight in TRENDING_SOURCES:
+        rows = model.objects.filter(recipe__in=recipe_ids).annotate(
+            hour=TruncHour('created')
+        ).values_list('recipe', 'hour').annotate(
+            total=Count('id')
+        ).order_by()
+        for recipe_id, hour, total in rows:
+            events[recipe_id].append((weight * total, hour))
+    return events
+
+
+def recompute_trending(recompute_all=False,
+                       batch_size=TRENDING_BATCH_SIZE) -> int:
+    """
+    Пересчитывает рейтинг trending рецептов с новой активностью
+    (или всех рецептов) пачками по batch_size.
+    Возвращает число пересчитанных рецептов.
+
+    Отметка trending_updated ставится временем начала пересчёта:
+    активность во время пересчёта попадёт в следующий запуск.
+    """
+    started = timezone.now()
+    recipes = Recipe.objects.all() if recompute_all else stale_recipes()
+    recipe_ids = list(recipes.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        events = get_events(batch)
+        Recipe.objects.bulk_update(
+            [
+                Recipe(
+                    id=recipe_id,
+                    trending_score=trending_score(events[recipe_id]),
+                    trending_updated=started
+                )
+                for recipe_id in batch
+            ],
+            ('trending_score', 'trending_updated')
+        )
+    return len(recipe_ids)
@@ -1,7 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from users.views import SpecialUserViewSet
-from cookbook.views import (DownloadShoppingCartViewSet,
+from cookbook.views import (BulkFavoriteRecipesViewSet,
+                            BulkShoppingCartViewSet, BulkSubscribeViewSet,
+                            CookableRecipesViewSet,
+                            DownloadShoppingCartViewSet,
                             FavoriteRecipesViewSet, IngredientViewSet,
                             RecipesViewSet, SbscrptViewSet,
                             ShoppingCartViewSet, SubscribeViewSet, TagViewSet)
@@ -14,6 +17,11 @@ router.register(
     SbscrptViewSet,
     basename='subscriptions'
 )
+router.register(
+    'users/subscribe',
+    BulkSubscribeViewSet,
+    basename='subscribe_bulk'
+)
 router.register('users', SpecialUserViewSet, basename='users-list')
 router.register('tags', TagViewSet, basename='tags-list')
 router.register('ingredients', IngredientViewSet, basename='ingredients-list')
@@ -27,6 +35,21 @@ router.register(
     DownloadShoppingCartViewSet,
     basename='download_shopping_cart'
 )
+router.register(
+    'recipes/cookable',
+    CookableRecipesViewSet,
+    basename='cookable'
+)
+router.register(
+    'recipes/shopping_cart',
+    BulkShoppingCartViewSet,
+    basename='shopping_cart_bulk'
+)
+router.register(
+    'recipes/favorite',
+    BulkFavoriteRecipesViewSet,
+    basename='favorite_bulk'
+)
 router.register(
     r'recipes/(?P<id>\d+)/shopping_cart',
     ShoppingCartViewSet,
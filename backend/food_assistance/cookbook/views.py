@@ -1,49 +1,111 @@
+from collections import defaultdict
+from itertools import chain
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import BooleanField, Value
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from users.pagination import CustomPagination
-from cookbook.filters import RecipeFilter, CustomSearchFilter
+from users.pagination import (CustomPagination, RecipesPagination,
+                              SubscriptionsPagination)
+from cookbook.cache import AnonymousCacheMixin
+from cookbook.conditional import ConditionalGetMixin, RECIPES_RANKED_KEY
+from cookbook.cookable_index import cookable_index
+from cookbook.filters import (RANKED_ORDERINGS, RecipeFilter,
+                              RecipeOrderingFilter, RecipeSearchFilter)
+from cookbook.ingredient_index import ingredient_index
 from users.models import Follow
+from cookbook.parsers import LimitedJSONParser
 from cookbook.models import (FavoritRecipes, Ingredient, Recipe,
-                             RecipeIngredients, ShoppingCartRecipes, Tag)
+                             ShoppingCartRecipes, ShoppingListItem, Tag)
 from cookbook.permissions import IsAuthor
-from cookbook.serializers import (DownloadShoppingCartSerializer,
+from cookbook.renderers import SHOPPING_LIST_RENDERERS
+from cookbook.serializers import (BulkIdsSerializer, CookableQuerySerializer,
                                   FavoriteRecipesSerializer,
                                   IngredientSerializer,
                                   RecipesCreateSerializer, RecipesSerializer,
                                   TagSerializer)
+from cookbook.toggles import (ALREADY_ADDED, NOT_ADDED, NOT_FOUND, REMOVED,
+                              add_many, remove_many, toggle_recipe)
 from users.serializers import SbscrptSerializer
 
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_group = 'tags'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(AnonymousCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (CustomSearchFilter,)
-    search_fields = ('^name',)
+    cache_group = 'ingredients'
+    cache_query_params = ('name',)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self.search, request, *args, **kwargs
+        )
+
+    def search(self, request, *args, **kwargs):
+        """
+        Список ингредиентов из процессного индекса без обращения к БД.
+        Параметр ?name= - поиск по началу названия, затем по вхождению.
+        """
+        name = request.query_params.get('name', '')
+        return Response(ingredient_index.search(name))
 
 
 class SbscrptViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = SbscrptSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    pagination_class = CustomPagination
+    pagination_class = SubscriptionsPagination
 
     def get_queryset(self):
         current_user = self.request.user
-        return User.objects.filter(following__user=current_user)
+        return User.objects.filter(
+            following__user=current_user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            return None
+        return recipes_limit if recipes_limit >= 0 else None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Подписки с последними рецептами авторов: рецепты всех авторов
+        страницы загружаются одним запросом.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        authors = list(queryset) if page is None else page
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(
+            [author.id for author in authors],
+            self.get_recipes_limit()
+        ):
+            recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = recipes[author.id]
+        serializer = self.get_serializer(authors, many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
 
 class SubscribeViewSet(viewsets.ViewSet):
@@ -97,46 +159,75 @@ class SubscribeViewSet(viewsets.ViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FavoriteRecipesViewSet(viewsets.ViewSet):
+class UserRecipeViewSet(viewsets.ViewSet):
+    """
+    Добавление рецепта в список пользователя (model) и удаление
+    из него одним запросом INSERT или DELETE (cookbook.toggles).
+    """
     permission_classes = (permissions.IsAuthenticated,)
+    model = None
+    errors = {}
 
-    def create(self, request, id=None):
-        current_user = request.user
-        favorite_recipe = get_object_or_404(Recipe, id=id)
-        fav, not_exists = FavoritRecipes.objects.get_or_create(
-            user=current_user,
-            recipe=favorite_recipe
-        )
-        if not not_exists:
+    def get_response(self, result, recipe_id):
+        if result == NOT_FOUND:
+            raise Http404
+        if result in self.errors:
             return Response(
                 status=status.HTTP_400_BAD_REQUEST,
-                data={'errors': 'Recipe already in favorites.'}
+                data={'errors': self.errors[result]}
             )
-        serializer = FavoriteRecipesSerializer(favorite_recipe)
+        if result == REMOVED:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = FavoriteRecipesSerializer(
+            get_object_or_404(Recipe, id=recipe_id)
+        )
         return Response(
             serializer.data,
             status=status.HTTP_201_CREATED
         )
 
+    def create(self, request, id=None):
+        return self.get_response(
+            toggle_recipe(self.model, request.user.id, int(id), add=True),
+            id
+        )
+
     @action(methods=('delete',), detail=False)
     def delete(self, request, id=None):
-        current_user = request.user
-        favorite_recipe = get_object_or_404(Recipe, id=id)
-        if not FavoritRecipes.objects.filter(user=current_user,
-                                             recipe=favorite_recipe).exists():
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
-                data={'errors': 'Recipe not in favorites.'}
-            )
-        FavoritRecipes.objects.get(user=current_user,
-                                   recipe=favorite_recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.get_response(
+            toggle_recipe(self.model, request.user.id, int(id), add=False),
+            id
+        )
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
-    pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend,)
+class FavoriteRecipesViewSet(UserRecipeViewSet):
+    model = FavoritRecipes
+    errors = {
+        ALREADY_ADDED: 'Recipe already in favorites.',
+        NOT_ADDED: 'Recipe not in favorites.',
+    }
+
+
+class RecipesViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                     viewsets.ModelViewSet):
+    pagination_class = RecipesPagination
+    parser_classes = (LimitedJSONParser, MultiPartParser, FormParser)
+    filter_backends = (
+        DjangoFilterBackend, RecipeSearchFilter, RecipeOrderingFilter
+    )
     filterset_class = RecipeFilter
+    cache_group = 'recipes'
+    cache_query_params = (
+        'tags', 'tags_mode', 'author', 'page', 'limit', 'cursor', 'count',
+        'ordering', 'search'
+    )
+
+    def get_list_state_keys(self, request):
+        keys = super().get_list_state_keys(request)
+        ordering = RecipeOrderingFilter().get_ordering_name(request)
+        if ordering in RANKED_ORDERINGS:
+            return (*keys, RECIPES_RANKED_KEY)
+        return keys
 
     def get_permissions(self):
         if self.action == 'create':
@@ -151,38 +242,40 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return RecipesCreateSerializer
         return RecipesSerializer
 
-    def get_queryset(self):
-        is_favorited = self.request.query_params.get('is_favorited')
-        in_cart = self.request.query_params.get('is_in_shopping_cart')
-        favorit_queryset = None
-        cart_queryset = None
-        if self.request.user.is_authenticated:
-            if is_favorited == '1':
-                favorit_queryset = self.request.user.favorite_recipes.all()
-            elif is_favorited == '0':
-                favorit_queryset = Recipe.objects.exclude(
-                    favorit_recipe__user=self.request.user
-                )
-            if in_cart == '1':
-                cart_queryset = self.request.user.shopping_cart_recipes.all()
-            elif in_cart == '0':
-                cart_queryset = Recipe.objects.exclude(
-                    cart_recipe__user=self.request.user
-                )
-        if favorit_queryset is not None and cart_queryset is not None:
-            return favorit_queryset & cart_queryset
-        if favorit_queryset is not None:
-            return favorit_queryset
-        if cart_queryset is not None:
-            return cart_queryset
+    def get_base_queryset(self):
+        """
+        Рецепты без подгрузки связанных данных. Фильтры
+        is_favorited/is_in_shopping_cart применяет RecipeFilter.
+        """
         return Recipe.objects.all()
 
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.with_related(self.request.user)
+        return queryset
+
+    def get_output_data(self, recipe):
+        """
+        Сериализует сохранённый рецепт по тому же плану загрузки,
+        что используется для list/retrieve.
+        """
+        recipe = Recipe.objects.with_related(self.request.user).get(
+            id=recipe.id
+        )
+        return RecipesSerializer(
+            recipe,
+            context=self.get_serializer_context()
+        ).data
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         recipe = serializer.save()
-        serializer_out = RecipesSerializer(recipe)
-        return Response(serializer_out.data, status=status.HTTP_201_CREATED)
+        return Response(
+            self.get_output_data(recipe),
+            status=status.HTTP_201_CREATED
+        )
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -194,74 +287,156 @@ class RecipesViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         recipe = serializer.save()
-        serializer_out = RecipesSerializer(recipe)
-        return Response(serializer_out.data, status=status.HTTP_200_OK)
+        return Response(
+            self.get_output_data(recipe),
+            status=status.HTTP_200_OK
+        )
+
 
+class ShoppingCartViewSet(UserRecipeViewSet):
+    model = ShoppingCartRecipes
+    errors = {
+        ALREADY_ADDED: 'Recipe already in shopping cart.',
+        NOT_ADDED: 'Recipe not in shopping cart.',
+    }
 
-class ShoppingCartViewSet(viewsets.ModelViewSet):
+
+class BulkRelationViewSet(viewsets.ViewSet):
+    """
+    Пакетное изменение списка пользователя (model): POST {"ids": [...]}
+    добавляет объекты, POST remove/ удаляет их. Каждый запрос -
+    одна транзакция с запросами над всем набором id
+    (cookbook.toggles), в ответе результат по каждому id.
+    """
     permission_classes = (permissions.IsAuthenticated,)
+    model = None
 
-    def create(self, request, id=None):
-        current_user = request.user
-        recipe_for_cart = get_object_or_404(Recipe, id=id)
-        recipe, not_exists = ShoppingCartRecipes.objects.get_or_create(
-            user=current_user,
-            recipe=recipe_for_cart
-        )
-        if not not_exists:
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
-                data={'errors': 'Recipe already in shopping cart.'}
-            )
-        serializer = FavoriteRecipesSerializer(recipe_for_cart)
-        return Response(
-            serializer.data,
-            status=status.HTTP_201_CREATED
+    def get_ids(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+
+    def get_excluded(self, request):
+        return ()
+
+    def get_response(self, results):
+        return Response({'results': [
+            {'id': pk, 'status': result} for pk, result in results.items()
+        ]})
+
+    def create(self, request):
+        return self.get_response(add_many(
+            self.model,
+            request.user.id,
+            self.get_ids(request),
+            excluded=self.get_excluded(request)
+        ))
+
+    @action(methods=('post',), detail=False)
+    def remove(self, request):
+        return self.get_response(
+            remove_many(self.model, request.user.id, self.get_ids(request))
         )
 
+
+class BulkFavoriteRecipesViewSet(BulkRelationViewSet):
+    model = FavoritRecipes
+
+
+class BulkShoppingCartViewSet(BulkRelationViewSet):
+    """DELETE очищает корзину."""
+    model = ShoppingCartRecipes
+
     @action(methods=('delete',), detail=False)
-    def delete(self, request, id=None):
-        current_user = request.user
-        recipe = get_object_or_404(Recipe, id=id)
-        if not ShoppingCartRecipes.objects.filter(user=current_user,
-                                                  recipe=recipe).exists():
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
-                data={'errors': 'Recipe not in shopping cart.'}
-            )
-        ShoppingCartRecipes.objects.get(user=current_user,
-                                        recipe=recipe).delete()
+    def delete(self, request):
+        remove_many(self.model, request.user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class DownloadShoppingCartViewSet(viewsets.ModelViewSet):
+class BulkSubscribeViewSet(BulkRelationViewSet):
+    """Подписка на себя отмечается результатом invalid."""
+    model = Follow
+
+    def get_excluded(self, request):
+        return (request.user.id,)
+
+
+class DownloadShoppingCartViewSet(viewsets.ViewSet):
     """
     Обрабатывает запрос на скачивание списка покупок.
+    Формат выбирается параметром ?format= (txt, csv, json, pdf),
+    строки готового списка (ShoppingListItem) отдаются потоком
+    по мере чтения из курсора.
     """
-    queryset = ShoppingCartRecipes.objects.all()
-    serializer_class = DownloadShoppingCartSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = SHOPPING_LIST_RENDERERS
+
+    def handle_exception(self, exc):
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
 
     def list(self, request, *args, **kwargs):
-        all_ingr_in_cart = RecipeIngredients.objects.filter(
-            recipe__cart_recipe__user=request.user).values(
-                'ingredient').annotate(Sum('amount'))
-        if not all_ingr_in_cart:
+        rows = ShoppingListItem.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        ).order_by(
+            'ingredient__name',
+            'ingredient__measurement_unit'
+        ).iterator()
+        first_row = next(rows, None)
+        if first_row is None:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        ingredients_list = []
-        for ingr in all_ingr_in_cart:
-            amount = ingr.get('amount__sum')
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=ingr.get('ingredient')
-            )
-            unit = ingredient.measurement_unit
-            name = ingredient.name
-            row = f'{name} ({unit}) - {amount}'
-            ingredients_list.append(row)
-        response = HttpResponse(content_type='text')
-        response.write('\n'.join(ingredients_list))
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(chain((first_row,), rows)),
+            content_type=content_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename=shopping_list.txt'
+            f'attachment; filename=shopping_list.{renderer.format}'
         )
         return response
+
+
+class CookableRecipesViewSet(viewsets.GenericViewSet):
+    """
+    Рецепты, которые можно приготовить из имеющихся ингредиентов:
+    ?ingredients= (несколько раз), ?max_missing= - сколько
+    ингредиентов может не хватать. Рецепты выбираются
+    по инвертированному индексу cookable_index и сортируются
+    по доле имеющихся ингредиентов.
+    """
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = CustomPagination
+    serializer_class = RecipesSerializer
+
+    def list(self, request, *args, **kwargs):
+        query = CookableQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        matches = cookable_index.search(
+            query.validated_data['ingredients'],
+            query.validated_data['max_missing']
+        )
+        page = self.paginate_queryset(matches)
+        if page is not None:
+            matches = page
+        recipes = Recipe.objects.with_related(request.user).in_bulk(
+            [match.recipe_id for match in matches]
+        )
+        matches = [match for match in matches if match.recipe_id in recipes]
+        data = self.get_serializer(
+            [recipes[match.recipe_id] for match in matches],
+            many=True
+        ).data
+        for item, match in zip(data, matches):
+            item['ingredients_matched'] = match.matched
+            item['ingredients_missing'] = match.total - match.matched
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
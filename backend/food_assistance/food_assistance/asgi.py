@@ -0,0 +1,15 @@
+"""
+ASGI config for food_assistance project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, e.g.
+``gunicorn food_assistance.asgi:application -k uvicorn.workers.UvicornWorker``.
+"""
+
+import os
+
+from food_assistance.handlers import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_assistance.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base, creation
+from food_assistance.db.mixins import (HealthCheckMixin,
+                                       PooledConnectionMixin,
+                                       PooledCreationMixin)
+
+
+class DatabaseCreation(PooledCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledConnectionMixin, HealthCheckMixin,
+                      base.DatabaseWrapper):
+    """SQLite с проверкой постоянных соединений и пулом."""
+    creation_class = DatabaseCreation
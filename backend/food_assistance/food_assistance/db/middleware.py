@@ -0,0 +1,51 @@
+from food_assistance.db.router import replica_reads
+from food_assistance.settings import (REPLICA_PRIMARY_PATHS,
+                                      REPLICA_STICKY_COOKIE,
+                                      REPLICA_STICKY_SECONDS)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+SIGNING_SALT = 'food_assistance.db.middleware.ReplicaRoutingMiddleware'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы читают с реплик (ReplicaRouter). Клиент,
+    успешно выполнивший запрос на изменение, получает подписанную
+    cookie и следующие sticky_seconds секунд читает с основной БД,
+    то есть видит свои изменения. Срок проверяется по подписи,
+    поэтому отметка действует в любом процессе и на любом сервере.
+    """
+    sticky_seconds = REPLICA_STICKY_SECONDS
+    cookie_name = REPLICA_STICKY_COOKIE
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_sticky(self, request):
+        # Без cookie, с чужой подписью или истёкшей - None.
+        return bool(request.get_signed_cookie(
+            self.cookie_name,
+            default=None,
+            salt=SIGNING_SALT,
+            max_age=self.sticky_seconds
+        ))
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        allowed = (
+            safe
+            and not request.path.startswith(REPLICA_PRIMARY_PATHS)
+            and not self.is_sticky(request)
+        )
+        with replica_reads(allowed):
+            response = self.get_response(request)
+        if not safe and response.status_code < 400:
+            response.set_signed_cookie(
+                self.cookie_name,
+                '1',
+                salt=SIGNING_SALT,
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
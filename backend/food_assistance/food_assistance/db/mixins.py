@@ -0,0 +1,112 @@
+from functools import partial
+
+from django.core.exceptions import ImproperlyConfigured
+
+from food_assistance.db.pool import close_pools, get_pool
+
+
+def ping(connection):
+    """Проверка соединения драйвера без обёрток Django."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+    # Без autocommit SELECT открыл транзакцию.
+    connection.rollback()
+    return True
+
+
+class HealthCheckMixin:
+    """
+    Проверка постоянного соединения (CONN_MAX_AGE) перед первым
+    обращением к БД в каждом HTTP-запросе, если в настройках БД
+    задано HEALTH_CHECKS. Соединение, разорванное сервером или
+    сетью за время простоя, заменяется новым вместо ошибки запроса.
+    """
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.settings_dict.get('HEALTH_CHECKS')
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+
+class PooledConnectionMixin:
+    """
+    Соединения из пула процесса, если в настройках БД задан POOL:
+    {'MIN_SIZE', 'MAX_SIZE', 'TIMEOUT', 'MAX_LIFETIME'}. Закрытие
+    соединения Django возвращает его в пул. Без POOL соединения
+    открываются и закрываются как обычно.
+
+    С POOL нужен CONN_MAX_AGE = 0: иначе Django не закрывает
+    соединение в конце запроса, и оно не возвращается в пул.
+    """
+    pool = None
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        if settings_dict.get('POOL') and settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'POOL requires CONN_MAX_AGE = 0: persistent connections '
+                'are never returned to the pool.'
+            )
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def get_pool(self, conn_params):
+        settings_dict = self.settings_dict
+        options = settings_dict['POOL']
+        return get_pool(
+            (self.alias, settings_dict['NAME'], settings_dict['HOST'],
+             settings_dict['PORT'], settings_dict['USER']),
+            partial(super().get_new_connection, conn_params),
+            min_size=options.get('MIN_SIZE', 0),
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 30.0),
+            max_lifetime=options.get('MAX_LIFETIME'),
+            check=ping if settings_dict.get('HEALTH_CHECKS') else None
+        )
+
+    def get_new_connection(self, conn_params):
+        if not self.settings_dict.get('POOL'):
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        return self.pool.acquire(
+            partial(super().get_new_connection, conn_params)
+        )
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            super()._close()
+            return
+        pool, self.pool = self.pool, None
+        # Соединение, закрытое внутри atomic, остаётся у обёртки
+        # до выхода из блока, в пул его возвращать нельзя.
+        discard = self.in_atomic_block
+        if not discard:
+            try:
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        pool.release(self.connection, discard=discard)
+
+
+class PooledCreationMixin:
+    """Закрытие пулов перед удалением тестовой БД."""
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,264 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Пулы процесса по ключу (alias, NAME, HOST, PORT, USER).
+_pools = {}
+# Пулы, унаследованные от родительского процесса после fork.
+# Ссылки на них не отпускаются: при сборке мусора драйвер закрыл
+# бы соединения, которые родитель продолжает использовать.
+_inherited = []
+_pools_lock = threading.Lock()
+
+
+class PoolTimeoutError(Exception):
+    """Свободное соединение не появилось за время ожидания."""
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД внутри процесса.
+
+    Держит не больше max_size открытых соединений, min_size из них
+    открываются заранее методом fill. acquire ждёт освобождения
+    соединения не дольше timeout секунд и выдаёт последнее
+    возвращённое, чтобы реже используемые соединения доживали
+    до max_lifetime и закрывались. Соединения старше max_lifetime
+    секунд закрываются при возврате и не выдаются повторно.
+
+    check(connection) - необязательная проверка соединения из пула
+    перед выдачей, неработающие соединения заменяются новыми.
+    """
+    def __init__(self, min_size=0, max_size=10, timeout=30.0,
+                 max_lifetime=None, check=None):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError(
+                'Pool sizes must satisfy 0 <= min_size <= max_size, '
+                'max_size >= 1.'
+            )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = deque()
+        # Открытое соединение -> время открытия.
+        self.opened = {}
+        # Открытые и открываемые соединения.
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.closed = False
+        self.counters = {
+            'acquired': 0,
+            'created': 0,
+            'closed': 0,
+            'timeouts': 0,
+            'failed_checks': 0,
+        }
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def is_expired(self, connection):
+        if self.max_lifetime is None:
+            return False
+        opened = self.opened.get(connection)
+        return (
+            opened is None
+            or time.monotonic() - opened >= self.max_lifetime
+        )
+
+    def close_connection(self, connection):
+        """Закрывает соединение, вызывается под self.condition."""
+        self.opened.pop(connection, None)
+        self.size -= 1
+        self.counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            logger.debug('Error closing pooled connection', exc_info=True)
+
+    def reserve(self, deadline):
+        """
+        Свободное соединение из пула или место под новое
+        (None, True). Ждёт до deadline, если пул исчерпан.
+        """
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError('Connection pool is closed.')
+                while self.idle:
+                    connection = self.idle.pop()
+                    if self.is_expired(connection):
+                        self.close_connection(connection)
+                        continue
+                    self.in_use += 1
+                    return connection, False
+                if self.size < self.max_size:
+                    self.size += 1
+                    self.in_use += 1
+                    return None, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    logger.warning(
+                        'Connection pool exhausted: %s', self.stats()
+                    )
+                    raise PoolTimeoutError(
+                        f'No connection available in {self.timeout} s '
+                        f'(max_size={self.max_size}).'
+                    )
+                self.waiting += 1
+                try:
+                    self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+    def open(self, connect):
+        """Открывает соединение на зарезервированное место."""
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened[connection] = time.monotonic()
+            self.counters['created'] += 1
+        return connection
+
+    def is_alive(self, connection):
+        if self.check is None:
+            return True
+        try:
+            return self.check(connection)
+        except Exception:
+            return False
+
+    def acquire(self, connect):
+        """
+        Соединение из пула. connect() открывает новое соединение,
+        если свободных нет, а размер пула меньше max_size.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, create = self.reserve(deadline)
+            if create:
+                connection = self.open(connect)
+                break
+            if self.is_alive(connection):
+                break
+            with self.condition:
+                self.counters['failed_checks'] += 1
+                self.in_use -= 1
+                self.close_connection(connection)
+                self.condition.notify()
+        waited = time.monotonic() - started
+        with self.condition:
+            self.counters['acquired'] += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+        return connection
+
+    def release(self, connection, discard=False):
+        """
+        Возвращает соединение в пул. Соединения, которые нельзя
+        использовать повторно (discard), устаревшие и соединения
+        закрытого пула закрываются.
+        """
+        with self.condition:
+            self.in_use -= 1
+            if (
+                discard
+                or self.closed
+                or connection not in self.opened
+                or self.is_expired(connection)
+            ):
+                self.close_connection(connection)
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+
+    def fill(self, connect):
+        """Открывает соединения до min_size."""
+        while True:
+            with self.condition:
+                if self.closed or self.size >= self.min_size:
+                    return
+                self.size += 1
+                self.in_use += 1
+            self.release(self.open(connect))
+
+    def close_all(self):
+        """
+        Закрывает свободные соединения и пул. Выданные соединения
+        закрываются при возврате.
+        """
+        with self.condition:
+            self.closed = True
+            while self.idle:
+                self.close_connection(self.idle.pop())
+            self.condition.notify_all()
+
+    def stats(self):
+        """Размер пула и счётчики с момента создания."""
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self.counters,
+                'wait_time': self.wait_time,
+                'max_wait': self.max_wait,
+            }
+
+
+def get_pool(key, connect, **options):
+    """
+    Пул процесса для ключа key, создаётся при первом обращении
+    и заполняется до min_size. После fork создаётся новый пул:
+    соединения родительского процесса не используются.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        created = pool is None or pool.pid != os.getpid()
+        if created:
+            if pool is not None:
+                _inherited.append(pool)
+            pool = _pools[key] = ConnectionPool(**options)
+    if created:
+        pool.fill(connect)
+    return pool
+
+
+def close_pools(alias=None):
+    """Закрывает пулы процесса (только для alias, если он указан)."""
+    with _pools_lock:
+        keys = [key for key in _pools if alias is None or key[0] == alias]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close_all()
+
+
+def pool_stats():
+    """Статистика пулов процесса по alias и имени БД."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        ':'.join(map(str, key[:2])): pool.stats()
+        for key, pool in pools
+        if pool.pid == os.getpid()
+    }
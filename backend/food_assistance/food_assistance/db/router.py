@@ -0,0 +1,129 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import DatabaseError, connections
+
+from food_assistance.settings import (DATABASE_REPLICAS,
+                                      REPLICA_HEALTH_CHECK_INTERVAL,
+                                      REPLICA_MAX_LAG)
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+# Отставание реплики PostgreSQL в секундах, 0 - всё полученное
+# применено.
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - '
+    'pg_last_xact_replay_timestamp()) END'
+)
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """
+    Разрешает (или запрещает) чтение с реплик в текущем потоке.
+    Реплика выбирается при первом чтении и не меняется до выхода.
+    """
+    previous = (
+        getattr(_state, 'allowed', False),
+        getattr(_state, 'alias', None)
+    )
+    _state.allowed, _state.alias = allowed, None
+    try:
+        yield
+    finally:
+        _state.allowed, _state.alias = previous
+
+
+class ReplicaHealth:
+    """
+    Состояние реплик процесса. Реплика проверяется не чаще раза
+    в interval секунд: запросом к ней и, для PostgreSQL, по отставанию
+    от основной БД, которое не должно превышать max_lag секунд.
+    """
+    def __init__(self, interval=REPLICA_HEALTH_CHECK_INTERVAL,
+                 max_lag=REPLICA_MAX_LAG):
+        self.interval = interval
+        self.max_lag = max_lag
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor != 'postgresql':
+                    cursor.execute('SELECT 1')
+                    return True
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except DatabaseError:
+            connection.close()
+            return False
+        return lag is None or lag <= self.max_lag
+
+    def is_healthy(self, alias):
+        with self._lock:
+            healthy, checked = self._checked.get(alias, (None, 0))
+        if healthy is not None and time.monotonic() - checked < self.interval:
+            return healthy
+        healthy = self.check(alias)
+        if not healthy:
+            logger.warning('Replica %s is unavailable', alias)
+        with self._lock:
+            self._checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def mark_unhealthy(self, alias):
+        with self._lock:
+            self._checked[alias] = (False, time.monotonic())
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Чтение с реплик DATABASE_REPLICAS внутри replica_reads
+    (безопасные запросы, см. ReplicaRoutingMiddleware), запись
+    и остальное чтение - с основной БД. Токены читаются с основной
+    БД, чтобы только что выданный токен сразу работал.
+    """
+    replicas = DATABASE_REPLICAS
+    primary_models = ('authtoken.Token',)
+
+    def get_replica(self):
+        if not getattr(_state, 'allowed', False):
+            return None
+        if _state.alias is None:
+            healthy = [
+                alias for alias in self.replicas
+                if replica_health.is_healthy(alias)
+            ]
+            _state.alias = random.choice(healthy) if healthy else PRIMARY
+        return _state.alias
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or model._meta.label in self.primary_models:
+            return None
+        replica = self.get_replica()
+        return None if replica == PRIMARY else replica
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = (PRIMARY, *self.replicas)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,232 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+
+from food_assistance.db.pool import close_pools
+from food_assistance.settings import (ASGI_MAX_BODY_BYTES, ASGI_READ_THREADS,
+                                      ASGI_SPOOL_MAX_MEMORY,
+                                      ASGI_WRITE_THREADS)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+CHUNK_SIZE = 64 * 1024
+TOO_LARGE_BODY = b'{"detail":"Request body is too large."}'
+# Повторяющиеся заголовки объединяются через запятую (RFC 7230),
+# а Cookie - через '; ' (RFC 6265).
+HEADER_SEPARATORS = {'HTTP_COOKIE': '; '}
+
+
+class ClientDisconnectedError(Exception):
+    """Клиент отключился, не передав тело запроса."""
+
+
+class ASGIHandler:
+    """
+    ASGI-приложение для Django 2.2, в котором нет своего
+    ASGI-обработчика.
+
+    Тело запроса читается в цикле событий во временный файл,
+    представление выполняется обычным WSGIHandler в пуле потоков,
+    а ответ, в том числе потоковый (список покупок), записывается
+    во временный файл и отдаётся клиенту снова из цикла событий.
+    Поток и соединение с БД заняты только на время работы
+    представления: медленная загрузка картинки или скачивание
+    большого списка покупок держат лишь сокет.
+
+    Безопасные запросы (теги, ингредиенты, рецепты, список покупок)
+    выполняются в отдельном пуле потоков, чтобы тяжёлые запросы
+    на изменение не занимали все потоки.
+    """
+    def __init__(self, read_executor=None, write_executor=None,
+                 max_body_bytes=ASGI_MAX_BODY_BYTES,
+                 spool_max_memory=ASGI_SPOOL_MAX_MEMORY):
+        self.wsgi_handler = WSGIHandler()
+        self.read_executor = read_executor or ThreadPoolExecutor(
+            ASGI_READ_THREADS, thread_name_prefix='asgi-read'
+        )
+        self.write_executor = write_executor or ThreadPoolExecutor(
+            ASGI_WRITE_THREADS, thread_name_prefix='asgi-write'
+        )
+        self.max_body_bytes = max_body_bytes
+        self.spool_max_memory = spool_max_memory
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]}.')
+        try:
+            body = await self.read_body(scope, receive)
+        except ClientDisconnectedError:
+            return
+        if body is None:
+            await self.send_response(
+                send,
+                '413 Request Entity Too Large',
+                [('Content-Type', 'application/json')],
+                BytesIO(TOO_LARGE_BODY)
+            )
+            return
+        executor = (
+            self.read_executor if scope['method'] in SAFE_METHODS
+            else self.write_executor
+        )
+        with body:
+            status, headers, content = await (
+                asyncio.get_running_loop().run_in_executor(
+                    executor,
+                    self.run_wsgi,
+                    self.get_environ(scope, body)
+                )
+            )
+        with content:
+            await self.send_response(
+                send, status, headers, content,
+                with_body=scope['method'] != 'HEAD'
+            )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_executor.shutdown()
+                self.write_executor.shutdown()
+                close_pools()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive):
+        """
+        Тело запроса во временном файле или None, если оно больше
+        max_bytes.
+        """
+        for name, value in scope['headers']:
+            if name == b'content-length':
+                try:
+                    if int(value) > self.max_body_bytes:
+                        return None
+                except ValueError:
+                    pass
+        body = SpooledTemporaryFile(self.spool_max_memory)
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                raise ClientDisconnectedError
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                body.close()
+                return None
+            body.write(chunk)
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        return body
+
+    def get_environ(self, scope, body):
+        """WSGI environ из ASGI scope."""
+        path = scope['path']
+        script_name = scope.get('root_path', '')
+        if script_name and path.startswith(script_name):
+            path = path[len(script_name):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('127.0.0.1', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name.encode().decode('latin-1'),
+            'PATH_INFO': path.encode().decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': str(client[0]),
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(body.seek(0, 2)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        body.seek(0)
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            if name == 'CONTENT_LENGTH':
+                continue
+            if name != 'CONTENT_TYPE':
+                name = f'HTTP_{name}'
+            value = value.decode('latin-1')
+            if name in environ:
+                separator = HEADER_SEPARATORS.get(name, ',')
+                value = f'{environ[name]}{separator}{value}'
+            environ[name] = value
+        return environ
+
+    def run_wsgi(self, environ):
+        """
+        Выполняет запрос в потоке пула и записывает тело ответа
+        во временный файл. Соединения с БД закрываются обработчиком
+        request_finished при закрытии ответа, в этом же потоке.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = headers
+
+        response = self.wsgi_handler(environ, start_response)
+        content = SpooledTemporaryFile(self.spool_max_memory)
+        try:
+            for chunk in response:
+                content.write(chunk)
+        except BaseException:
+            content.close()
+            raise
+        finally:
+            response.close()
+        content.seek(0)
+        return started['status'], started['headers'], content
+
+    async def send_response(self, send, status, headers, content,
+                            with_body=True):
+        """Отдаёт ответ из файла порциями по CHUNK_SIZE байт."""
+        if not any(
+            name.lower() in ('content-length', 'transfer-encoding')
+            for name, _ in headers
+        ):
+            headers = [*headers, ('Content-Length', str(content.seek(0, 2)))]
+            content.seek(0)
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ],
+        })
+        chunk = content.read(CHUNK_SIZE) if with_body else b''
+        while chunk:
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+            chunk = content.read(CHUNK_SIZE)
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def get_asgi_application():
+    """Аналог django.core.wsgi.get_wsgi_application для ASGI."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'food_assistance.db.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,17 +90,89 @@ WSGI_APPLICATION = 'food_assistance.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Пул соединений процесса (food_assistance.db.pool), 0 - без пула.
+# С пулом соединение возвращается в него в конце каждого запроса,
+# поэтому DB_CONN_MAX_AGE не действует: постоянное соединение
+# занимало бы место в пуле, пока поток жив.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', default=0))
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': os.getenv('DB_ENGINE', default='food_assistance.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='qwerty123'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(
+            os.getenv('DB_CONN_MAX_AGE', default=60)
+        ),
+        # Проверка постоянного соединения в начале каждого запроса,
+        # работает с бэкендами food_assistance.db.backends.
+        'HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS', default='1') == '1',
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=0)),
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'MAX_LIFETIME': int(
+                os.getenv('DB_POOL_MAX_LIFETIME', default=30 * 60)
+            ),
+        } if DB_POOL_MAX_SIZE else None,
     }
 }
 
+# Реплики для чтения: хосты через запятую в DB_REPLICA_HOSTS,
+# алиасы replica_1, replica_2, ... Тесты запускаются без реплик,
+# их заменяет отдельная БД SQLite (food_assistance/tests/test_replicas.py).
+DATABASE_REPLICAS = ()
+
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), 1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS += (f'replica_{number}',)
+
+DATABASE_ROUTERS = ['food_assistance.db.router.ReplicaRouter']
+
+# Сколько секунд клиент после изменения читает с основной БД.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=10))
+
+REPLICA_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', default=5)
+)
+
+# Допустимое отставание реплики PostgreSQL, в секундах.
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', default=10))
+
+# Окно чтения с основной БД хранится в подписанной cookie, а не в кэше:
+# с LocMemCache каждый процесс видел бы только свои отметки.
+REPLICA_STICKY_COOKIE = 'replica_sticky'
+
+# Пути, запросы к которым всегда читают с основной БД.
+REPLICA_PRIMARY_PATHS = ('/admin/', '/api/auth/')
+
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='food_assistance'),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = 'default'
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=600))
+
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS') or None
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', default=10000))
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', default=60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,7 +216,7 @@ REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -164,3 +237,84 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static_web')
 MINIMUM_AMOUNT_OF_INGREDIENT = 1
 
 MINIMUM_COOKING_TIME = 1
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+
+COOKABLE_INDEX_TTL = int(os.getenv('COOKABLE_INDEX_TTL', default=300))
+
+COOKABLE_MAX_MISSING = 10
+
+CURSOR_PAGE_SIZE = 6
+
+APPROXIMATE_COUNT_THRESHOLD = int(
+    os.getenv('APPROXIMATE_COUNT_THRESHOLD', default=10000)
+)
+
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (320, 320),
+    'medium': (960, 960),
+}
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+
+MEDIA_BLOB_DIR = 'images'
+
+MEDIA_GC_GRACE = int(os.getenv('MEDIA_GC_GRACE', default=24 * 60 * 60))
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.getenv('RECIPE_IMAGE_MAX_BYTES', default=10 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=40_000_000)
+)
+
+# base64 увеличивает размер в 4/3 раза, остальные поля рецепта
+# укладываются в 1 МБ.
+RECIPE_JSON_MAX_BYTES = RECIPE_IMAGE_MAX_BYTES * 4 // 3 + 1024 * 1024
+
+# ASGI (food_assistance.asgi): потоки для безопасных (GET, HEAD,
+# OPTIONS) и остальных запросов, предел тела запроса и объём ответа,
+# который держится в памяти до передачи клиенту.
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', default=16))
+
+ASGI_WRITE_THREADS = int(os.getenv('ASGI_WRITE_THREADS', default=4))
+
+ASGI_MAX_BODY_BYTES = RECIPE_JSON_MAX_BYTES
+
+ASGI_SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Шрифт TrueType с кириллицей для списка покупок в PDF.
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Период полураспада вклада добавления в избранное или корзину
+# в рейтинг trending, в секундах.
+TRENDING_HALF_LIFE = int(
+    os.getenv('TRENDING_HALF_LIFE', default=3 * 24 * 60 * 60)
+)
+
+TRENDING_FAVORITE_WEIGHT = 1.0
+
+TRENDING_CART_WEIGHT = 0.5
+
+TRENDING_BATCH_SIZE = 500
+
+# Пакетное применение добавлений в избранное и корзину и удалений
+# из них (cookbook.toggles) и наибольшее число изменений в пакете.
+TOGGLE_BATCHING = os.getenv('TOGGLE_BATCHING', default='0') == '1'
+
+TOGGLE_BATCH_SIZE = int(os.getenv('TOGGLE_BATCH_SIZE', default=100))
+
+TOGGLE_BATCH_TIMEOUT = 10
+
+# Наибольшее число id в пакетных запросах к избранному, корзине
+# и подпискам.
+BULK_MAX_IDS = 100
+
+# Конфигурации полнотекстового поиска PostgreSQL: вектор рецепта
+# строится по каждой из них, чтобы работали русский и английский
+# стемминг.
+RECIPE_SEARCH_CONFIGS = ('russian', 'english')
@@ -0,0 +1,268 @@
+import asyncio
+import json
+from concurrent.futures import Executor, Future
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from cookbook.models import (Ingredient, Recipe, RecipeIngredients,
+                             ShoppingCartRecipes, Tag)
+from food_assistance.handlers import ASGIHandler
+
+User = get_user_model()
+
+
+class InlineExecutor(Executor):
+    """
+    Выполняет задачи в потоке цикла событий: тестовая транзакция
+    видна только соединению этого потока.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls += 1
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def make_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'testserver'), *headers],
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 12345),
+    }
+
+
+class ASGIHandlerTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(
+            name='tag_name',
+            color='#A12345',
+            slug='tag'
+        )
+        self.read_executor = InlineExecutor()
+        self.write_executor = InlineExecutor()
+        self.handler = ASGIHandler(
+            read_executor=self.read_executor,
+            write_executor=self.write_executor,
+            max_body_bytes=1024,
+            spool_max_memory=64
+        )
+
+    async def call(self, scope, chunks=(b'',), delay=0):
+        messages = [
+            {
+                'type': 'http.request',
+                'body': chunk,
+                'more_body': number < len(chunks) - 1
+            }
+            for number, chunk in enumerate(chunks)
+        ]
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(delay)
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.handler(scope, receive, send)
+        headers = dict(sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        return sent[0]['status'], headers, body
+
+    def request(self, *args, **kwargs):
+        return asyncio.run(self.call(*args, **kwargs))
+
+    def test_get(self):
+        """Ответ совпадает с ответом WSGI-обработчика."""
+        status_code, headers, body = self.request(make_scope('/api/tags/'))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(body),
+            self.client.get('/api/tags/').json()
+        )
+        self.assertEqual(int(headers[b'content-length']), len(body))
+        self.assertEqual(
+            (self.read_executor.calls, self.write_executor.calls),
+            (1, 0)
+        )
+
+    def test_query_string_and_head(self):
+        status_code, headers, body = self.request(
+            make_scope('/api/tags/', method='HEAD')
+        )
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(body, b'')
+        self.assertGreater(int(headers[b'content-length']), 0)
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        _, _, body = self.request(make_scope(
+            '/api/ingredients/',
+            query_string='name=со'.encode()
+        ))
+        self.assertEqual(json.loads(body)[0]['name'], 'соль')
+
+    def test_repeated_headers(self):
+        """Cookie объединяются через '; ', остальные - через запятую."""
+        environ = self.handler.get_environ(
+            make_scope('/api/tags/', headers=(
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+            )),
+            BytesIO()
+        )
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    def test_post_body_in_chunks(self):
+        """Тело из нескольких сообщений передаётся представлению целиком."""
+        body = json.dumps({
+            'email': 'new@yandex.ru',
+            'username': 'new_user',
+            'first_name': 'Новый',
+            'last_name': 'Пользователь',
+            'password': 'New**Qwerty123'
+        }).encode()
+        status_code, _, _ = self.request(
+            make_scope(
+                '/api/users/',
+                method='POST',
+                headers=((b'content-type', b'application/json'),)
+            ),
+            chunks=(body[:10], body[10:50], body[50:])
+        )
+        self.assertEqual(status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.filter(username='new_user').exists())
+        self.assertEqual(
+            (self.read_executor.calls, self.write_executor.calls),
+            (0, 1)
+        )
+
+    def test_body_too_large(self):
+        """
+        Слишком большое тело отклоняется по Content-Length или
+        во время чтения, без вызова представления.
+        """
+        for headers, chunks in (
+            (((b'content-length', b'2048'),), (b'',)),
+            ((), (b'x' * 600, b'x' * 600)),
+        ):
+            with self.subTest(headers=headers):
+                status_code, _, _ = self.request(
+                    make_scope('/api/users/', method='POST', headers=headers),
+                    chunks=chunks
+                )
+                self.assertEqual(
+                    status_code,
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+        self.assertEqual(self.write_executor.calls, 0)
+
+    def test_shopping_list_download(self):
+        """Потоковый ответ отдаётся целиком и с Content-Length."""
+        recipe = Recipe.objects.create(
+            author=self.user,
+            name='recipe',
+            text='text',
+            image='',
+            cooking_time=10
+        )
+        for number in range(50):
+            RecipeIngredients.objects.create(
+                recipe=recipe,
+                ingredient=Ingredient.objects.create(
+                    name=f'ingredient_{number:02}',
+                    measurement_unit='г'
+                ),
+                amount=number + 1
+            )
+        ShoppingCartRecipes.objects.create(user=self.user, recipe=recipe)
+        status_code, headers, body = self.request(make_scope(
+            '/api/recipes/download_shopping_cart/',
+            query_string=b'format=txt',
+            headers=((b'authorization', f'Token {self.token.key}'.encode()),)
+        ))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(int(headers[b'content-length']), len(body))
+        self.assertIn(b'attachment', headers[b'content-disposition'])
+        for number in range(50):
+            self.assertIn(f'ingredient_{number:02}'.encode(), body)
+
+    def test_slow_upload_does_not_block(self):
+        """
+        Пока медленный клиент передаёт тело, другие запросы
+        обслуживаются.
+        """
+        finished = []
+
+        async def run():
+            async def slow():
+                await self.call(
+                    make_scope('/api/users/', method='POST'),
+                    chunks=(b'{',) * 5,
+                    delay=0.05
+                )
+                finished.append('slow')
+
+            async def fast():
+                await self.call(make_scope('/api/tags/'))
+                finished.append('fast')
+
+            await asyncio.gather(slow(), fast())
+
+        asyncio.run(run())
+        self.assertEqual(finished, ['fast', 'slow'])
+
+    def test_disconnect(self):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(
+            make_scope('/api/users/', method='POST'), receive, send
+        ))
+        self.assertEqual(sent, [])
+        self.assertEqual(self.write_executor.calls, 0)
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
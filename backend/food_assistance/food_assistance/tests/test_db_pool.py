@@ -0,0 +1,257 @@
+import os
+import shutil
+import tempfile
+import threading
+from importlib import import_module
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+from food_assistance.db import pool as pool_module
+from food_assistance.db.pool import (ConnectionPool, PoolTimeoutError,
+                                     close_pools, get_pool, pool_stats)
+
+BACKENDS = {
+    'postgresql': 'food_assistance.db.backends.postgresql',
+    'sqlite': 'food_assistance.db.backends.sqlite3',
+}
+ALIAS = 'pool_test'
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        pool = ConnectionPool(**{'max_size': 2, 'timeout': 0.05, **options})
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def test_reuse(self):
+        """Возвращённое соединение выдаётся повторно."""
+        pool = self.make_pool()
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_timeout(self):
+        """Исчерпанный пул ждёт timeout и сообщает об ошибке."""
+        pool = self.make_pool()
+        held = [pool.acquire(FakeConnection) for _ in range(2)]
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        pool.release(held[0])
+        self.assertIs(pool.acquire(FakeConnection), held[0])
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, (held,))
+        timer.start()
+        self.assertIs(pool.acquire(FakeConnection), held)
+        timer.join()
+        self.assertGreater(pool.stats()['max_wait'], 0)
+
+    def test_max_lifetime(self):
+        """Устаревшие соединения закрываются при возврате."""
+        pool = self.make_pool(max_lifetime=0)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.acquire(FakeConnection), first)
+        self.assertEqual(pool.stats()['closed'], 1)
+
+    def test_failed_check(self):
+        """Неработающее соединение заменяется новым."""
+        pool = self.make_pool(check=lambda connection: not connection.closed)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        first.closed = True
+        self.assertIsNot(pool.acquire(FakeConnection), first)
+        stats = pool.stats()
+        self.assertEqual(stats['failed_checks'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_connect_error(self):
+        """Ошибка открытия соединения освобождает место в пуле."""
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(OSError):
+            pool.acquire(mock.Mock(side_effect=OSError))
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.acquire(FakeConnection)
+
+    def test_fill_and_close_all(self):
+        pool = self.make_pool(min_size=2)
+        pool.fill(FakeConnection)
+        self.assertEqual(pool.stats()['idle'], 2)
+        held = pool.acquire(FakeConnection)
+        pool.close_all()
+        self.assertEqual(pool.stats()['idle'], 0)
+        pool.release(held)
+        self.assertTrue(held.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_concurrency(self):
+        """Под нагрузкой из потоков размер пула не превышает max_size."""
+        pool = self.make_pool(max_size=3, timeout=5)
+        errors = []
+
+        def work():
+            try:
+                for _ in range(50):
+                    pool.release(pool.acquire(FakeConnection))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = pool.stats()
+        self.assertLessEqual(stats['created'], 3)
+        self.assertEqual(stats['acquired'], 400)
+        self.assertEqual(stats['in_use'], 0)
+
+    def test_registry_after_fork(self):
+        """В дочернем процессе создаётся новый пул."""
+        self.addCleanup(close_pools, ALIAS)
+        key = (ALIAS, 'db')
+        pool = get_pool(key, FakeConnection, max_size=1)
+        self.assertIs(get_pool(key, FakeConnection, max_size=1), pool)
+        with mock.patch.object(
+            pool_module.os, 'getpid', return_value=os.getpid() + 1
+        ):
+            child = get_pool(key, FakeConnection, max_size=1)
+        self.addCleanup(pool_module._inherited.remove, pool)
+        self.assertIsNot(child, pool)
+        self.assertIn(pool, pool_module._inherited)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """
+    Бэкенды food_assistance.db.backends на той же СУБД, что и тесты:
+    локальный PostgreSQL или временный файл SQLite.
+    """
+    def setUp(self) -> None:
+        self.addCleanup(close_pools, ALIAS)
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': BACKENDS[connection.vendor],
+            'CONN_MAX_AGE': 0,
+            'HEALTH_CHECKS': True,
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0.05},
+        }
+        if connection.vendor == 'sqlite':
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+            settings_dict['NAME'] = os.path.join(directory, 'pool.sqlite3')
+        self.settings_dict = settings_dict
+
+    def make_wrapper(self, **settings):
+        backend = import_module(f'{self.settings_dict["ENGINE"]}.base')
+        wrapper = backend.DatabaseWrapper(
+            {**self.settings_dict, **settings}, ALIAS
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def get_stats(self):
+        return next(iter(pool_stats().values()))
+
+    def test_close_returns_to_pool(self):
+        """Закрытие соединения возвращает его в пул."""
+        wrapper = self.make_wrapper()
+        self.assertEqual(self.query(wrapper), 1)
+        raw_connection = wrapper.connection
+        wrapper.close()
+        self.assertEqual(self.get_stats()['idle'], 1)
+        other = self.make_wrapper()
+        self.query(other)
+        self.assertIs(other.connection, raw_connection)
+        self.assertEqual(self.get_stats()['created'], 1)
+
+    def test_pool_limit(self):
+        wrappers = [self.make_wrapper() for _ in range(3)]
+        for wrapper in wrappers[:2]:
+            self.query(wrapper)
+        with self.assertRaises(PoolTimeoutError):
+            self.query(wrappers[2])
+
+    def test_close_in_atomic_discards(self):
+        """Соединение, закрытое внутри транзакции, в пул не попадает."""
+        wrapper = self.make_wrapper()
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+        wrapper.in_atomic_block = True
+        wrapper.close()
+        wrapper.in_atomic_block = False
+        wrapper.connection = None
+        stats = self.get_stats()
+        self.assertEqual((stats['idle'], stats['closed']), (0, 1))
+
+    def test_persistent_connections_rejected(self):
+        """Постоянные соединения с пулом несовместимы."""
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_wrapper(CONN_MAX_AGE=60)
+
+    def test_request_end_returns_to_pool(self):
+        """Соединение возвращается в пул в конце каждого запроса."""
+        wrapper = self.make_wrapper()
+        self.query(wrapper)
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(self.get_stats()['idle'], 1)
+
+    def test_health_check(self):
+        """
+        Разорванное постоянное соединение заменяется в начале
+        следующего запроса, а не приводит к ошибке.
+        """
+        wrapper = self.make_wrapper(POOL=None, CONN_MAX_AGE=60)
+        self.query(wrapper)
+        broken = wrapper.connection
+        broken.close()
+        wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(wrapper, 'is_usable', return_value=False):
+            self.assertEqual(self.query(wrapper), 1)
+        self.assertIsNot(wrapper.connection, broken)
+
+    def test_health_check_once_per_request(self):
+        wrapper = self.make_wrapper(POOL=None, CONN_MAX_AGE=60)
+        self.query(wrapper)
+        wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(
+            wrapper, 'is_usable', return_value=True
+        ) as is_usable:
+            self.query(wrapper)
+            self.query(wrapper)
+        is_usable.assert_called_once_with()
+
+    def test_idle_connection_checked(self):
+        """Соединение из пула проверяется перед выдачей."""
+        wrapper = self.make_wrapper()
+        self.query(wrapper)
+        broken = wrapper.connection
+        wrapper.close()
+        broken.close()
+        self.query(wrapper)
+        self.assertIsNot(wrapper.connection, broken)
+        self.assertEqual(self.get_stats()['failed_checks'], 1)
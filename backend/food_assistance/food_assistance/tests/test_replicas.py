@@ -0,0 +1,191 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from cookbook.models import Recipe, Tag
+from food_assistance.db.router import (ReplicaHealth, ReplicaRouter,
+                                       replica_health, replica_reads)
+from food_assistance.settings import (REPLICA_STICKY_COOKIE,
+                                      REPLICA_STICKY_SECONDS)
+
+User = get_user_model()
+REPLICA = 'replica_test'
+
+
+class ReplicaRoutingTests(APITestCase):
+    """
+    Основная тестовая БД и реплика - отдельный файл SQLite
+    с разными данными, по ответу видно, откуда шло чтение.
+    """
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        cls.replicas = mock.patch.object(
+            ReplicaRouter, 'replicas', (REPLICA,)
+        )
+        cls.replicas.start()
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas.stop()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self) -> None:
+        replica_health.reset()
+        self.addCleanup(replica_health.reset)
+        self.user = User.objects.create(
+            email='user@yandex.ru',
+            username='user',
+            first_name='user_name',
+            last_name='user_family',
+            password='User**Qwerty123'
+        )
+        other = User.objects.create(
+            email='other@yandex.ru',
+            username='other',
+            first_name='other_name',
+            last_name='other_family',
+            password='Other**Qwerty123'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name='primary_recipe',
+            text='text',
+            image='',
+            cooking_time=10
+        )
+        Tag.objects.create(name='primary', color='#000000', slug='primary')
+        Tag.objects.using(REPLICA).create(
+            name='replica',
+            color='#FFFFFF',
+            slug='replica'
+        )
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+        self.other_client = APIClient()
+        self.other_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other)}'
+        )
+
+    def get_tag_names(self, client):
+        response = client.get('/api/tags/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in response.json()]
+
+    def test_safe_requests_read_replica(self):
+        """Чтение идёт с реплики, токены - с основной БД."""
+        self.assertEqual(self.get_tag_names(self.client), ['replica'])
+        self.assertEqual(self.get_tag_names(self.auth_client), ['replica'])
+
+    def test_write_goes_to_primary(self):
+        response = self.auth_client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.user.favorite_recipes.filter(
+            id=self.recipe.id
+        ).exists())
+
+    def test_sticky_after_write(self):
+        """
+        После изменения клиент читает с основной БД, другие
+        клиенты - с реплики, пока не истечёт окно.
+        """
+        self.auth_client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(self.get_tag_names(self.auth_client), ['primary'])
+        response = self.auth_client.get(
+            '/api/recipes/', {'is_favorited': '1'}
+        )
+        self.assertEqual(
+            [recipe['name'] for recipe in response.json()],
+            ['primary_recipe']
+        )
+        self.assertEqual(self.get_tag_names(self.other_client), ['replica'])
+        expired = time.time() + REPLICA_STICKY_SECONDS + 1
+        with mock.patch('django.core.signing.time.time',
+                        return_value=expired):
+            self.assertEqual(
+                self.get_tag_names(self.auth_client),
+                ['replica']
+            )
+        del self.auth_client.cookies[REPLICA_STICKY_COOKIE]
+        self.assertEqual(self.get_tag_names(self.auth_client), ['replica'])
+
+    def test_forged_sticky_cookie(self):
+        """Неподписанная cookie не переключает чтение."""
+        self.client.cookies[REPLICA_STICKY_COOKIE] = '1'
+        self.assertEqual(self.get_tag_names(self.client), ['replica'])
+
+    def test_failed_write_is_not_sticky(self):
+        response = self.auth_client.post('/api/recipes/0/favorite/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_tag_names(self.auth_client), ['replica'])
+
+    def test_primary_paths(self):
+        """Вход выполняется по данным основной БД."""
+        self.user.set_password('User**Qwerty123')
+        self.user.save()
+        response = self.client.post('/api/auth/token/login/', {
+            'email': 'user@yandex.ru',
+            'password': 'User**Qwerty123'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unhealthy_replica(self):
+        """
+        Недоступная реплика пропускается, проверка повторяется
+        не чаще раза в interval секунд.
+        """
+        client = self.other_client
+        with mock.patch.object(
+            ReplicaHealth, 'check', return_value=False
+        ) as check:
+            self.assertEqual(self.get_tag_names(client), ['primary'])
+            self.assertEqual(self.get_tag_names(client), ['primary'])
+        check.assert_called_once_with(REPLICA)
+        self.assertEqual(self.get_tag_names(client), ['primary'])
+        replica_health.reset()
+        self.assertEqual(self.get_tag_names(client), ['replica'])
+
+    def test_health_check_query(self):
+        health = ReplicaHealth()
+        self.assertTrue(health.check(REPLICA))
+        replica = connections[REPLICA]
+        with mock.patch.object(
+            replica, 'cursor', side_effect=OperationalError
+        ), mock.patch.object(replica, 'close') as close:
+            self.assertFalse(health.check(REPLICA))
+        close.assert_called_once_with()
+
+    def test_reads_outside_requests_use_primary(self):
+        """Вне запроса чтение с основной БД, токены - всегда с неё."""
+        self.assertEqual(Tag.objects.get().name, 'primary')
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Tag), REPLICA)
+            self.assertIsNone(router.db_for_read(Token))
+            self.assertEqual(Tag.objects.get().name, 'replica')
+        self.assertIsNone(router.db_for_read(Tag))
@@ -7,7 +7,9 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'first_name',
         'last_name',
-        'email'
+        'email',
+        'recipes_count',
+        'followers_count'
     )
     search_fields = ('username', 'email')
     filter_horizontal = ('favorite_recipes',)
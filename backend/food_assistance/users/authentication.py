@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router, transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from food_assistance.settings import (AUTH_TOKEN_CACHE_ALIAS,
+                                      AUTH_TOKEN_CACHE_SIZE,
+                                      AUTH_TOKEN_CACHE_TTL)
+
+KEY_PREFIX = 'auth_token'
+
+User = get_user_model()
+
+
+class TokenCache:
+    """
+    Кэш token -> (user_id, is_active) в два уровня: LRU процесса,
+    ограниченный по размеру и TTL, и (если задан alias)
+    общий Django cache.
+
+    Сам пользователь в кэше не хранится: в общий кэш не попадают
+    хэш пароля и персональные данные, а экземпляр user каждый
+    запрос читает из БД по первичному ключу.
+    Инвалидация удаляет ключ в текущем процессе и в общем кэше;
+    в других процессах запись живёт не дольше ttl. Если отзыв
+    токена должен действовать сразу во всех процессах, локальный
+    уровень отключается AUTH_TOKEN_CACHE_SIZE=0.
+    """
+    def __init__(self, alias=AUTH_TOKEN_CACHE_ALIAS,
+                 size=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL):
+        self.alias = alias
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def cache(self):
+        return caches[self.alias] if self.alias else None
+
+    def make_key(self, key):
+        return f'{KEY_PREFIX}:{key}'
+
+    def get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set_local(self, key, data):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Возвращает (user_id, is_active) или None."""
+        data = self.get_local(key)
+        if data is None and self.cache is not None:
+            data = self.cache.get(self.make_key(key))
+            if data is not None:
+                data = tuple(data)
+                self.set_local(key, data)
+        return data
+
+    def set(self, key, user_id, is_active):
+        data = (user_id, is_active)
+        self.set_local(key, data)
+        if self.cache is not None:
+            self.cache.set(self.make_key(key), data, self.ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache is not None:
+            self.cache.delete(self.make_key(key))
+
+    def invalidate(self, key):
+        """
+        Удаляет токен сразу и ещё раз после коммита транзакции,
+        чтобы конкурентный запрос не вернул в кэш старое состояние.
+        """
+        self.delete(key)
+        transaction.on_commit(lambda: self.delete(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без JOIN authtoken_token и users_user на
+    каждый запрос: владелец токена берётся из token_cache, а
+    пользователь читается по первичному ключу из той же БД, что
+    и токены (см. ReplicaRouter.primary_models).
+    Кэш сбрасывается сигналами при удалении токена (logout)
+    и при сохранении пользователя (смена пароля, деактивация).
+    """
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user.pk, user.is_active)
+            return user, token
+        user_id, is_active = cached
+        if not is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        user = User.objects.using(router.db_for_read(Token)).filter(
+            pk=user_id, is_active=True
+        ).first()
+        if user is None:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return user, Token(key=key, user=user)
@@ -2,9 +2,19 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models.fields.related import ForeignKey
 
+from cookbook.counters import DerivedFieldsMixin
 
-class User(AbstractUser):
+# Поля пользователя, которые выводятся в ответах API
+# (автор рецепта, подписки).
+USER_IDENTITY_FIELDS = frozenset(
+    ('username', 'first_name', 'last_name', 'email')
+)
+
+
+class User(DerivedFieldsMixin, AbstractUser):
     """Модель пользователя, расширенная полем с избранными рецептами."""
+    derived_fields = ('recipes_count', 'followers_count')
+
     favorite_recipes = models.ManyToManyField(
         'cookbook.Recipe',
         through='cookbook.FavoritRecipes',
@@ -21,6 +31,18 @@ class User(AbstractUser):
         verbose_name='Рецепты в корзине',
         help_text='Рецепты в корзине'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов',
+        help_text='Число рецептов пользователя'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков',
+        help_text='Число подписчиков пользователя'
+    )
 
 
 class Follow(models.Model):
@@ -1,5 +1,237 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from food_assistance.settings import (APPROXIMATE_COUNT_THRESHOLD,
+                                      CURSOR_PAGE_SIZE)
+
+# Допустимые значения позиции курсора (get_position пишет строки).
+CURSOR_SCALARS = (str, int, float)
+
+
+class ApproximatePage(Page):
+    """Страница, наличие следующей страницы у которой известно точно."""
+    has_more = False
+
+    def has_next(self):
+        return self.has_more
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator с оценкой числа строк по плану запроса Postgres
+    вместо COUNT(*). Для небольших выборок и других СУБД
+    считается точное значение.
+
+    Так как оценка может отличаться от реального числа строк,
+    страница выбирается без проверки по num_pages, а наличие
+    следующей страницы определяется по лишней прочитанной строке.
+    """
+    def estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < APPROXIMATE_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise EmptyPage('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('That page contains no results')
+        page = ApproximatePage(objects[:self.per_page], number, self)
+        page.has_more = len(objects) > self.per_page
+        return page
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничная навигация ?page=&limit=.
+
+    ?count=approximate заменяет COUNT(*) оценкой планировщика.
+    Если у класса задан cursor_ordering, параметр ?cursor= включает
+    навигацию по ключу (keyset): следующая страница выбирается
+    условием по полям сортировки, без OFFSET и COUNT(*).
+    Первая страница запрашивается пустым ?cursor=.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_ordering = None
+    cursor_page_size = CURSOR_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def get_cursor_ordering(self, queryset):
+        """
+        Поля сортировки для курсора: явная сортировка queryset
+        (например, из фильтра ?ordering=) или cursor_ordering.
+        """
+        ordering = queryset.query.order_by
+        if ordering and all(isinstance(field, str) for field in ordering):
+            return tuple(ordering)
+        return self.cursor_ordering
+
+    def is_cursor_mode(self, request):
+        return (
+            self.cursor_ordering is not None
+            and self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request)
+        if self.cursor_mode:
+            return self.paginate_by_cursor(queryset, request)
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.django_paginator_class = ApproximateCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(self.next_position, False),
+            'previous': self.get_cursor_link(self.previous_position, True),
+            'results': data
+        })
+
+    def get_cursor_page_size(self, request):
+        return self.get_page_size(request) or self.cursor_page_size
+
+    def encode_cursor(self, position, reverse):
+        raw = json.dumps({'p': position, 'r': int(reverse)})
+        return b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        """Возвращает (position, reverse) или (None, False)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode()).decode())
+            position = cursor['p']
+            reverse = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.cursor_ordering)
+                or not all(isinstance(value, CURSOR_SCALARS)
+                           for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_position(self, obj):
+        return [
+            str(getattr(obj, field.lstrip('-')))
+            for field in self.cursor_ordering
+        ]
+
+    def get_ordering_field(self, queryset, name):
+        """Поле модели или выходное поле аннотации (например, ранга)."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def get_keyset_filter(self, queryset, position, reverse):
+        """
+        Условие «после позиции» для сортировки cursor_ordering:
+        (a > x) OR (a = x AND b > y) OR ... с учётом направлений.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.cursor_ordering, position):
+            name = field.lstrip('-')
+            try:
+                value = self.get_ordering_field(queryset, name).to_python(
+                    value
+                )
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def paginate_by_cursor(self, queryset, request):
+        self.request = request
+        self.cursor_ordering = self.get_cursor_ordering(queryset)
+        page_size = self.get_cursor_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        ordering = self.cursor_ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(queryset, position, reverse)
+            )
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+        has_previous = has_more if reverse else position is not None
+        has_next = reverse or has_more
+        self.next_position = None
+        self.previous_position = None
+        if results and has_next:
+            self.next_position = self.get_position(results[-1])
+        if results and has_previous:
+            self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(position, reverse)
+        )
+
+
+class RecipesPagination(CustomPagination):
+    cursor_ordering = ('-created', 'id')
+
+
+class SubscriptionsPagination(CustomPagination):
+    cursor_ordering = ('id',)
@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
+from cookbook.images import RecipeImagesField
 from cookbook.models import Recipe
 
 User = get_user_model()
@@ -46,6 +47,8 @@ class UserSerializer(serializers.ModelSerializer):
         """
         Проверка подписан ли текущий пользователь на obj.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         current_user = None
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
@@ -59,12 +62,15 @@ class RecipesSimpleSerializer(serializers.ModelSerializer):
     """
     Serializer для поля recipes в SbscrptSerializer.
     """
+    images = RecipeImagesField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
@@ -104,6 +110,11 @@ class SbscrptSerializer(serializers.ModelSerializer):
             )
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'latest_recipes'):
+            return RecipesSimpleSerializer(
+                instance=obj.latest_recipes,
+                many=True
+            ).data
         request = self.context.get('request')
         recipes_limit = self.context.get('recipes_limit')
         if not recipes_limit and request:
@@ -119,6 +130,8 @@ class SbscrptSerializer(serializers.ModelSerializer):
         """
         Проверка подписан ли текущий пользователь на obj.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         current_user = None
         request = self.context.get('request')
         if not request:
@@ -131,6 +144,6 @@ class SbscrptSerializer(serializers.ModelSerializer):
 
     def get_recipes_count(self, obj) -> int:
         """
-        Возвращает число рецептов пользователя.
+        Возвращает число рецептов пользователя из счётчика User.recipes_count.
         """
-        return obj.recipes.all().count()
+        return obj.recipes_count
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from cookbook.counters import change_counter, change_counters
+from cookbook.toggles import relations_changed
+from users.authentication import token_cache
+from users.models import USER_IDENTITY_FIELDS, Follow
+
+User = get_user_model()
+
+# Поля пользователя, изменение которых сбрасывает кэш токенов.
+TOKEN_USER_FIELDS = USER_IDENTITY_FIELDS | {'password', 'is_active'}
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Logout (token/logout) и удаление пользователя удаляют токен."""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields=None,
+                           **kwargs):
+    """
+    Смена пароля, деактивация и изменение данных пользователя
+    сбрасывают его токены: следующий запрос прочитает их из БД.
+    Вход (update_last_login) кэш не сбрасывает.
+    """
+    if created or (update_fields is not None and not (
+        TOKEN_USER_FIELDS & set(update_fields)
+    )):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        token_cache.invalidate(key)
+
+
+@receiver(post_save, sender=Follow)
+def count_added_follower(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_removed_follower(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+
+
+@receiver(relations_changed, sender=Follow)
+def count_changed_followers(sender, ids, delta, **kwargs):
+    change_counters(User, ids, 'followers_count', delta)
@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from users.authentication import TokenCache, token_cache
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self) -> None:
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            email='test_user@yandex.ru',
+            username='test_user',
+            first_name='test_user_name',
+            last_name='test_user_family',
+            password='Test**Qwerty123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    def get_me(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.auth_client.get('/api/users/me/')
+        token_queries = [
+            query for query in context.captured_queries
+            if 'authtoken_token' in query['sql']
+        ]
+        return response, token_queries
+
+    def test_second_request_without_token_query(self):
+        """Повторный запрос аутентифицируется без обращения к БД."""
+        response, token_queries = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+        response, token_queries = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json().get('email'), self.user.email)
+        self.assertEqual(token_queries, [])
+
+    def test_logout_invalidates(self):
+        """После token/logout токен больше не принимается."""
+        self.get_me()
+        response = self.auth_client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_invalidates(self):
+        """Деактивированный пользователь не проходит аутентификацию."""
+        self.get_me()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_set_password_invalidates(self):
+        """
+        Смена пароля сбрасывает кэш: следующий запрос читает
+        пользователя из БД.
+        """
+        self.get_me()
+        response = self.auth_client.post(
+            '/api/users/set_password/',
+            {
+                'current_password': 'Test**Qwerty123',
+                'new_password': 'New**Qwerty456'
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response, token_queries = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+
+    def test_login_keeps_cache(self):
+        """Обновление last_login при входе не сбрасывает кэш."""
+        self.get_me()
+        update_last_login(None, self.user)
+        response, token_queries = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries, [])
+
+    def test_user_not_cached(self):
+        """
+        В кэше только id и активность пользователя, сам пользователь
+        с хэшем пароля читается из БД по первичному ключу.
+        """
+        self.get_me()
+        self.assertEqual(
+            token_cache.get(self.token.key), (self.user.pk, True)
+        )
+        User.objects.filter(pk=self.user.pk).update(first_name='renamed')
+        with CaptureQueriesContext(connection) as context:
+            response = self.auth_client.get('/api/users/me/')
+        self.assertEqual(response.json().get('first_name'), 'renamed')
+        self.assertFalse(any(
+            'authtoken_token' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_invalid_token(self):
+        """Неизвестный токен по-прежнему отклоняется."""
+        self.auth_client.credentials(HTTP_AUTHORIZATION='Token unknown')
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(
+            email='test_user@yandex.ru',
+            username='test_user',
+            password='Test**Qwerty123'
+        )
+
+    def test_size_bound(self):
+        """Из переполненного LRU вытесняется давно не читанный токен."""
+        cache = TokenCache(alias=None, size=2, ttl=60)
+        cache.set('a', self.user.pk, True)
+        cache.set('b', self.user.pk, True)
+        cache.get('a')
+        cache.set('c', self.user.pk, True)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_ttl(self):
+        """Запись устаревает через ttl секунд."""
+        cache = TokenCache(alias=None, size=2, ttl=60)
+        cache.set('a', self.user.pk, True)
+        with mock.patch('users.authentication.time.monotonic',
+                        return_value=10 ** 9):
+            self.assertIsNone(cache.get('a'))
+
+    def test_shared_cache(self):
+        """Без локального уровня запись читается из Django cache."""
+        cache = TokenCache(alias='default', size=0, ttl=60)
+        cache.set('a', self.user.pk, True)
+        self.assertEqual(cache.get('a'), (self.user.pk, True))
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))